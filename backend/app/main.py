@@ -1,38 +1,89 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import papers, tags, health, telegram, ingest
-from app.services.telegram_bot import create_bot_application
+from app.routers import papers, tags, authors, health, telegram, ingest, metrics, profiles
+from app.services.paper_service import get_paper_service
+from app.services.snapshot import SnapshotWatcher
+from app.services.summary_upgrader import SummaryUpgrader
+from app.services.fulltext import close_fulltext_stage
+from app.services.metrics import MetricsMiddleware
+from app.services.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from app.startup import timed, report as report_startup
 import os
 from contextlib import asynccontextmanager
 
 # Global bot application instance
 bot_application = None
+digest_scheduler = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan - start/stop bot"""
-    global bot_application
+    global bot_application, digest_scheduler
+    
+    # Load the paper dataset once, before the first request arrives
+    with timed("load papers"):
+        paper_service = get_paper_service()
+    # Follow snapshots published by ingestion in any worker
+    snapshot_watcher = SnapshotWatcher(paper_service.refresh)
+    snapshot_watcher.start()
+    # Turn the snapshots published from now on into /papers/stream events
+    paper_service.feed.start(paper_service.version)
+    # Replace extractive summaries with abstractive ones; one worker does the work
+    summary_upgrader = SummaryUpgrader(paper_service)
+    summary_upgrader.start()
     
     # Start Telegram bot if token is provided
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    if bot_token:
+    webhook_url = os.getenv("TELEGRAM_WEBHOOK_URL")
+    if bot_token and webhook_url and not os.getenv("TELEGRAM_WEBHOOK_SECRET"):
+        print("⚠️  TELEGRAM_WEBHOOK_URL requires TELEGRAM_WEBHOOK_SECRET - bot disabled")
+    elif bot_token:
         try:
-            bot_application = create_bot_application(bot_token)
-            await bot_application.initialize()
-            await bot_application.start()
-            # Start polling for updates
-            await bot_application.updater.start_polling()
+            # Imported here so python-telegram-bot is only loaded when the bot runs
+            with timed("import telegram bot"):
+                from telegram import Update
+                from app.services.telegram_bot import create_bot_application
+            with timed("start telegram bot"):
+                bot_application = create_bot_application(bot_token, webhook=bool(webhook_url))
+                await bot_application.initialize()
+                await bot_application.start()
+                if webhook_url:
+                    # Telegram pushes updates to /telegram/webhook; no worker polls.
+                    # Every worker registers the same URL, which is idempotent.
+                    await bot_application.bot.set_webhook(
+                        url=f"{webhook_url.rstrip('/')}/telegram/webhook",
+                        secret_token=os.getenv("TELEGRAM_WEBHOOK_SECRET"),
+                        allowed_updates=Update.ALL_TYPES,
+                    )
+                    print(f"✅ Telegram webhook set to {webhook_url.rstrip('/')}/telegram/webhook")
+                else:
+                    # Start polling for updates
+                    await bot_application.updater.start_polling()
+            app.state.bot_application = bot_application
+            from app.services.digest_scheduler import DigestScheduler
+            digest_scheduler = DigestScheduler(bot_application)
+            digest_scheduler.start()
             print("✅ Telegram bot started successfully")
         except Exception as e:
             print(f"⚠️  Failed to start Telegram bot: {e}")
     else:
         print("⚠️  TELEGRAM_BOT_TOKEN not set - bot disabled")
     
+    report_startup()
+    
     yield
     
+    await summary_upgrader.stop()
+    await snapshot_watcher.stop()
+    await paper_service.feed.stop()
+    await close_fulltext_stage()
+    
     # Shutdown bot
+    if digest_scheduler:
+        await digest_scheduler.stop()
     if bot_application:
-        await bot_application.updater.stop()
+        if bot_application.updater and bot_application.updater.running:
+            await bot_application.updater.stop()
         await bot_application.stop()
         await bot_application.shutdown()
 
@@ -51,13 +102,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+# Only installed when PROFILE_TOKEN is set, so requests are otherwise untouched
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
 # Include routers
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(papers.router, prefix="/papers", tags=["papers"])
 app.include_router(tags.router, prefix="/tags", tags=["tags"])
+app.include_router(authors.router, prefix="/authors", tags=["authors"])
 app.include_router(telegram.router, prefix="/telegram", tags=["telegram"])
 app.include_router(ingest.router, prefix="/ingest", tags=["ingest"])
+app.include_router(profiles.router, prefix="/profiles", tags=["profiles"])
 
 @app.get("/")
 async def root():
@@ -7,11 +7,15 @@ class Paper(BaseModel):
     arxiv_id: str
     title: str
     authors: List[str]
+    # Canonical key of each author (see app/services/authors.py), for /authors/{key}/papers
+    author_keys: List[str] = []
     abstract: str
     category: str
     published_at: str
     pdf_url: str
     summary_short: str
+    # "extractive" until the abstractive summary has replaced it
+    summary_tier: str = "abstractive"
     impact_suggestions: List[str]
     tags: List[str]
     score: float
@@ -25,3 +29,9 @@ class PapersListResponse(BaseModel):
     page: int
     limit: int
     pages: int
+
+class Author(BaseModel):
+    # Canonical key, e.g. "vaswani-a"
+    key: str
+    name: str
+    papers: int
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List
+from app.models.paper import Author, PapersListResponse
+from app.services.paper_service import get_paper_service
+
+router = APIRouter()
+
+@router.get("", response_model=List[Author])
+async def complete_authors(
+    q: str = Query(..., min_length=1, description="Start of a surname, or a full name"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum authors returned")
+):
+    """Autocomplete author names"""
+    return await get_paper_service().complete_authors(q, limit)
+
+@router.get("/{key}/papers", response_model=PapersListResponse)
+async def get_author_papers(
+    key: str,
+    page: int = Query(1, ge=1, description="Page number"),
+    limit: int = Query(10, ge=1, le=100, description="Items per page")
+):
+    """Get an author's papers, newest first"""
+    if not key.strip():
+        raise HTTPException(status_code=404, detail="Author key is empty")
+    response = await get_paper_service().get_author_papers(key, page, limit)
+    if response is None:
+        raise HTTPException(status_code=404, detail=f"Author not found: {key}")
+    return response
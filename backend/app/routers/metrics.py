@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+import numpy as np
+from app.services.metrics import (
+    CACHE_BYTES, CACHE_ENTRIES, CONTENT_TYPE, DATASET_BYTES, DATASET_INFO, DATASET_PAPERS,
+    DATASET_SUMMARY_TIERS, FEED_SUBSCRIBERS, MODEL_RESIDENT_BYTES, MODEL_USERS, PROCESS_RESIDENT_BYTES,
+    REGISTRY, update_cache_ratios,
+)
+from app.services.model_manager import get_model_manager, resident_bytes
+from app.services.paper_service import get_paper_service
+from app.services.paper_store import SUMMARY_TIERS
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker"""
+    service = get_paper_service()
+    store = service.store
+    DATASET_PAPERS.set(len(store))
+    DATASET_BYTES.set(store.nbytes)
+    DATASET_INFO.clear()
+    DATASET_INFO.labels(store.version).set(1)
+    for tier, count in zip(SUMMARY_TIERS, np.bincount(store.summary_tiers, minlength=len(SUMMARY_TIERS))):
+        DATASET_SUMMARY_TIERS.labels(tier).set(int(count))
+    stats = service.query_cache.stats()
+    CACHE_BYTES.labels(service.query_cache.name).set(stats.bytes)
+    CACHE_ENTRIES.labels(service.query_cache.name).set(stats.entries)
+    FEED_SUBSCRIBERS.set(service.feed.subscribers)
+    MODEL_RESIDENT_BYTES.clear()
+    MODEL_USERS.clear()
+    for name, users, size in get_model_manager().stats():
+        MODEL_RESIDENT_BYTES.labels(name).set(size)
+        MODEL_USERS.labels(name).set(users)
+    rss = resident_bytes()
+    if rss is not None:
+        PROCESS_RESIDENT_BYTES.set(rss)
+    update_cache_ratios()
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
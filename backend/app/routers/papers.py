@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from app.models.paper import Paper, PaperResponse, PapersListResponse
-from app.services.paper_service import PaperService
+from app.services.paper_service import get_paper_service
 
 router = APIRouter()
-paper_service = PaperService()
 
 @router.get("", response_model=PapersListResponse)
 async def get_papers(
@@ -17,7 +17,7 @@ async def get_papers(
     limit: int = Query(10, ge=1, le=100, description="Items per page")
 ):
     """Get paginated list of papers with optional filters"""
-    return await paper_service.get_papers(
+    return await get_paper_service().get_papers(
         search=search,
         tags=tags.split(",") if tags else None,
         category=category,
@@ -27,12 +27,31 @@ async def get_papers(
         limit=limit
     )
 
+@router.get("/stream")
+async def stream_papers(
+    tags: Optional[str] = Query(None, description="Comma-separated tags"),
+    category: Optional[str] = Query(None, description="Category filter"),
+    last_event_id: Optional[str] = Header(None, description="Last event received, to replay missed ones"),
+):
+    """Server-sent events announcing newly ingested papers"""
+    events = get_paper_service().feed.subscribe(
+        tags=tags.split(",") if tags else None,
+        category=category,
+        last_event_id=last_event_id,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # No caching or proxy buffering, so events arrive as they are sent
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/{paper_id}", response_model=PaperResponse)
 async def get_paper(paper_id: str):
     """Get a single paper by ID or arXiv ID"""
-    return await paper_service.get_paper(paper_id)
+    return await get_paper_service().get_paper(paper_id)
 
 @router.get("/daily/top", response_model=List[Paper])
 async def get_daily_top(n: int = Query(3, ge=1, le=10)):
     """Get top N papers for the day"""
-    return await paper_service.get_daily_top(n)
+    return await get_paper_service().get_daily_top(n)
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Dict, List, Optional
+from app.services.profiling import PROFILING_ENABLED, list_profiles, profile_path, token_matches
+
+router = APIRouter()
+
+def _authorize(header: Optional[str], query: Optional[str]):
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled")
+    if header is not None:
+        # Starlette decodes header values as Latin-1; the token is compared as UTF-8
+        header = header.encode("latin-1").decode("utf-8", "surrogateescape")
+    if not token_matches(header or query):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+@router.get("", response_model=List[Dict])
+async def get_profiles(
+    x_profile_token: Optional[str] = Header(None),
+    profile_token: Optional[str] = Query(None)
+):
+    """List captured profiles, newest first"""
+    _authorize(x_profile_token, profile_token)
+    return list_profiles()
+
+@router.get("/{name}")
+async def get_profile(
+    name: str,
+    x_profile_token: Optional[str] = Header(None),
+    profile_token: Optional[str] = Query(None)
+):
+    """Download a profile as collapsed stacks (open it in speedscope or flamegraph.pl)"""
+    _authorize(x_profile_token, profile_token)
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {name}")
+    return FileResponse(path, media_type="text/plain", filename=f"{name}.collapsed")
@@ -1,35 +1,41 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+import hmac
 import os
 
 router = APIRouter()
 
-class WebhookUpdate(BaseModel):
-    """Telegram webhook update model"""
-    update_id: int
-    message: Optional[dict] = None
-    callback_query: Optional[dict] = None
-
 @router.post("/webhook")
-async def telegram_webhook(update: WebhookUpdate, background_tasks: BackgroundTasks):
+async def telegram_webhook(request: Request):
     """
     Handle incoming Telegram webhook updates
-    This endpoint receives updates from Telegram when users interact with the bot
+    This endpoint receives updates from Telegram when users interact with the bot.
+    The update is queued on the bot application and acknowledged immediately;
+    handlers run on the application's own update processing task.
     """
+    application = getattr(request.app.state, "bot_application", None)
+    secret = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+    if application is None or application.updater is not None or not secret:
+        raise HTTPException(status_code=503, detail="Telegram webhook mode is not enabled")
+    
+    received = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    # Compared as bytes: compare_digest raises on non-ASCII str, which would be a 500
+    if not hmac.compare_digest(received.encode("latin-1"), secret.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid secret token")
+    
+    from telegram import Update
     try:
-        # Process the update in the background
-        # The actual bot application will handle this
-        return {"status": "ok"}
+        update = Update.de_json(await request.json(), application.bot)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=400, detail=f"Invalid update: {e}")
+    
+    await application.update_queue.put(update)
+    return {"status": "ok"}
 
 @router.get("/subscribers/count")
 async def get_subscriber_count():
     """Get the number of bot subscribers"""
-    from app.services.telegram_bot import load_subscriptions
-    subscriptions = load_subscriptions()
-    return {"count": len(subscriptions)}
+    from app.services.subscription_store import get_subscription_store
+    return {"count": len(get_subscription_store())}
 
 @router.get("/health")
 async def telegram_health():
@@ -37,5 +43,6 @@ async def telegram_health():
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
     return {
         "configured": bool(bot_token),
-        "status": "ready" if bot_token else "not_configured"
+        "status": "ready" if bot_token else "not_configured",
+        "mode": "webhook" if os.getenv("TELEGRAM_WEBHOOK_URL") else "polling"
     }
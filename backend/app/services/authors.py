@@ -0,0 +1,95 @@
+"""
+Canonical author keys
+
+arXiv spells the same person many ways: "Łukasz Kaiser", "Lukasz Kaiser",
+"L. Kaiser", "Kaiser, Lukasz". All of them map to one key, the folded
+surname plus the first initial, `kaiser-l`: case and diacritics are
+folded, name particles stay part of the surname ("van der berg" ->
+`vanderberg-j`), hyphenated surnames stay whole and generational
+suffixes are dropped. Keys are plain ASCII, so they can be used in URLs
+as they are.
+
+Names with no letters that fold to ASCII ("王伟", "Иван Петров") are
+split the same way over their own letters, and keyed by a hash of the
+surname and initial behind a `~` (`~3f9a0c2e71b4`), which no folded key
+contains; "И. Петров" and "Петров, Иван" still share a key.
+
+Different people with the same surname and initial share a key; that is
+the price of matching "L. Kaiser" with "Lukasz Kaiser".
+"""
+from typing import Callable, List, Tuple
+import hashlib
+import re
+import unicodedata
+
+# Lowercase words that belong to the surname that follows them
+PARTICLES = {"da", "de", "del", "della", "den", "der", "di", "dos", "du", "la", "le", "st", "ten", "ter", "van", "von", "y"}
+SUFFIXES = {"jr", "sr", "ii", "iii", "iv"}
+# Letters NFKD does not decompose into a base letter plus a mark
+_SPECIAL = str.maketrans({"ł": "l", "ø": "o", "đ": "d", "ß": "ss", "æ": "ae", "œ": "oe", "ı": "i", "þ": "th"})
+_WORD = re.compile(r"[a-z0-9]+")
+_UNICODE_WORD = re.compile(r"\w+")
+_JOINERS = re.compile(r"['’-]")
+# Marks keys hashed from names without ASCII letters
+HASHED_KEY = "~"
+# Surnames are cut to this many characters, so keys fit a fixed-width column
+MAX_SURNAME = 30
+
+
+def fold(text: str) -> str:
+    """Lowercase ASCII form of `text`, without accents"""
+    text = unicodedata.normalize("NFKD", text.casefold().translate(_SPECIAL))
+    return "".join(c for c in text if not unicodedata.combining(c)).encode("ascii", "ignore").decode("ascii")
+
+
+def _words(text: str) -> List[str]:
+    # Hyphenated and apostrophized names are one word: garcia-lopez, o'neil
+    return _WORD.findall(_JOINERS.sub("", fold(text)))
+
+
+def _unicode_words(text: str) -> List[str]:
+    """Casefolded words in any script, for names `_words` cannot fold"""
+    return _UNICODE_WORD.findall(unicodedata.normalize("NFKC", _JOINERS.sub("", text)).casefold())
+
+
+def split_name(name: str, words_of: Callable[[str], List[str]] = _words) -> Tuple[List[str], List[str]]:
+    """(given names, surname words) of "Forename Surname" or "Surname, Forename" """
+    if "," in name:
+        surname, _, given = name.partition(",")
+        given_words = [w for w in words_of(given) if w not in SUFFIXES]
+        return given_words, words_of(surname)
+    words = [w for w in words_of(name) if w not in SUFFIXES]
+    if len(words) <= 1:
+        return [], words
+    # The surname is the last word plus any particles before it
+    start = len(words) - 1
+    while start > 1 and words[start - 1] in PARTICLES:
+        start -= 1
+    return words[:start], words[start:]
+
+
+def author_key(name: str) -> str:
+    """Canonical key of an author name, e.g. "Ashish Vaswani" -> "vaswani-a"; never empty"""
+    given, surname = split_name(name)
+    if surname:
+        key = "".join(surname)[:MAX_SURNAME]
+        return f"{key}-{given[0][0]}" if given else key
+    given, surname = split_name(name, _unicode_words)
+    # Without any word at all, the whole (normalized) name is hashed
+    text = f"{''.join(surname)}-{given[0][0]}" if surname and given else "".join(surname) or " ".join(name.split())
+    return HASHED_KEY + hashlib.blake2b(text.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def key_prefix(query: str) -> str:
+    """
+    Key prefix an autocomplete query stands for
+
+    A single word, or particles followed by one ("van der b"), is the
+    start of a surname; a full name is turned into its key ("a vaswani"
+    -> "vaswani-a").
+    """
+    words = _words(query)
+    # Hashed keys have no prefixes: only a full name finds them
+    if "," in query or not words or not all(word in PARTICLES for word in words[:-1]):
+        return author_key(query) if query.strip() else ""
+    return "".join(words)[:MAX_SURNAME]
@@ -0,0 +1,265 @@
+"""
+Checkpointed bulk backfill of historical papers
+
+A backfill harvests a date range over OAI-PMH, splits the harvested
+records into fixed-size shards and summarizes the shards on a process
+pool, one summarization model per worker process. Each finished shard is
+written to `data/backfill/<name>/shard-NNNNN.json`. That file is the
+shard's checkpoint: an interrupted backfill skips it when re-run, and the
+harvest itself resumes from its own checkpoint.
+
+Once every shard is done, the papers are merged into papers.json under the
+ingestion lock and a new snapshot is published. Workers serving the API
+switch to it without any HTTP call.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import asyncio
+import json
+import math
+import os
+import signal
+import time
+from app.services.ingestion import (
+    DATA_DIR, MAX_PAPERS, hold_ingest_lock, load_papers, process_paper, save_papers,
+)
+from app.services.oai_harvester import ARXIV_OAI_URL, OAIHarvester, harvest_paths, read_records
+from app.services.ranking import publication_score
+
+BACKFILL_DIR = os.path.join(DATA_DIR, "backfill")
+# Papers per shard: the unit of work handed to a worker and of checkpointing
+SHARD_SIZE = 200
+
+
+@dataclass(frozen=True)
+class BackfillParams:
+    from_date: str
+    until_date: str
+    categories: Tuple[str, ...]
+    shard_size: int = SHARD_SIZE
+
+    @property
+    def name(self) -> str:
+        return f"{self.from_date}_{self.until_date}_{'+'.join(self.categories)}"
+
+    @property
+    def sets(self) -> List[str]:
+        """OAI sets to harvest: the archives of the categories (cs.AI -> cs)"""
+        return sorted({category.split(".")[0] for category in self.categories})
+
+
+# Per-process summarizer, created by the pool initializer
+_summarizer = None
+
+
+def _init_worker(model_name: Optional[str], fake_model: bool, threads: int, decoding: Optional[str]):
+    global _summarizer
+    # Ctrl-C is handled by the parent, which lets running shards finish and checkpoint
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Before the model's libraries are imported, so each worker sticks to its share of cores
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "TOKENIZERS_PARALLELISM"):
+        os.environ[var] = "false" if var == "TOKENIZERS_PARALLELISM" else str(threads)
+    from app.services.summarizer import Summarizer
+    from app.services.summarizer import MODEL_NAME, SUMMARY_DECODING
+    _summarizer = Summarizer(model_name or MODEL_NAME, decoding or SUMMARY_DECODING)
+    if fake_model:
+        from fakes.summarization import FakeSummarizationPipeline
+        _summarizer._model = FakeSummarizationPipeline()
+
+
+async def _process_all(raw_papers: List[dict]) -> List[dict]:
+    return [await process_paper(_summarizer, raw_paper) for raw_paper in raw_papers]
+
+
+def _process_shard(index: int, raw_papers: List[dict], path: str) -> Tuple[int, int]:
+    """Worker entry point: summarize a shard and write its checkpoint"""
+    papers = asyncio.run(_process_all(raw_papers))
+    _write_shard(path, index, papers)
+    return index, len(papers)
+
+
+def _write_shard(path: str, index: int, papers: List[dict]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"shard": index, "papers": papers}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _to_raw_paper(record: dict) -> dict:
+    """Harvested record in the shape the scraper returns, with its score"""
+    return dict(record, score=publication_score(len(record["authors"]), len(record["abstract"])))
+
+
+class Backfill:
+    """
+    One backfill job and its checkpoints
+
+    Args:
+        params: Date range, categories and shard size
+        base_url: OAI-PMH endpoint to harvest from
+        directory: Parent directory of the job's shard checkpoints
+    """
+
+    def __init__(self, params: BackfillParams, base_url: str = ARXIV_OAI_URL, directory: str = BACKFILL_DIR):
+        self.params = params
+        self.base_url = base_url
+        self.job_dir = os.path.join(directory, params.name)
+        self.manifest_path = os.path.join(self.job_dir, "manifest.json")
+
+    def _harvest_paths(self, set_spec: str) -> Tuple[str, str]:
+        return harvest_paths(f"backfill-{self.params.name}-{set_spec}")
+
+    def _shard_path(self, index: int) -> str:
+        return os.path.join(self.job_dir, f"shard-{index:05d}.json")
+
+    def _check_manifest(self):
+        """Refuse to resume checkpoints written with different shard boundaries"""
+        os.makedirs(self.job_dir, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+            if previous["shard_size"] != self.params.shard_size:
+                raise ValueError(
+                    f"{self.job_dir} was sharded by {previous['shard_size']} papers; "
+                    f"resume with --shard-size {previous['shard_size']} or --restart"
+                )
+        else:
+            with open(self.manifest_path, "w", encoding="utf-8") as f:
+                json.dump(dict(asdict(self.params), categories=list(self.params.categories)), f, indent=2)
+
+    def harvest(self) -> int:
+        """Harvest (or finish harvesting) every set; returns the number of records"""
+        total = 0
+        for set_spec in self.params.sets:
+            records_path, checkpoint_path = self._harvest_paths(set_spec)
+            checkpoint = OAIHarvester(records_path, checkpoint_path, base_url=self.base_url).harvest(
+                set_spec, self.params.from_date, self.params.until_date, list(self.params.categories)
+            )
+            total += checkpoint.records
+        return total
+
+    def shards(self) -> Iterator[Tuple[int, List[dict]]]:
+        """Fixed-size shards of the harvested records, in harvest order"""
+        shard: List[dict] = []
+        index = 0
+        for set_spec in self.params.sets:
+            for record in read_records(self._harvest_paths(set_spec)[0]):
+                shard.append(record)
+                if len(shard) == self.params.shard_size:
+                    yield index, shard
+                    index, shard = index + 1, []
+        if shard:
+            yield index, shard
+
+    def summarize(self, workers: int, model_name: Optional[str] = None, fake_model: bool = False,
+                  threads_per_worker: int = 1, skip_ids: Optional[Set[str]] = None, total: int = 0,
+                  decoding: Optional[str] = None) -> int:
+        """
+        Summarize every shard without a checkpoint on a process pool
+
+        Args:
+            workers: Worker processes
+            model_name: Summarization model (default: the Summarizer's)
+            fake_model: Use the fake summarization pipeline (for local runs)
+            threads_per_worker: Math library threads per worker
+            skip_ids: arXiv ids that are already stored and need no summary
+            total: Number of harvested records, for progress reporting
+            decoding: Decoding preset (default: SUMMARY_DECODING)
+
+        Returns:
+            Number of papers summarized in this run
+        """
+        seen = set(skip_ids or ())
+        total_shards = math.ceil(total / self.params.shard_size)
+        done = skipped = summarized = 0
+        started = time.perf_counter()
+        pending: Dict[Future, int] = {}
+
+        def report(future: Future):
+            nonlocal done, summarized
+            index, count = future.result()
+            done += 1
+            summarized += count
+            rate = summarized / (time.perf_counter() - started)
+            print(f"   [{done + skipped}/{total_shards}] Shard {index}: {count} papers ({rate:.1f} papers/s)")
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_name, fake_model, threads_per_worker, decoding)) as pool:
+            try:
+                for index, records in self.shards():
+                    # Dedupe in harvest order, so a shard's contents do not depend on what already ran
+                    raw_papers = [_to_raw_paper(r) for r in records if r["arxiv_id"] not in seen]
+                    seen.update(r["arxiv_id"] for r in records)
+                    path = self._shard_path(index)
+                    if os.path.exists(path):
+                        skipped += 1
+                        continue
+                    if not raw_papers:
+                        _write_shard(path, index, [])
+                        done += 1
+                        continue
+                    # Keep a bounded number of shards in flight rather than the whole backlog
+                    while len(pending) >= workers * 2:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            pending.pop(future)
+                            report(future)
+                    pending[pool.submit(_process_shard, index, raw_papers, path)] = index
+                for future in wait(pending).done:
+                    report(future)
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        if skipped:
+            print(f"↩️  Skipped {skipped} shards completed by an earlier run")
+        return summarized
+
+    def merge(self) -> Tuple[int, int]:
+        """
+        Merge the shard checkpoints into papers.json and publish a snapshot
+
+        Returns:
+            (papers added, total papers)
+        """
+        from app.services.paper_service import get_paper_service
+
+        with hold_ingest_lock():
+            existing_papers = load_papers()
+            known_ids = {p.get("arxiv_id") for p in existing_papers}
+            added = []
+            for name in sorted(os.listdir(self.job_dir)):
+                if not (name.startswith("shard-") and name.endswith(".json")):
+                    continue
+                with open(os.path.join(self.job_dir, name), "r", encoding="utf-8") as f:
+                    for paper in json.load(f)["papers"]:
+                        if paper["arxiv_id"] not in known_ids:
+                            known_ids.add(paper["arxiv_id"])
+                            added.append(paper)
+            all_papers = existing_papers + added
+            all_papers.sort(key=lambda p: p["published_at"], reverse=True)
+            save_papers(all_papers)
+            get_paper_service().reload_papers()
+        return len(added), len(all_papers)
+
+    def run(self, workers: int, model_name: Optional[str] = None, fake_model: bool = False,
+            threads_per_worker: int = 1, decoding: Optional[str] = None) -> Tuple[int, int]:
+        """Harvest, summarize and merge; safe to re-run after an interruption"""
+        # Ingestion keeps only the newest MAX_PAPERS papers: its next run would delete the history
+        if MAX_PAPERS:
+            raise ValueError(
+                f"MAX_PAPERS={MAX_PAPERS} makes every ingestion run keep only the newest {MAX_PAPERS} papers, "
+                f"deleting a backfill; set MAX_PAPERS=0 for the API and for this command"
+            )
+        self._check_manifest()
+        print(f"🌾 Harvesting {', '.join(self.params.categories)} from {self.params.from_date} "
+              f"to {self.params.until_date}...")
+        total = self.harvest()
+        print(f"🤖 Summarizing {total} records in shards of {self.params.shard_size} on {workers} processes...")
+        existing_ids = {p.get("arxiv_id") for p in load_papers()}
+        summarized = self.summarize(
+            workers, model_name, fake_model, threads_per_worker, existing_ids, total, decoding
+        )
+        print(f"   Summarized {summarized} papers")
+        print("💾 Merging shards into papers.json and publishing a snapshot...")
+        return self.merge()
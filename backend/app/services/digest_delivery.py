@@ -0,0 +1,427 @@
+"""
+Rate-limited concurrent delivery of Telegram digests
+
+A digest is stored as a batch of rendered messages plus one delivery row per
+chat in a SQLite queue, so pending and failed deliveries survive restarts.
+`DeliveryEngine` sends to many chats at once while staying inside
+Telegram's flood limits: a global token bucket (~30 messages/s) and a
+minimum interval between messages to the same chat (~1 message/s).
+`RetryAfter` responses pause the whole engine for the requested time, and
+transient network errors are retried with exponential backoff.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import asyncio
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import time
+from telegram import InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from app.services.metrics import TELEGRAM_FAILURES, TELEGRAM_SEND_SECONDS, TELEGRAM_SENDS
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data"))
+DELIVERY_DB = os.path.join(DATA_DIR, "delivery_queue.db")
+
+# Telegram flood limits (https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this)
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+MAX_IN_FLIGHT = int(os.getenv("TELEGRAM_MAX_IN_FLIGHT", "64"))
+MAX_ATTEMPTS = int(os.getenv("TELEGRAM_MAX_ATTEMPTS", "5"))
+
+# Seconds between flushes of delivery progress to SQLite
+FLUSH_INTERVAL = 0.5
+
+PENDING = "pending"
+DELIVERED = "delivered"
+FAILED = "failed"
+
+
+class TokenBucket:
+    """Async token bucket; `acquire` waits until a token is available"""
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds` (used for RetryAfter)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class Delivery:
+    """Progress of one batch towards one chat"""
+    batch_id: str
+    chat_id: int
+    sent: int = 0
+    attempts: int = 0
+    next_attempt: float = 0.0
+    status: str = PENDING
+    error: Optional[str] = None
+    # Which of the batch's digests this chat receives (personalized batches)
+    variant: int = 0
+
+
+@dataclass
+class DeliveryReport:
+    """Outcome of a delivery run"""
+    chats: int = 0
+    delivered: int = 0
+    failed: int = 0
+    messages_sent: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    elapsed: float = 0.0
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """Messages sent per second"""
+        return self.messages_sent / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Delivered to {self.delivered}/{self.chats} chats "
+            f"({self.failed} failed, {self.messages_sent} messages, "
+            f"{self.throughput:.1f} msg/s, {self.retries} retries, "
+            f"{self.rate_limited} rate limited) in {self.elapsed:.1f}s"
+        )
+
+
+class DeliveryQueue:
+    """SQLite-backed queue of digest batches and per-chat deliveries"""
+
+    def __init__(self, path: str = DELIVERY_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS batches (
+                batch_id TEXT PRIMARY KEY,
+                messages TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS deliveries (
+                batch_id TEXT NOT NULL,
+                chat_id INTEGER NOT NULL,
+                sent INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT,
+                PRIMARY KEY (batch_id, chat_id)
+            );
+            CREATE INDEX IF NOT EXISTS deliveries_status ON deliveries (status);
+            CREATE TABLE IF NOT EXISTS claims (
+                batch_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS variants (
+                batch_id TEXT NOT NULL,
+                variant INTEGER NOT NULL,
+                messages TEXT NOT NULL,
+                PRIMARY KEY (batch_id, variant)
+            );
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(deliveries)")}
+        if "variant" not in columns:
+            self.conn.execute("ALTER TABLE deliveries ADD COLUMN variant INTEGER NOT NULL DEFAULT 0")
+        self.conn.commit()
+
+    def enqueue(self, batch_id: str, messages: List[dict], chat_ids: List[int]) -> int:
+        """
+        Store a batch and queue it for every chat
+
+        Re-enqueuing an existing batch only adds chats that are not queued
+        yet, so it is safe to call again after a crash.
+
+        Returns:
+            Number of newly queued deliveries
+        """
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO batches (batch_id, messages, created_at) VALUES (?, ?, ?)",
+                (batch_id, json.dumps(messages), time.time()),
+            )
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO deliveries (batch_id, chat_id) VALUES (?, ?)",
+                [(batch_id, chat_id) for chat_id in chat_ids],
+            )
+            return self.conn.total_changes - before
+
+    def enqueue_variants(self, batch_id: str, variants: Sequence[List[dict]], assignments: Dict[int, int]) -> int:
+        """
+        Store a batch whose chats receive different digests, unless it exists
+
+        The batch, its variants and its deliveries are written in one
+        transaction, and only if no process stored the batch first: variant
+        indexes are only meaningful within the plan that produced them, so
+        plans built by two processes (e.g. from different snapshots) must
+        never be mixed.
+
+        Args:
+            batch_id: Batch to create
+            variants: Rendered messages of each distinct digest
+            assignments: chat id -> index into `variants`
+
+        Returns:
+            Number of queued deliveries (0 if the batch already existed)
+        """
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.conn.execute("SELECT 1 FROM batches WHERE batch_id = ?", (batch_id,)).fetchone():
+                return 0
+            self.conn.execute(
+                "INSERT INTO batches (batch_id, messages, created_at) VALUES (?, ?, ?)",
+                (batch_id, json.dumps(variants[0] if variants else []), time.time()),
+            )
+            self.conn.executemany(
+                "INSERT INTO variants (batch_id, variant, messages) VALUES (?, ?, ?)",
+                [(batch_id, i, json.dumps(messages)) for i, messages in enumerate(variants)],
+            )
+            self.conn.executemany(
+                "INSERT INTO deliveries (batch_id, chat_id, variant) VALUES (?, ?, ?)",
+                [(batch_id, chat_id, variant) for chat_id, variant in assignments.items()],
+            )
+            return len(assignments)
+
+    def has_batch(self, batch_id: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return row is not None
+
+    def claim(self, batch_id: str, owner: str, ttl: float) -> bool:
+        """
+        Take (or extend) the exclusive right to deliver a batch
+
+        Only one process may send a batch at a time; a claim that is not
+        renewed within `ttl` seconds expires so another process can resume.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute(
+                "SELECT owner, expires_at FROM claims WHERE batch_id = ?", (batch_id,)
+            ).fetchone()
+            if row and row[0] != owner and row[1] > now:
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO claims (batch_id, owner, expires_at) VALUES (?, ?, ?)",
+                (batch_id, owner, now + ttl),
+            )
+            return True
+
+    def release(self, batch_id: str, owner: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM claims WHERE batch_id = ? AND owner = ?", (batch_id, owner))
+
+    def messages(self, batch_id: str, variant: int = 0) -> List[dict]:
+        row = self.conn.execute(
+            "SELECT messages FROM variants WHERE batch_id = ? AND variant = ?", (batch_id, variant)
+        ).fetchone()
+        if row is None and variant == 0:
+            # Batches queued with enqueue() have a single digest
+            row = self.conn.execute(
+                "SELECT messages FROM batches WHERE batch_id = ?", (batch_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def pending(self, batch_id: Optional[str] = None) -> List[Delivery]:
+        """Deliveries still to be sent, for one batch or for all batches"""
+        query = "SELECT batch_id, chat_id, sent, attempts, next_attempt, variant FROM deliveries WHERE status = ?"
+        params: tuple = (PENDING,)
+        if batch_id is not None:
+            query += " AND batch_id = ?"
+            params += (batch_id,)
+        return [
+            Delivery(batch, chat_id, sent, attempts, next_attempt, variant=variant)
+            for batch, chat_id, sent, attempts, next_attempt, variant in self.conn.execute(query, params)
+        ]
+
+    def save(self, deliveries: List[Delivery]):
+        """Persist progress for many deliveries in a single transaction"""
+        if not deliveries:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE deliveries SET sent = ?, attempts = ?, next_attempt = ?, status = ?, error = ? "
+                "WHERE batch_id = ? AND chat_id = ?",
+                [(d.sent, d.attempts, d.next_attempt, d.status, d.error, d.batch_id, d.chat_id)
+                 for d in deliveries],
+            )
+
+    def counts(self, batch_id: str) -> Dict[str, int]:
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) FROM deliveries WHERE batch_id = ? GROUP BY status", (batch_id,)
+        )
+        return dict(rows.fetchall())
+
+    def close(self):
+        self.conn.close()
+
+
+class DeliveryEngine:
+    """
+    Send queued batches concurrently within Telegram's rate limits
+
+    Deliveries are scheduled on a heap by the time their chat may receive
+    its next message. Each send takes a global token first, so throughput
+    approaches the global limit while no chat exceeds its own.
+    """
+
+    def __init__(
+        self,
+        bot,
+        queue: DeliveryQueue,
+        global_rate: float = GLOBAL_RATE,
+        chat_rate: float = CHAT_RATE,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        self.bot = bot
+        self.queue = queue
+        self.bucket = TokenBucket(global_rate)
+        self.chat_interval = 1.0 / chat_rate
+        self.max_in_flight = max_in_flight
+        self.max_attempts = max_attempts
+
+    def _prepare(self, messages: List[dict]) -> List[dict]:
+        """Convert stored payloads into send_message kwargs once per batch"""
+        prepared = []
+        for message in messages:
+            kwargs = dict(message)
+            if kwargs.get("reply_markup"):
+                kwargs["reply_markup"] = InlineKeyboardMarkup.de_json(kwargs["reply_markup"], self.bot)
+            prepared.append(kwargs)
+        return prepared
+
+    async def run(self, batch_id: Optional[str] = None) -> DeliveryReport:
+        """Deliver every pending message for `batch_id` (or all batches)"""
+        started = time.monotonic()
+        deliveries = self.queue.pending(batch_id)
+        report = DeliveryReport(chats=len(deliveries))
+        # Each distinct digest is prepared once, however many chats receive it
+        digests = {key: self._prepare(self.queue.messages(*key))
+                   for key in {(d.batch_id, d.variant) for d in deliveries}}
+
+        heap: list = []
+        sequence = 0
+
+        def schedule(delivery: Delivery, delay: float):
+            nonlocal sequence
+            heapq.heappush(heap, (time.monotonic() + max(0.0, delay), sequence, delivery))
+            sequence += 1
+
+        wall_now = time.time()
+        for delivery in deliveries:
+            schedule(delivery, delivery.next_attempt - wall_now)
+
+        dirty: Dict[tuple, Delivery] = {}
+        last_flush = time.monotonic()
+        in_flight: set = set()
+
+        async def send(delivery: Delivery):
+            messages = digests[(delivery.batch_id, delivery.variant)]
+            failure: Optional[Exception] = None
+            try:
+                with TELEGRAM_SEND_SECONDS.time():
+                    await self.bot.send_message(chat_id=delivery.chat_id, **messages[delivery.sent])
+            except RetryAfter as e:
+                retry_after = float(e.retry_after)
+                report.rate_limited += 1
+                TELEGRAM_SENDS.labels("rate_limited").inc()
+                self.bucket.pause(retry_after)
+                schedule(delivery, retry_after)
+                return
+            except (Forbidden, BadRequest) as e:
+                # Blocked the bot, deleted account, bad chat id: retrying won't help
+                failure = e
+            except (NetworkError, asyncio.TimeoutError) as e:
+                delivery.attempts += 1
+                if delivery.attempts >= self.max_attempts:
+                    failure = e
+                else:
+                    report.retries += 1
+                    TELEGRAM_SENDS.labels("retried").inc()
+                    backoff = 2 ** delivery.attempts
+                    delivery.next_attempt = time.time() + backoff
+                    dirty[(delivery.batch_id, delivery.chat_id)] = delivery
+                    schedule(delivery, backoff)
+                    return
+            except Exception as e:
+                failure = e
+            else:
+                report.messages_sent += 1
+                TELEGRAM_SENDS.labels("sent").inc()
+                delivery.sent += 1
+                if delivery.sent < len(messages):
+                    dirty[(delivery.batch_id, delivery.chat_id)] = delivery
+                    schedule(delivery, self.chat_interval)
+                    return
+                delivery.status, delivery.error = DELIVERED, None
+
+            # Reached a final state
+            if failure is None:
+                report.delivered += 1
+            else:
+                delivery.status, delivery.error = FAILED, str(failure)
+                error_type = type(failure).__name__
+                report.failed += 1
+                report.errors[error_type] = report.errors.get(error_type, 0) + 1
+                TELEGRAM_SENDS.labels("failed").inc()
+                TELEGRAM_FAILURES.labels(error_type).inc()
+                logger.warning(f"Digest delivery to {delivery.chat_id} failed: {error_type}: {failure}")
+            dirty[(delivery.batch_id, delivery.chat_id)] = delivery
+
+        while heap or in_flight:
+            now = time.monotonic()
+            ready = bool(heap) and heap[0][0] <= now
+            if ready and len(in_flight) < self.max_in_flight:
+                _, _, delivery = heapq.heappop(heap)
+                await self.bucket.acquire()
+                task = asyncio.create_task(send(delivery))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            else:
+                # Sleep until the next chat becomes ready or a send finishes
+                timeout = None if ready or not heap else heap[0][0] - now
+                if in_flight:
+                    await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    await asyncio.sleep(timeout)
+
+            # Group commit of progress so a restart resumes mid-batch
+            if dirty and time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                self.queue.save(list(dirty.values()))
+                dirty.clear()
+                last_flush = time.monotonic()
+
+        self.queue.save(list(dirty.values()))
+        report.elapsed = time.monotonic() - started
+        return report
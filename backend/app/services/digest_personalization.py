@@ -0,0 +1,137 @@
+"""
+Personalized daily digests, computed for every subscriber at once
+
+Subscribers pick tags and categories in the bot. At digest time the
+candidate papers (the most relevant ones today) and the subscribers'
+preferences become two binary matrices over the same tag and category
+columns. One matrix product gives how many preferences each paper matches
+for each subscriber, and a top-k per row picks their digest: papers
+matching more preferences first, then by today's relevance. Subscribers
+without preferences get the plain top-k.
+
+Subscribers with the same preferences are scored once, and identical
+results are collapsed, so each distinct digest is rendered and stored only
+once however many chats receive it.
+"""
+from dataclasses import dataclass
+from typing import Dict, List
+import os
+import numpy as np
+from app.services.paper_store import PaperStore
+from app.services.ranking import top_n
+
+# Most relevant papers considered for personalized digests
+DIGEST_CANDIDATES = int(os.getenv("DIGEST_CANDIDATES", "256"))
+# Preference profiles scored per matrix product, bounding memory to BLOCK_SIZE x candidates
+BLOCK_SIZE = 16384
+
+PREFERENCE_FIELDS = ("tags", "categories")
+
+
+@dataclass
+class DigestPlan:
+    # Store rows of each distinct digest, best first
+    digests: List[np.ndarray]
+    # Chat id -> index into digests
+    assignments: Dict[int, int]
+
+
+def match_preferences(values: List[str], vocabulary: List[str]) -> List[str]:
+    """Canonical names for user-typed values (case-insensitive); unknown values are dropped"""
+    lookup = {name.lower(): name for name in vocabulary}
+    matched = []
+    for value in values:
+        name = lookup.get(value.strip().lower())
+        if name and name not in matched:
+            matched.append(name)
+    return matched
+
+
+def _paper_matrix(store: PaperStore, rows: np.ndarray) -> np.ndarray:
+    """Candidates x (tags + categories) indicator matrix"""
+    n_tags = len(store.tag_vocab)
+    matrix = np.zeros((len(rows), n_tags + len(store.category_vocab)), dtype=np.float32)
+    for i, row in enumerate(rows):
+        matrix[i, store.tag_ids[store.tag_offsets[row]:store.tag_offsets[row + 1]]] = 1
+    matrix[np.arange(len(rows)), n_tags + store.category_ids[rows]] = 1
+    return matrix
+
+
+def _preference_matrix(store: PaperStore, subscriptions: List[dict]) -> np.ndarray:
+    """Subscribers x (tags + categories) indicator matrix, bit-packed per row"""
+    # Tags and categories may share names ("Robotics"), so each field has its own columns
+    columns = {
+        "tags": {name: i for i, name in enumerate(store.tag_vocab)},
+        "categories": {name: len(store.tag_vocab) + i for i, name in enumerate(store.category_vocab)},
+    }
+    owners: List[int] = []
+    cols: List[int] = []
+    for i, record in enumerate(subscriptions):
+        for field in PREFERENCE_FIELDS:
+            for name in record.get(field) or ():
+                column = columns[field].get(name)
+                if column is not None:
+                    owners.append(i)
+                    cols.append(column)
+    width = len(store.tag_vocab) + len(store.category_vocab)
+    matrix = np.zeros((len(subscriptions), width), dtype=bool)
+    matrix[owners, cols] = True
+    return np.packbits(matrix, axis=1)
+
+
+def _top_k(keys: np.ndarray, k: int) -> np.ndarray:
+    """Column indexes of the k largest keys of every row, largest first"""
+    if k < keys.shape[1]:
+        part = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(keys.shape[1]), keys.shape)
+    order = np.argsort(-np.take_along_axis(keys, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def plan_digests(
+    store: PaperStore,
+    relevance: np.ndarray,
+    subscriptions: Dict[str, dict],
+    k: int,
+    candidates: int = DIGEST_CANDIDATES,
+) -> DigestPlan:
+    """
+    Pick every subscriber's digest
+
+    Args:
+        store: Papers to choose from
+        relevance: Today's relevance score of every row of `store`
+        subscriptions: Subscription records keyed by user (chat) id
+        k: Papers per digest
+        candidates: How many of the most relevant papers to consider
+
+    Returns:
+        The distinct digests and which chat receives which
+    """
+    if not len(store) or not subscriptions:
+        return DigestPlan([], {})
+    rows = top_n(relevance, candidates)
+    k = min(k, len(rows))
+    papers = _paper_matrix(store, rows)
+    # Candidates are in relevance order; a bonus below 1 breaks ties between equal match counts
+    rank_bonus = (1 - np.arange(len(rows), dtype=np.float32) / len(rows)) * 0.5
+
+    chat_ids = [int(user_id) for user_id in subscriptions]
+    profiles, profile_of = np.unique(
+        _preference_matrix(store, list(subscriptions.values())), axis=0, return_inverse=True
+    )
+    profile_of = profile_of.reshape(-1)
+    preferences = np.unpackbits(profiles, axis=1, count=papers.shape[1]).astype(np.float32)
+
+    picks = np.empty((len(profiles), k), dtype=np.int64)
+    for start in range(0, len(profiles), BLOCK_SIZE):
+        block = preferences[start:start + BLOCK_SIZE]
+        picks[start:start + BLOCK_SIZE] = _top_k(block @ papers.T + rank_bonus, k)
+
+    results, digest_of = np.unique(picks, axis=0, return_inverse=True)
+    digest_of = digest_of.reshape(-1)[profile_of]
+    return DigestPlan(
+        digests=[rows[result] for result in results],
+        assignments=dict(zip(chat_ids, digest_of.tolist())),
+    )
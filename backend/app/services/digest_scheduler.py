@@ -0,0 +1,128 @@
+"""
+Daily digest scheduler
+
+Runs inside the bot process as a plain asyncio task. Once per day at
+DIGEST_TIME (UTC) it picks every subscriber's personalized digest from the
+current paper snapshot in one bulk pass, renders each distinct digest a
+single time, and queues them under a batch id derived from the date
+(`digest-YYYY-MM-DD`). Because the batch and per-chat progress live in the
+delivery queue, a restart after the scheduled time resumes the same batch
+instead of sending it twice.
+"""
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Optional
+import asyncio
+import logging
+import os
+import uuid
+from app.services.digest_delivery import DeliveryEngine, DeliveryQueue, DeliveryReport
+from app.services.digest_personalization import plan_digests
+from app.services.paper_service import get_paper_service
+from app.services.subscription_store import get_subscription_store
+
+logger = logging.getLogger(__name__)
+
+DIGEST_TIME = os.getenv("DIGEST_TIME", "09:00")
+# How late a missed digest may still be sent after the scheduled time
+DIGEST_CATCHUP_HOURS = float(os.getenv("DIGEST_CATCHUP_HOURS", "6"))
+DIGEST_SIZE = 3
+
+# Delivery claims are renewed every CLAIM_RENEW seconds and expire after CLAIM_TTL
+CLAIM_TTL = 300
+CLAIM_RENEW = 60
+
+
+def batch_id_for(day: date) -> str:
+    return f"digest-{day.isoformat()}"
+
+
+class DigestScheduler:
+    """Send the daily digest once per day at a fixed UTC time"""
+
+    def __init__(self, application, send_time: str = DIGEST_TIME, queue: Optional[DeliveryQueue] = None):
+        hour, minute = (int(part) for part in send_time.split(":"))
+        self.application = application
+        self.send_time = dt_time(hour, minute, tzinfo=timezone.utc)
+        self.queue = queue or DeliveryQueue()
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+
+    def slot(self, day: date) -> datetime:
+        return datetime.combine(day, self.send_time)
+
+    async def run_once(self, day: date) -> Optional[DeliveryReport]:
+        """
+        Deliver the digest for `day`, rendering it only if it doesn't exist yet
+
+        Safe to call repeatedly and from several processes: chats that
+        already received the batch are skipped, and only the process holding
+        the batch claim sends.
+        """
+        from app.services.telegram_bot import render_digest_messages
+
+        batch_id = batch_id_for(day)
+        if not self.queue.has_batch(batch_id):
+            paper_service = get_paper_service()
+            store = paper_service.store
+            relevance = paper_service.ranking_scores(store=store)
+            plan = plan_digests(store, relevance, get_subscription_store().all(), DIGEST_SIZE)
+            if not plan.digests:
+                logger.info("No papers or subscribers for the daily digest")
+                return None
+            variants = [render_digest_messages(store.papers(rows, relevance[rows])) for rows in plan.digests]
+            queued = self.queue.enqueue_variants(batch_id, variants, plan.assignments)
+            if queued:
+                logger.info(f"Digest {batch_id}: {len(variants)} distinct digests rendered once "
+                            f"and queued for {queued} subscribers")
+            else:
+                logger.info(f"Digest {batch_id} was queued by another process; using its plan")
+
+        if not self.queue.claim(batch_id, self.owner, CLAIM_TTL):
+            logger.info(f"Digest {batch_id} is being delivered by another process")
+            return None
+
+        renew = asyncio.create_task(self._renew_claim(batch_id))
+        try:
+            report = await DeliveryEngine(self.application.bot, self.queue).run(batch_id)
+        finally:
+            renew.cancel()
+            self.queue.release(batch_id, self.owner)
+        logger.info(f"Digest {batch_id}: {report.summary()}")
+        return report
+
+    async def _renew_claim(self, batch_id: str):
+        while True:
+            await asyncio.sleep(CLAIM_RENEW)
+            self.queue.claim(batch_id, self.owner, CLAIM_TTL)
+
+    async def _loop(self):
+        while True:
+            now = datetime.now(timezone.utc)
+            today = now.date()
+            slot = self.slot(today)
+            if now >= slot:
+                late = now - slot
+                # Always resume a batch that was started; only start a new one within the catch-up window
+                if self.queue.has_batch(batch_id_for(today)) or late <= timedelta(hours=DIGEST_CATCHUP_HOURS):
+                    try:
+                        await self.run_once(today)
+                    except Exception as e:
+                        logger.error(f"Daily digest for {today} failed: {e}")
+                next_run = self.slot(today + timedelta(days=1))
+            else:
+                next_run = slot
+            delay = (next_run - datetime.now(timezone.utc)).total_seconds()
+            logger.info(f"Next daily digest at {next_run.isoformat()}")
+            await asyncio.sleep(max(delay, 0))
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.queue.close()
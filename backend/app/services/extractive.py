@@ -0,0 +1,96 @@
+"""
+Extractive summaries with TextRank, in NumPy
+
+Used as the instant first tier of a paper's summary: sentences of the
+abstract are ranked by how similar they are to the rest of it (PageRank
+over the sentence cosine-similarity graph) and the best ones are kept, in
+their original order, within a word budget. A typical abstract takes well
+under a millisecond, against seconds per paper for BART on CPU.
+"""
+from typing import List
+import re
+import numpy as np
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\"'])")
+_WORD = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be been by can for from has have in into is it its of on or our that the their "
+    "these this those to via was we which while with without also such than then thus both each more most "
+    "not only other over under between using based show shows shown paper propose proposed present".split()
+)
+
+DAMPING = 0.85
+# Sentences this short ("Code is available online.") are only kept when nothing else is
+MIN_SENTENCE_WORDS = 6
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(" ".join(text.split())) if sentence.strip()]
+
+
+def textrank(sentences: List[str]) -> np.ndarray:
+    """
+    PageRank score of every sentence in the cosine-similarity graph of their words
+
+    Random jumps favour earlier sentences (weight 1 / position), since
+    abstracts lead with the problem and contribution.
+    """
+    tokens = [[w for w in _WORD.findall(s.lower()) if w not in STOPWORDS] for s in sentences]
+    vocabulary = {word: i for i, word in enumerate(sorted({w for words in tokens for w in words}))}
+    n = len(sentences)
+    if n < 3 or not vocabulary:
+        return np.ones(n)
+
+    counts = np.zeros((n, len(vocabulary)), dtype=np.float64)
+    for i, words in enumerate(tokens):
+        np.add.at(counts[i], [vocabulary[w] for w in words], 1)
+    # Sublinear term frequency, then cosine similarity between sentences
+    weights = np.log1p(counts)
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    weights = np.divide(weights, norms, out=np.zeros_like(weights), where=norms > 0)
+    similarity = weights @ weights.T
+    np.fill_diagonal(similarity, 0)
+
+    # Row-stochastic transitions; sentences sharing no words jump uniformly
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transitions = np.where(out_weight > 0, similarity / np.where(out_weight > 0, out_weight, 1), 1 / n)
+    teleport = 1 / np.arange(1, n + 1)
+    teleport /= teleport.sum()
+    scores = np.full(n, 1 / n)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) * teleport + DAMPING * (transitions.T @ scores)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def extractive_summary(text: str, max_words: int = 80) -> str:
+    """
+    Summarize by selecting the most central sentences
+
+    Args:
+        text: Text to summarize (an abstract)
+        max_words: Word budget; the best sentence is always kept
+
+    Returns:
+        Selected sentences in their original order
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= 1:
+        return " ".join(sentences)
+    scores = textrank(sentences)
+    chosen: List[int] = []
+    words = 0
+    # Ties go to the earlier sentence, which in abstracts tends to state the contribution
+    for index in np.argsort(-scores, kind="stable"):
+        length = len(sentences[index].split())
+        if chosen and (words + length > max_words or length < MIN_SENTENCE_WORDS):
+            continue
+        chosen.append(int(index))
+        words += length
+        if words >= max_words:
+            break
+    return " ".join(sentences[i] for i in sorted(chosen))
@@ -0,0 +1,344 @@
+"""
+Optional full-text stage: PDFs to chunked text for summaries and tags
+
+With FULLTEXT=1, ingestion downloads each new paper's PDF and extracts
+its text, so summaries and tags can draw on the whole paper instead of
+the abstract alone. Memory stays bounded however large a PDF is:
+
+- downloads share one pooled HTTP client, at most PDF_CONCURRENCY at a
+  time, and are streamed to disk in fixed-size chunks while being hashed;
+  files over PDF_MAX_BYTES are abandoned mid-download
+- extraction runs in a process pool, one page at a time straight to a
+  text file, in workers whose address space is capped at
+  FULLTEXT_WORKER_MEMORY_MB and that are replaced after a few documents
+- summaries read the text back as a bounded number of chunks spread over
+  the document (map), then summarize the chunk summaries (reduce)
+
+Extracted text is cached by the SHA-256 of the PDF in
+`data/fulltext/text/`, with an index from PDF URL to hash, so a paper is
+never downloaded or extracted twice. PDFs are deleted once extracted.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import math
+import multiprocessing
+import os
+import sqlite3
+import threading
+import uuid
+from app.services.metrics import FULLTEXT_DOCUMENTS
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data"))
+FULLTEXT_DIR = os.path.join(DATA_DIR, "fulltext")
+
+FULLTEXT_ENABLED = os.getenv("FULLTEXT", "0") == "1"
+# Download PDFs from here instead of arxiv.org (e.g. a local fake: http://127.0.0.1:8084/pdf)
+ARXIV_PDF_URL = os.getenv("ARXIV_PDF_URL", "")
+PDF_CONCURRENCY = int(os.getenv("PDF_CONCURRENCY", "4"))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(32 * 1024 * 1024)))
+PDF_TIMEOUT = 60.0
+DOWNLOAD_CHUNK = 64 * 1024
+EXTRACT_WORKERS = int(os.getenv("FULLTEXT_WORKERS", "2"))
+# Address-space cap of each extraction process (0 for no cap)
+WORKER_MEMORY_MB = int(os.getenv("FULLTEXT_WORKER_MEMORY_MB", "1024"))
+# Documents an extraction process handles before being replaced, so fragmentation cannot build up
+TASKS_PER_WORKER = 16
+# Pages extracted per paper; appendices past this are not needed for a summary
+MAX_PAGES = int(os.getenv("FULLTEXT_MAX_PAGES", "40"))
+# Words per chunk (fits the summarization model's input) and chunks summarized per paper
+CHUNK_WORDS = 600
+MAX_CHUNKS = int(os.getenv("FULLTEXT_MAX_CHUNKS", "8"))
+# Fraction of chunks a tag must appear in to be added to the abstract's tags
+TAG_CHUNK_SHARE = 0.25
+MAX_TAGS = 5
+# What Summarizer.extract_tags returns when no keyword matched
+FALLBACK_TAG = "Machine Learning"
+
+
+@dataclass(frozen=True)
+class FullText:
+    sha256: str
+    path: str
+    pages: int
+    words: int
+
+    def chunks(self, max_words: int = CHUNK_WORDS, max_chunks: int = MAX_CHUNKS) -> List[str]:
+        """
+        Up to `max_chunks` chunks of about `max_words` words, spread evenly over the text
+
+        The file is read line by line, so only the selected chunks are held in memory.
+        """
+        stride = max(1, math.ceil(math.ceil(self.words / max_words) / max_chunks))
+        selected: List[str] = []
+        words: List[str] = []
+        index = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                words.extend(line.split())
+                while len(words) >= max_words:
+                    if index % stride == 0 and len(selected) < max_chunks:
+                        selected.append(" ".join(words[:max_words]))
+                    words = words[max_words:]
+                    index += 1
+        if words and index % stride == 0 and len(selected) < max_chunks:
+            selected.append(" ".join(words))
+        return selected
+
+
+def _init_worker(memory_mb: int):
+    """Cap the extraction process's address space, turning runaway PDFs into MemoryError"""
+    if memory_mb:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _extract_text(pdf_path: str, text_path: str, max_pages: int) -> Tuple[int, int]:
+    """Worker entry point: write the text of a PDF to `text_path`; returns (pages, words)"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    pages = words = 0
+    tmp_path = f"{text_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for page in reader.pages[:max_pages]:
+            text = page.extract_text() or ""
+            out.write(text)
+            out.write("\n")
+            pages += 1
+            words += len(text.split())
+    os.replace(tmp_path, text_path)
+    return pages, words
+
+
+class FullTextStage:
+    """
+    Downloads, extracts and caches paper full texts
+
+    Args:
+        directory: Cache directory (text files, index and in-progress PDFs)
+        pdf_base_url: Replaces https://arxiv.org/pdf in PDF URLs when set
+        concurrency: PDFs downloaded or extracted at once
+        workers: Extraction processes
+    """
+
+    def __init__(self, directory: str = FULLTEXT_DIR, pdf_base_url: str = ARXIV_PDF_URL,
+                 concurrency: int = PDF_CONCURRENCY, workers: int = EXTRACT_WORKERS):
+        self.text_dir = os.path.join(directory, "text")
+        self.pdf_dir = os.path.join(directory, "pdf")
+        os.makedirs(self.text_dir, exist_ok=True)
+        os.makedirs(self.pdf_dir, exist_ok=True)
+        self.pdf_base_url = pdf_base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.workers = workers
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "url TEXT PRIMARY KEY, sha256 TEXT NOT NULL, pages INTEGER NOT NULL, words INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _text_path(self, sha256: str) -> str:
+        return os.path.join(self.text_dir, f"{sha256}.txt")
+
+    def download_url(self, pdf_url: str) -> str:
+        if not self.pdf_base_url:
+            return pdf_url
+        return f"{self.pdf_base_url}/{pdf_url.rsplit('/pdf/', 1)[-1]}"
+
+    def lookup(self, pdf_url: str) -> Optional[FullText]:
+        """Cached full text of a PDF URL, if it was extracted before and has any text"""
+        document = self._cached(pdf_url)
+        return document if document is not None and document.words else None
+
+    def _cached(self, pdf_url: str) -> Optional[FullText]:
+        """Cached extraction of a PDF URL, including textless ones (scanned PDFs)"""
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT sha256, pages, words FROM documents WHERE url = ?", (pdf_url,)
+            ).fetchone()
+        if row is None or not os.path.exists(self._text_path(row[0])):
+            return None
+        return FullText(row[0], self._text_path(row[0]), row[1], row[2])
+
+    def _record(self, pdf_url: str, document: FullText):
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (url, sha256, pages, words) VALUES (?, ?, ?, ?)",
+                (pdf_url, document.sha256, document.pages, document.words),
+            )
+            self._conn.commit()
+
+    def _content_cached(self, sha256: str) -> Optional[FullText]:
+        """Text already extracted from identical PDF bytes under another URL"""
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT pages, words FROM documents WHERE sha256 = ? LIMIT 1", (sha256,)
+            ).fetchone()
+        if row is None or not os.path.exists(self._text_path(sha256)):
+            return None
+        return FullText(sha256, self._text_path(sha256), row[0], row[1])
+
+    def _ensure_started(self):
+        if self._client is None:
+            # Imported here so the API does not load the HTTP client unless full text is enabled
+            import httpx
+            self._client = httpx.AsyncClient(
+                timeout=PDF_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # Fresh interpreters: forking the API would copy its (possibly large) address space
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(WORKER_MEMORY_MB,),
+                max_tasks_per_child=TASKS_PER_WORKER,
+            )
+
+    async def _download(self, url: str, path: str) -> Optional[str]:
+        """Stream a PDF to `path`; returns its SHA-256, or None if it is too large"""
+        digest = hashlib.sha256()
+        size = 0
+        async with self._client.stream("GET", url) as response:
+            response.raise_for_status()
+            if int(response.headers.get("content-length") or 0) > PDF_MAX_BYTES:
+                return None
+            with open(path, "wb") as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK):
+                    size += len(chunk)
+                    if size > PDF_MAX_BYTES:
+                        return None
+                    digest.update(chunk)
+                    f.write(chunk)
+        return digest.hexdigest()
+
+    async def _fetch_one(self, paper: dict, semaphore: asyncio.Semaphore) -> Optional[FullText]:
+        pdf_url = paper["pdf_url"]
+        cached = self._cached(pdf_url)
+        if cached is not None:
+            FULLTEXT_DOCUMENTS.labels("cached").inc()
+            return self._with_text(paper, cached)
+        # Bounds the PDFs on disk and in extraction, not just the downloads
+        async with semaphore:
+            pdf_path = os.path.join(self.pdf_dir, f"{uuid.uuid4().hex}.pdf")
+            try:
+                sha256 = await self._download(self.download_url(pdf_url), pdf_path)
+                if sha256 is None:
+                    print(f"⚠️  Skipping full text of {paper['arxiv_id']}: PDF over {PDF_MAX_BYTES} bytes")
+                    FULLTEXT_DOCUMENTS.labels("too_large").inc()
+                    return None
+                document = self._content_cached(sha256)
+                if document is None:
+                    loop = asyncio.get_running_loop()
+                    pages, words = await loop.run_in_executor(
+                        self._pool, _extract_text, pdf_path, self._text_path(sha256), MAX_PAGES
+                    )
+                    document = FullText(sha256, self._text_path(sha256), pages, words)
+                    FULLTEXT_DOCUMENTS.labels("extracted").inc()
+                else:
+                    FULLTEXT_DOCUMENTS.labels("cached").inc()
+                self._record(pdf_url, document)
+                return self._with_text(paper, document)
+            except Exception as e:
+                print(f"⚠️  Could not extract the full text of {paper['arxiv_id']}: {e!r}")
+                FULLTEXT_DOCUMENTS.labels("failed").inc()
+                return None
+            finally:
+                if os.path.exists(pdf_path):
+                    os.remove(pdf_path)
+
+    def _with_text(self, paper: dict, document: FullText) -> Optional[FullText]:
+        """The document, or None for a scanned or image-only PDF, so the abstract is used instead"""
+        if document.words:
+            return document
+        print(f"⚠️  No text in the PDF of {paper['arxiv_id']}; using the abstract")
+        FULLTEXT_DOCUMENTS.labels("no_text").inc()
+        return None
+
+    async def fetch(self, papers: List[dict]) -> Dict[str, FullText]:
+        """
+        Full texts of scraped papers, downloading and extracting those not cached
+
+        Args:
+            papers: Papers as returned by the scraper (arxiv_id, pdf_url)
+
+        Returns:
+            arXiv id -> full text, for the papers whose PDF could be read and has text
+        """
+        self._ensure_started()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        documents = await asyncio.gather(*(self._fetch_one(p, semaphore) for p in papers))
+        return {p["arxiv_id"]: d for p, d in zip(papers, documents) if d is not None}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._conn.close()
+
+
+def summarize_fulltext(summarizer, document: FullText) -> str:
+    """
+    Map-reduce abstractive summary of a full text; blocking
+
+    Each chunk is summarized on its own, then the chunk summaries are
+    summarized together.
+    """
+    partials = [summarizer.summarize_blocking(chunk) for chunk in document.chunks()]
+    if len(partials) == 1:
+        return partials[0]
+    return summarizer.summarize_blocking(" ".join(partials))
+
+
+async def fulltext_tags(summarizer, title: str, abstract: str, document: FullText) -> List[str]:
+    """
+    The abstract's tags, plus tags found in a good share of the full text's chunks
+
+    Keyword tags over a whole paper would match nearly everything (every
+    paper mentions images or attention somewhere), so a tag found only in
+    the body must appear in at least TAG_CHUNK_SHARE of its chunks.
+    """
+    tags = await summarizer.extract_tags(title, abstract)
+    chunks = document.chunks()
+    votes: Dict[str, int] = {}
+    for chunk in chunks:
+        for tag in await summarizer.extract_tags("", chunk):
+            if tag != FALLBACK_TAG:
+                votes[tag] = votes.get(tag, 0) + 1
+    needed = max(2, math.ceil(len(chunks) * TAG_CHUNK_SHARE))
+    # Most frequent first; ties in order of first appearance
+    extra = sorted((t for t, n in votes.items() if n >= needed and t not in tags), key=lambda t: -votes[t])
+    if tags == [FALLBACK_TAG] and extra:
+        # Only the fallback tag: the full text knows better
+        tags = []
+    return (tags + extra)[:MAX_TAGS]
+
+
+_stage: Optional[FullTextStage] = None
+
+def get_fulltext_stage() -> FullTextStage:
+    """Return the process-wide FullTextStage"""
+    global _stage
+    if _stage is None:
+        _stage = FullTextStage()
+    return _stage
+
+
+async def close_fulltext_stage():
+    """Shut down the stage's client and extraction processes, if it was started"""
+    global _stage
+    if _stage is not None:
+        await _stage.close()
+        _stage = None
@@ -0,0 +1,433 @@
+"""
+Single-flight paper ingestion
+
+Only one ingestion runs at a time. A trigger whose parameters are covered
+by the run in flight (or one already queued) attaches to it and receives
+the same result instead of fetching and summarizing the same papers again.
+Other triggers queue behind it in arrival order.
+
+Separate processes and containers sharing `data/` coordinate through an
+exclusive lock on `data/ingest.lock`, held while a run reads, updates and
+writes papers.json, so no run can overwrite another's papers.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import asyncio
+import fcntl
+import json
+import os
+import time
+import uuid
+from app.services.authors import author_key
+from app.services.fulltext import (
+    FULLTEXT_ENABLED, FullText, fulltext_tags, get_fulltext_stage, summarize_fulltext,
+)
+from app.services.metrics import INGEST_PAPERS, INGEST_RUNS, INGEST_STAGE_SECONDS, INGEST_TRIGGERS
+from app.services.paper_service import get_paper_service
+from app.services.profiling import Sampler, save_profile
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data"))
+PAPERS_FILE = os.path.join(DATA_DIR, "papers.json")
+LOCK_FILE = os.path.join(DATA_DIR, "ingest.lock")
+
+DEFAULT_CATEGORIES = ["cs.AI", "cs.LG", "cs.CV", "cs.CL"]
+# Most recent papers kept after each run (0 keeps everything; backfills require it)
+MAX_PAPERS = int(os.getenv("MAX_PAPERS", "100"))
+# Seconds between attempts to take the lock held by another process
+LOCK_POLL_INTERVAL = 0.5
+# "tiered" publishes papers with an extractive summary that the SummaryUpgrader
+# replaces in the background; "abstractive" runs the model inline
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "tiered")
+
+
+def ensure_data_dir():
+    """Ensure data directory exists"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+
+def load_papers(path: str = PAPERS_FILE):
+    """Load papers from JSON file"""
+    ensure_data_dir()
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return []
+
+
+def save_papers(papers, path: str = PAPERS_FILE):
+    """Save papers to JSON file, replacing it atomically so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(papers, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def categorize_arxiv(category_code: str) -> str:
+    """Map arXiv category codes to human-readable categories"""
+    category_map = {
+        "cs.AI": "Artificial Intelligence",
+        "cs.LG": "Machine Learning",
+        "cs.CV": "Computer Vision",
+        "cs.CL": "Natural Language Processing",
+        "cs.NE": "Neural Networks",
+        "cs.RO": "Robotics",
+        "cs.CR": "Privacy & Security",
+        "cs.DC": "Distributed Computing",
+        "cs.SE": "Software Engineering",
+    }
+    return category_map.get(category_code, "Computer Science")
+
+
+# The arXiv client is created on first ingestion so that importing the API
+# does not pull in the scraping stack
+_scraper = None
+
+def get_scraper():
+    """Return the shared ArxivScraper, importing the arXiv client on first use"""
+    global _scraper
+    if _scraper is None:
+        from app.services.scraper import ArxivScraper
+        _scraper = ArxivScraper()
+    return _scraper
+
+
+@dataclass(frozen=True)
+class IngestParams:
+    categories: Tuple[str, ...]
+    max_results: int
+    days_back: int
+
+    @classmethod
+    def create(cls, max_results: int = 20, days_back: int = 7, categories: Optional[List[str]] = None) -> "IngestParams":
+        return cls(
+            categories=tuple(sorted(set(categories or DEFAULT_CATEGORIES))),
+            max_results=max_results,
+            days_back=days_back,
+        )
+
+    def covers(self, other: "IngestParams") -> bool:
+        """Whether a run with these parameters does everything `other` asks for"""
+        return (
+            self.categories == other.categories
+            and self.max_results >= other.max_results
+            and self.days_back >= other.days_back
+        )
+
+
+class _Run:
+    def __init__(self, params: IngestParams, profile: bool = False):
+        self.id = uuid.uuid4().hex[:8]
+        self.params = params
+        self.profile = profile
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+
+
+class IngestionService:
+    """Runs ingestions one at a time, sharing results between compatible triggers"""
+
+    def __init__(self, lock_file: str = LOCK_FILE):
+        self.lock_file = lock_file
+        self._lock = asyncio.Lock()
+        self._current: Optional[_Run] = None
+        self._queued: List[_Run] = []
+
+    @property
+    def in_flight(self) -> Optional[IngestParams]:
+        return self._current.params if self._current else None
+
+    @property
+    def queued(self) -> List[IngestParams]:
+        return [run.params for run in self._queued]
+
+    async def run(self, params: IngestParams, profile: bool = False) -> dict:
+        """
+        Ingest papers, attaching to an in-flight or queued run when possible
+
+        Args:
+            params: What to fetch
+            profile: Profile the run (see app.services.profiling); ignored
+                when attaching to an existing run
+
+        Returns:
+            Result of the run that covered these parameters
+        """
+        for run in ([self._current] if self._current else []) + self._queued:
+            if run.params.covers(params):
+                print(f"🔗 Attaching to ingestion run {run.id}")
+                INGEST_TRIGGERS.labels("attached").inc()
+                # Shielded so a caller going away does not cancel the shared run
+                return dict(await asyncio.shield(run.result), attached=True)
+
+        INGEST_TRIGGERS.labels("new").inc()
+        run = _Run(params, profile)
+        self._queued.append(run)
+        run.task = asyncio.create_task(self._execute(run))
+        return dict(await asyncio.shield(run.result), attached=False)
+
+    async def _execute(self, run: _Run):
+        async with self._lock:
+            self._queued.remove(run)
+            self._current = run
+            try:
+                async with _FileLock(self.lock_file):
+                    # Started once the lock is held, so the profile covers the run rather than the wait
+                    sampler = Sampler() if run.profile else None
+                    try:
+                        result = await ingest(run.params)
+                    finally:
+                        if sampler is not None:
+                            sampler.stop()
+                if sampler is not None:
+                    name = await asyncio.to_thread(save_profile, sampler, "ingestion", f"run {run.id}")
+                    result = dict(result, profile=name)
+                run.result.set_result(dict(result, run_id=run.id))
+                INGEST_RUNS.labels("success").inc()
+            except Exception as e:
+                INGEST_RUNS.labels("error").inc()
+                run.result.set_exception(e)
+                # Callers that went away would otherwise leave it unretrieved
+                run.result.exception()
+            finally:
+                self._current = None
+
+
+class _FileLock:
+    """Exclusive flock(2), polled so waiting does not block the event loop"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._waiting = False
+
+    async def __aenter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while not self._try_lock():
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+        except BaseException:
+            os.close(self._fd)
+            raise
+        return self
+
+    def _try_lock(self) -> bool:
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if not self._waiting:
+                print("⏳ Waiting for an ingestion run in another process...")
+                self._waiting = True
+            return False
+
+    async def __aexit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+
+
+@contextmanager
+def hold_ingest_lock(path: str = LOCK_FILE):
+    """Blocking form of the ingestion lock, for command-line tools writing papers.json"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print("⏳ Waiting for an ingestion run in another process...")
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+async def ingest(params: IngestParams) -> dict:
+    """
+    Fetch papers from arXiv, generate summaries, and store them
+
+    Must run with the ingestion lock held: papers.json is read, extended
+    and written back in one step.
+    """
+    print(f"📡 Fetching papers from arXiv...")
+    print(f"   Categories: {list(params.categories)}")
+    print(f"   Days back: {params.days_back}")
+    print(f"   Max results: {params.max_results}")
+
+    # The arXiv client is synchronous; keep the event loop free while it pages
+    started = time.perf_counter()
+    raw_papers = await asyncio.to_thread(
+        get_scraper().fetch_recent_papers,
+        categories=list(params.categories),
+        max_results=params.max_results,
+        days_back=params.days_back
+    )
+    _observe_stage("fetch", time.perf_counter() - started, len(raw_papers))
+
+    if not raw_papers:
+        return {
+            "message": "No papers found",
+            "count": 0,
+            "papers": []
+        }
+
+    print(f"✅ Found {len(raw_papers)} papers")
+    print(f"🤖 Generating summaries and impact suggestions...")
+
+    # Load existing papers - read under the lock, so this includes any
+    # run that finished in another process while we were waiting
+    existing_papers = load_papers()
+    existing_ids = {p.get("arxiv_id") for p in existing_papers}
+
+    # Process papers
+    summarizer = get_paper_service().summarizer
+    tier = "extractive" if SUMMARY_MODE == "tiered" else "abstractive"
+
+    # Optional full-text stage: PDFs of the new papers, downloaded and extracted concurrently
+    fulltexts = {}
+    if FULLTEXT_ENABLED:
+        new_papers = [p for p in raw_papers if p["arxiv_id"] not in existing_ids]
+        print(f"📄 Fetching full text of {len(new_papers)} papers...")
+        started = time.perf_counter()
+        fulltexts = await get_fulltext_stage().fetch(new_papers)
+        _observe_stage("fulltext", time.perf_counter() - started, len(new_papers))
+    processed_papers = []
+    new_count = 0
+    # Per-paper stage timings, summed into per-run timings after the loop
+    stage_seconds = {"summarize": 0.0, "impact": 0.0, "tag": 0.0}
+
+    for idx, raw_paper in enumerate(raw_papers, 1):
+        arxiv_id = raw_paper["arxiv_id"]
+
+        # Skip if already processed
+        if arxiv_id in existing_ids:
+            continue
+        existing_ids.add(arxiv_id)
+
+        print(f"   [{idx}/{len(raw_papers)}] Processing: {raw_paper['title'][:50]}...")
+        paper = await process_paper(summarizer, raw_paper, stage_seconds, tier, fulltexts.get(arxiv_id))
+        processed_papers.append(paper)
+        new_count += 1
+
+    for stage, seconds in stage_seconds.items():
+        INGEST_STAGE_SECONDS.labels(stage, "run").observe(seconds)
+    INGEST_PAPERS.inc(new_count)
+
+    # Add new papers to existing ones
+    all_papers = existing_papers + processed_papers
+
+    # Sort by published date (newest first) and limit to the most recent ones
+    all_papers.sort(key=lambda p: p["published_at"], reverse=True)
+    if MAX_PAPERS:
+        all_papers = all_papers[:MAX_PAPERS]
+
+    # Save to file
+    started = time.perf_counter()
+    save_papers(all_papers)
+
+    # Publish a new snapshot; other workers switch to it within a second
+    get_paper_service().reload_papers()
+    _observe_stage("persist", time.perf_counter() - started, len(all_papers))
+
+    print(f"✅ Ingestion complete!")
+    print(f"   New papers: {new_count}")
+    print(f"   Total papers: {len(all_papers)}")
+
+    return {
+        "message": "Papers ingested successfully",
+        "new_papers": new_count,
+        "total_papers": len(all_papers),
+        "papers": processed_papers[:5]  # Return first 5 as sample
+    }
+
+
+async def process_paper(
+    summarizer,
+    raw_paper: dict,
+    stage_seconds: Optional[dict] = None,
+    tier: str = "abstractive",
+    fulltext: Optional[FullText] = None,
+) -> dict:
+    """
+    Summarize, tag and assess one scraped paper
+
+    Args:
+        summarizer: Summarizer to use
+        raw_paper: Paper as returned by the scraper
+        stage_seconds: Per-stage totals to add this paper's timings to
+        tier: "abstractive" for a model summary, "extractive" for an instant one
+            that the SummaryUpgrader replaces later
+        fulltext: Extracted full text; summaries and tags then cover the whole paper
+
+    Returns:
+        Paper record as stored in papers.json
+    """
+    if stage_seconds is None:
+        stage_seconds = {"summarize": 0.0, "impact": 0.0, "tag": 0.0}
+
+    # Generate summary
+    with INGEST_STAGE_SECONDS.labels("summarize", "paper").time() as timer:
+        if tier == "extractive":
+            summary = summarizer.summarize_extractive(raw_paper["abstract"])
+        elif fulltext is not None:
+            summary = await asyncio.to_thread(summarize_fulltext, summarizer, fulltext)
+        else:
+            summary = await summarizer.summarize(raw_paper["abstract"])
+    stage_seconds["summarize"] += timer.elapsed
+
+    # Generate impact suggestions
+    with INGEST_STAGE_SECONDS.labels("impact", "paper").time() as timer:
+        impact = await summarizer.suggest_impact(
+            raw_paper["title"],
+            raw_paper["abstract"]
+        )
+    stage_seconds["impact"] += timer.elapsed
+
+    # Extract tags from title and abstract
+    with INGEST_STAGE_SECONDS.labels("tag", "paper").time() as timer:
+        if fulltext is not None:
+            tags = await fulltext_tags(summarizer, raw_paper["title"], raw_paper["abstract"], fulltext)
+        else:
+            tags = await summarizer.extract_tags(
+                raw_paper["title"],
+                raw_paper["abstract"]
+            )
+    stage_seconds["tag"] += timer.elapsed
+
+    arxiv_id = raw_paper["arxiv_id"]
+    return {
+        "id": arxiv_id,
+        "arxiv_id": arxiv_id,
+        "title": raw_paper["title"],
+        "authors": raw_paper["authors"],
+        "author_keys": [author_key(name) for name in raw_paper["authors"]],
+        "abstract": raw_paper["abstract"],
+        "category": categorize_arxiv(raw_paper["category"]),
+        "published_at": raw_paper["published_at"],
+        "pdf_url": raw_paper["pdf_url"],
+        "summary_short": summary,
+        "summary_tier": tier,
+        "impact_suggestions": impact,
+        "tags": tags,
+        "score": raw_paper["score"]
+    }
+
+
+def _observe_stage(stage: str, seconds: float, papers: int):
+    """Record a whole-run stage, amortized over the papers it handled"""
+    INGEST_STAGE_SECONDS.labels(stage, "run").observe(seconds)
+    per_paper = INGEST_STAGE_SECONDS.labels(stage, "paper")
+    for _ in range(papers):
+        per_paper.observe(seconds / papers)
+
+
+_ingestion_service: Optional[IngestionService] = None
+
+def get_ingestion_service() -> IngestionService:
+    """Return the process-wide IngestionService"""
+    global _ingestion_service
+    if _ingestion_service is None:
+        _ingestion_service = IngestionService()
+    return _ingestion_service
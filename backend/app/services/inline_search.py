@@ -0,0 +1,193 @@
+"""
+Prefix search over titles, tags and author names, for Telegram inline queries
+
+Telegram sends an inline query on every keystroke, so lookups must take
+a few milliseconds. The index is a sorted vocabulary of lowercased terms
+plus (term, row) pairs sorted by term: every word of a query selects the
+range of terms starting with it by binary search, and the rows in that
+range are intersected across words, then ranked by today's relevance.
+
+A new snapshot does not rebuild the index from scratch: pairs of papers
+still present are remapped to their new rows, and only the papers added
+since the last snapshot are tokenized. Queries keep using the previous
+index (and the snapshot it was built from) until the update is ready.
+"""
+from typing import Iterable, List, Optional, Tuple
+import asyncio
+import re
+import numpy as np
+from app.services.paper_feed import added_rows
+from app.services.paper_store import PaperStore
+from app.services.ranking import today_ordinal, top_n
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Terms are truncated to this many bytes; longer prefixes match on their start
+MAX_TERM_BYTES = 24
+
+
+def tokenize(text: str) -> List[bytes]:
+    """Lowercased words of `text`, as truncated UTF-8 terms"""
+    return [word.encode("utf-8")[:MAX_TERM_BYTES] for word in TOKEN_PATTERN.findall(text.casefold())]
+
+
+def _paper_terms(store: PaperStore, row: int) -> Iterable[bytes]:
+    words = tokenize(store.titles[row])
+    for tag in store.tags(row):
+        words.extend(tokenize(tag))
+    for author in store.authors[row]:
+        words.extend(tokenize(author))
+    return set(words)
+
+
+class PrefixIndex:
+    """
+    Immutable term index of one snapshot
+
+    Args:
+        store: Snapshot the rows refer to
+        vocab: Sorted unique terms
+        pair_terms: Index into `vocab` of each (term, row) pair, sorted
+        pair_rows: Row of each pair
+    """
+
+    def __init__(self, store: PaperStore, vocab: np.ndarray, pair_terms: np.ndarray, pair_rows: np.ndarray):
+        self.store = store
+        self.vocab = vocab
+        self.pair_terms = pair_terms
+        self.pair_rows = pair_rows
+
+    @property
+    def version(self) -> str:
+        return self.store.version
+
+    @staticmethod
+    def _pairs(store: PaperStore, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Unsorted (term, row) pairs of some rows"""
+        terms: List[bytes] = []
+        pair_rows: List[int] = []
+        for row in rows.tolist():
+            paper_terms = _paper_terms(store, row)
+            terms.extend(paper_terms)
+            pair_rows.extend([row] * len(paper_terms))
+        return np.array(terms, dtype=f"S{MAX_TERM_BYTES}"), np.array(pair_rows, dtype=np.int32)
+
+    @classmethod
+    def _from_pairs(
+        cls, store: PaperStore, vocab: np.ndarray, pair_terms: np.ndarray, pair_rows: np.ndarray,
+        terms: np.ndarray, rows: np.ndarray,
+    ) -> "PrefixIndex":
+        """Merge new (term, row) pairs into sorted ones whose terms index `vocab`"""
+        new_vocab = np.union1d(vocab, terms)
+        # The union keeps the old terms in order, so the pairs stay sorted
+        pair_terms = np.searchsorted(new_vocab, vocab)[pair_terms].astype(np.int32)
+        term_ids = np.searchsorted(new_vocab, terms).astype(np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        term_ids, rows = term_ids[order], rows[order]
+        at = np.searchsorted(pair_terms, term_ids, side="right")
+        return cls(store, new_vocab, np.insert(pair_terms, at, term_ids), np.insert(pair_rows, at, rows))
+
+    @classmethod
+    def build(cls, store: PaperStore) -> "PrefixIndex":
+        """Index every row of a snapshot"""
+        terms, rows = cls._pairs(store, np.arange(len(store)))
+        empty = np.empty(0, dtype=np.int32)
+        return cls._from_pairs(store, np.empty(0, dtype=f"S{MAX_TERM_BYTES}"), empty, empty, terms, rows)
+
+    def updated(self, store: PaperStore) -> "PrefixIndex":
+        """Index of a newer snapshot, tokenizing only the papers added since this one"""
+        if store.version == self.version:
+            return self
+        new_rows = store.rows_of(self.store.ids)
+        keep = new_rows[self.pair_rows] >= 0
+        pair_rows = new_rows[self.pair_rows[keep]].astype(np.int32)
+        terms, rows = self._pairs(store, added_rows(self.store, store))
+        # Terms no longer used by any paper stay in the vocabulary until a rebuild; they match nothing
+        return self._from_pairs(store, self.vocab, self.pair_terms[keep], pair_rows, terms, rows)
+
+    def _prefix_mask(self, prefix: bytes) -> np.ndarray:
+        lo = np.searchsorted(self.vocab, prefix, side="left")
+        # UTF-8 never contains 0xff, so this sorts after every term starting with the prefix
+        hi = np.searchsorted(self.vocab, prefix + b"\xff", side="left")
+        start, end = np.searchsorted(self.pair_terms, [lo, hi], side="left")
+        # A mask instead of np.unique: short prefixes cover a large share of the pairs
+        mask = np.zeros(len(self.store), dtype=bool)
+        mask[self.pair_rows[start:end]] = True
+        return mask
+
+    def search(self, query: str) -> np.ndarray:
+        """Rows matching every word of `query` as a term prefix, in row order"""
+        words = set(tokenize(query))
+        if not words:
+            return np.empty(0, dtype=np.int64)
+        mask = self._prefix_mask(words.pop())
+        for word in words:
+            mask &= self._prefix_mask(word)
+        return np.flatnonzero(mask)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vocab.nbytes + self.pair_terms.nbytes + self.pair_rows.nbytes
+
+
+class InlineSearch:
+    """
+    Keeps a PrefixIndex in step with the snapshot being served
+
+    Args:
+        paper_service: Service whose store is indexed and whose ranking orders results
+    """
+
+    def __init__(self, paper_service):
+        self.paper_service = paper_service
+        self._index: Optional[PrefixIndex] = None
+        self._update: Optional[asyncio.Task] = None
+        # Today's scores of every row of the indexed snapshot
+        self._scores_key: Optional[Tuple[str, int]] = None
+        self._scores: Optional[np.ndarray] = None
+
+    async def index(self) -> PrefixIndex:
+        """The current index; a stale one while the newest snapshot is being indexed"""
+        store = self.paper_service.store
+        if self._update is None and (self._index is None or self._index.version != store.version):
+            previous = self._index
+            update = previous.updated if previous is not None else PrefixIndex.build
+            self._update = asyncio.ensure_future(asyncio.to_thread(update, store))
+            self._update.add_done_callback(self._updated)
+        if self._index is None:
+            # Nothing to serve yet: wait for the first build
+            await asyncio.shield(self._update)
+        return self._index
+
+    def _updated(self, task: asyncio.Task):
+        self._update = None
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            print(f"⚠️  Could not update the inline search index: {task.exception()}")
+            return
+        self._index = task.result()
+
+    async def search(self, query: str, limit: int) -> Tuple[PaperStore, np.ndarray, np.ndarray]:
+        """
+        The `limit` most relevant papers matching `query`
+
+        Returns:
+            The snapshot the rows refer to, the rows, most relevant first
+            (the overall top papers for an empty query), and their scores
+        """
+        index = await self.index()
+        store = index.store
+        rows = index.search(query) if query.strip() else np.arange(len(store))
+        scores = self._scores_of(store)
+        if len(rows) == 0:
+            return store, rows, scores[rows]
+        rows = rows[top_n(scores[rows], limit)]
+        return store, rows, scores[rows]
+
+    def _scores_of(self, store: PaperStore) -> np.ndarray:
+        """Scores of every row, computed once per snapshot and day rather than per keystroke"""
+        key = (store.version, today_ordinal())
+        if key != self._scores_key:
+            self._scores = self.paper_service.ranking_scores(store=store)
+            self._scores_key = key
+        return self._scores
@@ -0,0 +1,166 @@
+"""
+Process-wide model lifecycle
+
+Models are loaded by name on first use and shared by every caller in the
+process. Callers hold a model only while they use it (`with
+manager.use(name) as model:`); a model nobody has used for
+MODEL_IDLE_SECONDS is unloaded and its memory returned to the OS. API
+workers therefore hold BART only while ingestion or the summary upgrader
+needs it, instead of keeping well over 1 GB resident per worker between
+the few minutes a day it is used. The next use loads it again.
+
+Loading takes a few seconds (see techaware_model_load_seconds); set
+MODEL_IDLE_SECONDS=0 to keep models loaded for the life of the process.
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import ctypes
+import gc
+import os
+import threading
+import time
+from app.services.metrics import MODEL_LOAD_SECONDS
+
+# Seconds a model may stay unused before it is unloaded (0 keeps models loaded)
+MODEL_IDLE_SECONDS = float(os.getenv("MODEL_IDLE_SECONDS", "300"))
+
+
+def load_summarization_pipeline(name: str):
+    """HuggingFace summarization pipeline for a model name"""
+    from transformers import pipeline
+    return pipeline("summarization", model=name)
+
+
+def resident_bytes() -> Optional[int]:
+    """Resident memory of this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def model_bytes(model) -> Optional[int]:
+    """Memory held by a pipeline's weights, or None if it has no torch module"""
+    module = getattr(model, "model", None)
+    if not hasattr(module, "parameters"):
+        return None
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def _trim_heap():
+    """Hand freed heap pages back to the OS, so unloading shows in RSS (glibc only)"""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class _Entry:
+    def __init__(self, name: str):
+        self.name = name
+        self.model = None
+        self.bytes = 0
+        self.users = 0
+        self.last_used = time.monotonic()
+        # Held while loading, so concurrent first uses load the model once
+        self.load_lock = threading.Lock()
+
+
+class ModelManager:
+    """
+    Loads models by name on demand, counts their users and unloads idle ones
+
+    Args:
+        loader: Builds a model from its name
+        idle_seconds: Seconds unused before a model is unloaded (0: never)
+    """
+
+    def __init__(self, loader: Callable[[str], object] = load_summarization_pipeline,
+                 idle_seconds: float = MODEL_IDLE_SECONDS):
+        self.loader = loader
+        self.idle_seconds = idle_seconds
+        self._models: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        # Notified when a model loses its last user, to reschedule the reaper
+        self._changed = threading.Condition(self._lock)
+        self._reaper: Optional[threading.Thread] = None
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[object]:
+        """
+        The model called `name`, loaded if needed and kept loaded until the block exits
+
+        Uses may nest and run on any thread.
+        """
+        with self._lock:
+            entry = self._models.setdefault(name, _Entry(name))
+            entry.users += 1
+        try:
+            with entry.load_lock:
+                if entry.model is None:
+                    self._load(entry)
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.users -= 1
+                entry.last_used = time.monotonic()
+                if entry.users == 0:
+                    self._changed.notify()
+
+    def _load(self, entry: _Entry):
+        started = time.perf_counter()
+        rss_before = resident_bytes()
+        model = self.loader(entry.name)
+        elapsed = time.perf_counter() - started
+        size = model_bytes(model)
+        if size is None and rss_before is not None:
+            size = max(resident_bytes() - rss_before, 0)
+        MODEL_LOAD_SECONDS.labels(entry.name).set(elapsed)
+        with self._lock:
+            entry.model = model
+            entry.bytes = size or 0
+            if self.idle_seconds > 0 and self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name="model-reaper", daemon=True)
+                self._reaper.start()
+        print(f"📦 Loaded model {entry.name} ({entry.bytes / 2**20:.0f} MiB) in {elapsed:.1f}s")
+
+    def _reap(self):
+        """Unload models once idle; exits when none is loaded"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                loaded = [e for e in self._models.values() if e.model is not None]
+                idle = [e for e in loaded if e.users == 0 and now - e.last_used >= self.idle_seconds]
+                if not idle:
+                    if not loaded:
+                        self._reaper = None
+                        return
+                    due = [e.last_used + self.idle_seconds - now for e in loaded if e.users == 0]
+                    self._changed.wait(min(due) if due else None)
+                    continue
+                for entry in idle:
+                    entry.model = None
+                    del self._models[entry.name]
+            # Freed outside the lock: collecting a large model takes a moment
+            gc.collect()
+            _trim_heap()
+            for entry in idle:
+                print(f"💤 Unloaded model {entry.name} after {self.idle_seconds:.0f}s idle "
+                      f"({entry.bytes / 2**20:.0f} MiB freed)")
+
+    def stats(self) -> List[Tuple[str, int, int]]:
+        """(name, users, bytes) of each loaded model"""
+        with self._lock:
+            return [(e.name, e.users, e.bytes) for e in self._models.values() if e.model is not None]
+
+
+_model_manager: Optional[ModelManager] = None
+
+def get_model_manager() -> ModelManager:
+    """Return the process-wide ModelManager"""
+    global _model_manager
+    if _model_manager is None:
+        _model_manager = ModelManager()
+    return _model_manager
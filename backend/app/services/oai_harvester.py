@@ -0,0 +1,273 @@
+"""
+Bulk harvesting of arXiv metadata over OAI-PMH
+
+The search API behind `ArxivScraper` is rate-limited and caps deep paging,
+so historical backfills use arXiv's OAI-PMH interface instead:
+`ListRecords` pages of up to ~1000 records, chained with resumption
+tokens.
+
+Each page is streamed and parsed incrementally (`XMLPullParser`), and
+every record element is cleared once converted. Memory stays constant per
+page whatever the size of the harvest. Records are appended to a JSON
+Lines file of raw papers (same shape as `ArxivScraper` results, without
+summaries). After each page the file is synced and a checkpoint stores the
+next resumption token and the file length. An interrupted harvest resumes
+from that token after truncating the partially written page, so every
+record is written exactly once.
+"""
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, Iterator, List, Optional
+import json
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+import httpx
+
+ARXIV_OAI_URL = os.getenv("ARXIV_OAI_URL", "https://oaipmh.arxiv.org/oai")
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data"))
+HARVEST_DIR = os.path.join(DATA_DIR, "harvest")
+
+OAI = "{http://www.openarchives.org/OAI/2.0/}"
+ARXIV = "{http://arxiv.org/OAI/arXiv/}"
+
+# Retries for 503 flow control (arXiv answers with Retry-After) and network errors
+MAX_RETRIES = 8
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = re.compile(r"\s+")
+
+
+class OAIError(Exception):
+    """Error reported by the OAI-PMH server (e.g. badResumptionToken)"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+
+def _text(element: Optional[ET.Element]) -> str:
+    return _WHITESPACE.sub(" ", element.text or "").strip() if element is not None else ""
+
+
+def parse_record(record: ET.Element) -> Optional[dict]:
+    """Convert an OAI `record` in the arXiv metadata format; None for deletions"""
+    header = record.find(f"{OAI}header")
+    if header is None or header.get("status") == "deleted":
+        return None
+    meta = record.find(f"{OAI}metadata/{ARXIV}arXiv")
+    if meta is None:
+        return None
+    arxiv_id = _text(meta.find(f"{ARXIV}id"))
+    categories = _text(meta.find(f"{ARXIV}categories")).split()
+    authors = []
+    for author in meta.iterfind(f"{ARXIV}authors/{ARXIV}author"):
+        name = " ".join(filter(None, (_text(author.find(f"{ARXIV}forenames")), _text(author.find(f"{ARXIV}keyname")))))
+        if name:
+            authors.append(name)
+    return {
+        "arxiv_id": arxiv_id,
+        "title": _text(meta.find(f"{ARXIV}title")),
+        "authors": authors,
+        "abstract": _text(meta.find(f"{ARXIV}abstract")),
+        "category": categories[0] if categories else "",
+        "categories": categories,
+        "published_at": _text(meta.find(f"{ARXIV}created")),
+        "updated_at": _text(meta.find(f"{ARXIV}updated")) or None,
+        "pdf_url": f"https://arxiv.org/pdf/{arxiv_id}",
+    }
+
+
+class ListRecordsParser:
+    """
+    Incremental parser for one ListRecords response
+
+    Feed it the response body in chunks; records are yielded as soon as
+    their closing tag arrives, and the resumption token is available once
+    the body is exhausted.
+    """
+
+    def __init__(self):
+        self.resumption_token: Optional[str] = None
+        self.complete_list_size: Optional[int] = None
+        self.records_seen = 0
+
+    def records(self, chunks: Iterable[bytes]) -> Iterator[dict]:
+        parser = ET.XMLPullParser(events=("end",))
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from self._drain(parser)
+        parser.close()
+        yield from self._drain(parser)
+
+    def _drain(self, parser: ET.XMLPullParser) -> Iterator[dict]:
+        for _, element in parser.read_events():
+            tag = element.tag
+            if tag == f"{OAI}record":
+                self.records_seen += 1
+                record = parse_record(element)
+                # Drop the subtree; only the empty element stays in its parent
+                element.clear()
+                if record:
+                    yield record
+            elif tag == f"{OAI}resumptionToken":
+                self.resumption_token = (element.text or "").strip() or None
+                size = element.get("completeListSize")
+                self.complete_list_size = int(size) if size else None
+            elif tag == f"{OAI}error":
+                code = element.get("code", "error")
+                if code != "noRecordsMatch":
+                    raise OAIError(code, _text(element))
+
+
+@dataclass
+class HarvestCheckpoint:
+    set_spec: str
+    from_date: Optional[str]
+    until_date: Optional[str]
+    categories: List[str] = field(default_factory=list)
+    resumption_token: Optional[str] = None
+    # Length of the records file when the checkpoint was taken
+    offset: int = 0
+    pages: int = 0
+    records: int = 0
+    complete_list_size: Optional[int] = None
+    completed: bool = False
+
+    @classmethod
+    def load(cls, path: str) -> Optional["HarvestCheckpoint"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+class OAIHarvester:
+    """
+    Harvest arXiv records into a JSON Lines file, resumably
+
+    Args:
+        records_path: JSON Lines file the raw records are appended to
+        checkpoint_path: Where progress is recorded after every page
+        base_url: OAI-PMH endpoint
+    """
+
+    def __init__(self, records_path: str, checkpoint_path: str, base_url: str = ARXIV_OAI_URL,
+                 client: Optional[httpx.Client] = None):
+        self.records_path = records_path
+        self.checkpoint_path = checkpoint_path
+        self.base_url = base_url
+        self.client = client or httpx.Client(timeout=httpx.Timeout(60, connect=10), follow_redirects=True)
+
+    def _stream_page(self, params: dict, parser: ListRecordsParser) -> Iterator[dict]:
+        """Request one page, honouring Retry-After, and stream its records"""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with self.client.stream("GET", self.base_url, params=params) as response:
+                    if response.status_code == 503 and attempt < MAX_RETRIES:
+                        delay = float(response.headers.get("Retry-After", 2 ** attempt))
+                        print(f"⏳ OAI server busy, retrying in {delay:.0f}s...")
+                        time.sleep(delay)
+                        continue
+                    response.raise_for_status()
+                    yield from parser.records(response.iter_bytes(CHUNK_SIZE))
+                    return
+            except httpx.TransportError as e:
+                # Only safe before any record of the page was handed out
+                if parser.records_seen or attempt == MAX_RETRIES:
+                    raise
+                print(f"⚠️  OAI request failed ({e}), retrying...")
+                time.sleep(min(2 ** attempt, 60))
+        raise OAIError("unavailable", f"{self.base_url} still busy after {MAX_RETRIES} retries")
+
+    def harvest(self, set_spec: str = "cs", from_date: Optional[str] = None, until_date: Optional[str] = None,
+                categories: Optional[List[str]] = None, max_pages: Optional[int] = None) -> HarvestCheckpoint:
+        """
+        Harvest records, resuming from the checkpoint if one exists
+
+        Args:
+            set_spec: OAI set, e.g. "cs"
+            from_date: First datestamp (YYYY-MM-DD), inclusive
+            until_date: Last datestamp (YYYY-MM-DD), inclusive
+            categories: Keep only records in one of these arXiv categories
+            max_pages: Stop after this many pages (the harvest stays resumable)
+
+        Returns:
+            The final checkpoint
+        """
+        categories = sorted(categories or [])
+        checkpoint = HarvestCheckpoint.load(self.checkpoint_path)
+        if checkpoint and (checkpoint.set_spec, checkpoint.from_date, checkpoint.until_date, checkpoint.categories) \
+                != (set_spec, from_date, until_date, categories):
+            raise ValueError(f"{self.checkpoint_path} belongs to a different harvest; use another name")
+        if checkpoint is None:
+            checkpoint = HarvestCheckpoint(set_spec, from_date, until_date, categories)
+        if checkpoint.completed:
+            print(f"✅ Harvest already complete: {checkpoint.records} records")
+            return checkpoint
+        if checkpoint.pages:
+            print(f"↩️  Resuming after page {checkpoint.pages} ({checkpoint.records} records)")
+
+        wanted = set(categories)
+        os.makedirs(os.path.dirname(self.records_path) or ".", exist_ok=True)
+        with open(self.records_path, "ab") as out:
+            # Drop whatever an interrupted page wrote after the last checkpoint
+            out.truncate(checkpoint.offset)
+            out.seek(checkpoint.offset)
+
+            pages = 0
+            while max_pages is None or pages < max_pages:
+                if checkpoint.resumption_token:
+                    params = {"verb": "ListRecords", "resumptionToken": checkpoint.resumption_token}
+                else:
+                    params = {"verb": "ListRecords", "metadataPrefix": "arXiv", "set": set_spec}
+                    if from_date:
+                        params["from"] = from_date
+                    if until_date:
+                        params["until"] = until_date
+
+                parser = ListRecordsParser()
+                written = 0
+                for record in self._stream_page(params, parser):
+                    if wanted and not wanted.intersection(record["categories"]):
+                        continue
+                    out.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+                    written += 1
+                out.flush()
+                os.fsync(out.fileno())
+
+                pages += 1
+                checkpoint.pages += 1
+                checkpoint.records += written
+                checkpoint.offset = out.tell()
+                checkpoint.resumption_token = parser.resumption_token
+                checkpoint.complete_list_size = parser.complete_list_size or checkpoint.complete_list_size
+                checkpoint.completed = parser.resumption_token is None
+                checkpoint.save(self.checkpoint_path)
+
+                print(f"   Page {checkpoint.pages}: kept {written}/{parser.records_seen} records "
+                      f"({checkpoint.records} total, list size {checkpoint.complete_list_size or '?'})")
+                if checkpoint.completed:
+                    print(f"✅ Harvest complete: {checkpoint.records} records in {self.records_path}")
+                    break
+        return checkpoint
+
+
+def harvest_paths(name: str, directory: str = HARVEST_DIR) -> tuple:
+    """(records file, checkpoint file) for a named harvest"""
+    return os.path.join(directory, f"{name}.jsonl"), os.path.join(directory, f"{name}.checkpoint.json")
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Stream the raw records of a harvest"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,243 @@
+"""
+Server-sent events feed of newly published papers
+
+Every worker follows the published snapshots, so each one derives the
+feed itself: whenever its dataset changes, the papers whose ids were not
+in the previous dataset become one event, identified by the new dataset
+version. Versions sort by publication time and are the same in every
+worker, so a client reconnecting to any worker with `Last-Event-ID`
+has the events after it replayed from a bounded in-memory log. If the
+log no longer reaches back that far, the client gets a `reset` event
+and should refetch `/papers`. Events are delivered at least once; a
+client should ignore paper ids it has already seen.
+
+Subscribers do not get a queue each: they all wait on one future that
+a publish resolves, then read the new events from the shared log, so a
+publish costs the same whether 10 or 10,000 connections are idle.
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+import asyncio
+import json
+import os
+import numpy as np
+from app.services.metrics import FEED_EVENTS
+from app.services.paper_store import PaperStore
+
+# Events kept for Last-Event-ID replay
+FEED_RETENTION = int(os.getenv("FEED_RETENTION", "256"))
+# Seconds between keep-alive comments on an idle stream, so proxies keep it open
+HEARTBEAT_SECONDS = float(os.getenv("FEED_HEARTBEAT", "15"))
+# Client reconnection delay, in milliseconds
+RETRY_MS = 5000
+# Filtered encodings of an event cached for reuse by other subscribers
+MAX_ENCODINGS = 32
+
+Filter = Tuple[Optional[Tuple[str, ...]], Optional[str]]
+
+
+def added_rows(old: PaperStore, new: PaperStore) -> np.ndarray:
+    """Rows of `new` whose id is not in `old`, newest first"""
+    rows = np.flatnonzero(old.rows_of(new.ids) < 0)
+    return rows[np.argsort(-new.date_ordinals[rows], kind="stable")]
+
+
+def compact_paper(store: PaperStore, row: int) -> dict:
+    """The fields of a paper sent in feed events"""
+    return {
+        "id": store.ids[row].decode("utf-8"),
+        "arxiv_id": store.arxiv_ids[row].decode("utf-8"),
+        "title": store.titles[row],
+        "category": store.category_vocab[store.category_ids[row]],
+        "tags": store.tags(row),
+        "published_at": date.fromordinal(int(store.date_ordinals[row])).isoformat(),
+    }
+
+
+def normalize_filter(tags: Optional[List[str]], category: Optional[str]) -> Filter:
+    """Same semantics as get_papers: any of the tags, "All Categories" means none"""
+    return (
+        tuple(sorted(set(tags))) if tags else None,
+        None if category in (None, "", "All Categories") else category,
+    )
+
+
+def _format(event: str, data: str, event_id: Optional[str] = None) -> bytes:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {data}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+@dataclass
+class FeedEvent:
+    # Dataset version the papers first appeared in
+    version: str
+    # Version before it; a client that has seen this one misses nothing
+    previous: str
+    papers: List[dict]
+    _encoded: Dict[Filter, Optional[bytes]] = field(default_factory=dict)
+
+    def encode(self, wanted: Filter) -> Optional[bytes]:
+        """The SSE message for a subscriber's filter, or None if no paper matches"""
+        encoded = self._encoded.get(wanted)
+        if encoded is not None or wanted in self._encoded:
+            return encoded
+        tags, category = wanted
+        papers = [
+            p for p in self.papers
+            if (category is None or p["category"] == category)
+            and (tags is None or not set(tags).isdisjoint(p["tags"]))
+        ]
+        encoded = None
+        if papers:
+            data = json.dumps({"version": self.version, "papers": papers}, separators=(",", ":"))
+            encoded = _format("papers", data, self.version)
+        if len(self._encoded) < MAX_ENCODINGS:
+            self._encoded[wanted] = encoded
+        return encoded
+
+
+class PaperFeed:
+    """
+    Log of newly published papers, with any number of SSE subscribers
+
+    Args:
+        retention: Events kept for replay
+        heartbeat: Seconds between keep-alive comments
+    """
+
+    def __init__(self, retention: int = FEED_RETENTION, heartbeat: float = HEARTBEAT_SECONDS):
+        self.heartbeat = heartbeat
+        self._events: Deque[FeedEvent] = deque(maxlen=retention)
+        # Events appended so far; subscribers keep their position as this count
+        self._appended = 0
+        # Version up to which the log is complete (replay from older versions is impossible)
+        self._horizon: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._published: Optional[asyncio.Future] = None
+        self._pending: Optional[asyncio.Task] = None
+        self.subscribers = 0
+
+    def start(self, version: str):
+        """Start recording changes after dataset `version`, on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._published = self._loop.create_future()
+        self._horizon = version
+
+    async def stop(self):
+        """Finish recording, then end every subscriber's stream"""
+        if self._pending:
+            await asyncio.gather(self._pending, return_exceptions=True)
+        self._loop = None
+        published, self._published = self._published, None
+        if published is not None:
+            published.set_result(None)
+
+    def store_changed(self, old: PaperStore, new: PaperStore):
+        """
+        Record the papers added between two datasets; callable from any thread
+
+        The comparison runs in a thread, so switching datasets stays cheap
+        on the event loop; events are still appended in publish order.
+        """
+        loop = self._loop
+        if loop is None or old.version == new.version:
+            return
+        loop.call_soon_threadsafe(self._schedule, old, new)
+
+    def _schedule(self, old: PaperStore, new: PaperStore):
+        self._pending = asyncio.ensure_future(self._append_after(self._pending, old, new))
+
+    async def _append_after(self, previous: Optional[asyncio.Task], old: PaperStore, new: PaperStore):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            papers = await asyncio.to_thread(
+                lambda: [compact_paper(new, int(row)) for row in added_rows(old, new)]
+            )
+        except Exception as e:
+            print(f"⚠️  Could not compare dataset {old.version} with {new.version}: {e}")
+            return
+        if papers:
+            self.append(FeedEvent(new.version, old.version, papers))
+
+    def append(self, event: FeedEvent):
+        """Add an event to the log and wake every subscriber"""
+        if len(self._events) == self._events.maxlen:
+            self._horizon = self._events[0].version
+        self._events.append(event)
+        self._appended += 1
+        FEED_EVENTS.inc()
+        published, self._published = self._published, asyncio.get_running_loop().create_future()
+        if published is not None:
+            published.set_result(None)
+
+    def _latest(self) -> Optional[str]:
+        return self._events[-1].version if self._events else self._horizon
+
+    def _replay_from(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Position to stream from after `last_event_id`; None if events since then were dropped"""
+        first = self._appended - len(self._events)
+        if last_event_id is None:
+            return self._appended
+        if last_event_id == self._horizon:
+            return first
+        for i, event in enumerate(self._events):
+            if event.version == last_event_id:
+                return first + i + 1
+        if self._horizon is None or last_event_id < self._horizon:
+            return None
+        # A version this worker never saw on its own (it switched straight past it)
+        for i, event in enumerate(self._events):
+            if event.version > last_event_id:
+                return first + i
+        return self._appended
+
+    async def subscribe(
+        self,
+        tags: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        last_event_id: Optional[str] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        SSE messages for papers published from now on (or since `last_event_id`)
+
+        Args:
+            tags: Only papers with any of these tags
+            category: Only papers in this category
+            last_event_id: Last event the client received, to replay what it missed
+
+        Yields:
+            Encoded SSE messages: `papers` events, `reset` and keep-alive comments
+        """
+        wanted = normalize_filter(tags, category)
+        self.subscribers += 1
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            position = self._replay_from(last_event_id)
+            while True:
+                first = self._appended - len(self._events)
+                if position is None or position < first:
+                    # Missed events are gone from the log: the client refetches /papers,
+                    # which covers everything up to the latest version
+                    yield _format("reset", "{}", self._latest())
+                    position = self._appended
+                    continue
+                if position < self._appended:
+                    message = self._events[position - first].encode(wanted)
+                    position += 1
+                    if message is not None:
+                        yield message
+                    continue
+                published = self._published
+                if published is None:
+                    return
+                done, _ = await asyncio.wait({published}, timeout=self.heartbeat)
+                if not done:
+                    yield b": keep-alive\n\n"
+        finally:
+            self.subscribers -= 1
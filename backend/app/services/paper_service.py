@@ -1,37 +1,145 @@
-from typing import List, Optional
-from app.models.paper import Paper, PapersListResponse
-from app.services.summarizer import Summarizer
+from typing import List, Optional, Tuple
+from app.models.paper import Author, Paper, PapersListResponse
+from app.services.summarizer import Summarizer, get_summarizer
+from app.services.authors import key_prefix
+from app.services.paper_feed import PaperFeed
+from app.services.paper_store import PaperStore
+from app.services.query_cache import QUERY_CACHE_BYTES, QueryCache
+from app.services.ranking import load_weights, today_ordinal, top_n
+from app.services.snapshot import has_current_format, new_version, read_snapshot, snapshot_identity, write_snapshot
+import asyncio
+import numpy as np
 import math
 import json
 import os
 
+# Rough memory of a Paper model beyond its text, for sizing cached responses
+PAPER_OVERHEAD_BYTES = 1024
+
+
+def normalize_query(
+    search: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    category: Optional[str] = None,
+    since: Optional[str] = None,
+    sort: str = "recent",
+    page: int = 1,
+    limit: int = 10,
+) -> Tuple:
+    """
+    Canonical form of get_papers parameters; queries with the same form have the same result
+
+    Searches are case-insensitive (ASCII-only ones are lowercased here),
+    tags match any of them (order and duplicates do not matter) and
+    "All Categories" means no category filter.
+    """
+    if search and search.isascii():
+        search = search.lower()
+    return (
+        search or None,
+        tuple(sorted(set(tags))) if tags else None,
+        None if category in (None, "", "All Categories") else category,
+        since[:10] if since else None,
+        sort,
+        page,
+        limit,
+    )
+
+
+def _response_size(response: PapersListResponse) -> int:
+    """Approximate memory held by a cached response"""
+    return PAPER_OVERHEAD_BYTES + sum(
+        PAPER_OVERHEAD_BYTES + len(p.title) + len(p.abstract) + len(p.summary_short)
+        + sum(map(len, p.authors)) + sum(map(len, p.impact_suggestions))
+        for p in response.papers
+    )
+
+
 class PaperService:
-    def __init__(self):
-        self.summarizer = Summarizer()
-        self.data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+    def __init__(self, store: Optional[PaperStore] = None, query_cache_bytes: int = QUERY_CACHE_BYTES):
+        self._summarizer = None
+        self.data_dir = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data"))
         self.papers_file = os.path.join(self.data_dir, "papers.json")
+        # Binary snapshot of papers.json, memory-mapped and shared by all workers
+        self.snapshot_file = os.path.join(self.data_dir, "papers.snap")
+        self._snapshot_identity = None
+        # Relevance weights, applied at query time
+        self.ranking_weights = load_weights()
+        # get_papers results for the dataset version being served
+        self.query_cache = QueryCache("papers_query", query_cache_bytes)
+        # Newly published papers, for /papers/stream
+        self.feed = PaperFeed()
         # Load papers from file or use mock data as fallback
-        self.papers = self._load_papers()
+        self.store = store if store is not None else self._load_papers()
     
-    def _load_papers(self) -> List[Paper]:
-        """Load papers from JSON file or return mock data"""
+    @property
+    def summarizer(self) -> Summarizer:
+        """Summarizer, the process-wide one unless another was set"""
+        if self._summarizer is None:
+            self._summarizer = get_summarizer()
+        return self._summarizer
+    
+    def _load_papers(self) -> PaperStore:
+        """Load papers from the shared snapshot, publishing it from JSON if stale"""
         try:
             if os.path.exists(self.papers_file):
-                with open(self.papers_file, 'r', encoding='utf-8') as f:
-                    papers_data = json.load(f)
-                    # Convert dict to Paper objects
-                    return [Paper(**paper) for paper in papers_data]
+                if not self._snapshot_is_current():
+                    self._publish_from_json()
+                return self._load_snapshot()
         except Exception as e:
             print(f"⚠️  Could not load papers from file: {e}")
         
         # Return mock data as fallback
         print("ℹ️  Using mock data (no papers.json found)")
-        return self._get_mock_papers()
+        return PaperStore.from_records(
+            (p.model_dump() for p in self._get_mock_papers()), version="mock"
+        )
+    
+    def _snapshot_is_current(self) -> bool:
+        """Whether the snapshot was published after the last change to papers.json, in this format"""
+        try:
+            newer = os.stat(self.snapshot_file).st_mtime_ns >= os.stat(self.papers_file).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        return newer and has_current_format(self.snapshot_file)
+    
+    def _publish_from_json(self):
+        """Build the columns from papers.json and publish them as a new snapshot"""
+        with open(self.papers_file, 'r', encoding='utf-8') as f:
+            papers_data = json.load(f)
+        # Validate each record once, then keep only the columns
+        store = PaperStore.from_records(
+            (Paper(**paper).model_dump() for paper in papers_data),
+            version=new_version()
+        )
+        write_snapshot(store, self.snapshot_file)
+    
+    def _load_snapshot(self) -> PaperStore:
+        identity = snapshot_identity(self.snapshot_file)
+        store = read_snapshot(self.snapshot_file)
+        self._snapshot_identity = identity
+        return store
+    
+    @property
+    def version(self) -> str:
+        """Version of the dataset currently being served"""
+        return self.store.version
     
     def reload_papers(self):
-        """Reload papers from file"""
-        self.papers = self._load_papers()
-        print(f"✅ Reloaded {len(self.papers)} papers")
+        """Reload papers from file, publishing a new snapshot for every worker"""
+        old, self.store = self.store, self._load_papers()
+        self.feed.store_changed(old, self.store)
+        print(f"✅ Reloaded {len(self.store)} papers")
+    
+    def refresh(self) -> bool:
+        """Switch to a snapshot published by another process; returns True if switched"""
+        identity = snapshot_identity(self.snapshot_file)
+        if identity is None or identity == self._snapshot_identity:
+            return False
+        old, self.store = self.store, self._load_snapshot()
+        self.feed.store_changed(old, self.store)
+        print(f"✅ Switched to dataset version {self.store.version} ({len(self.store)} papers)")
+        return True
     
     def _get_mock_papers(self) -> List[Paper]:
         """Generate mock papers for demo"""
@@ -99,40 +207,62 @@ class PaperService:
         page: int = 1,
         limit: int = 10
     ) -> PapersListResponse:
-        """Get filtered and paginated papers"""
-        filtered_papers = self.papers.copy()
+        """Get filtered and paginated papers, from the query cache when possible"""
+        store = self.store
+        today = today_ordinal()
+        query = normalize_query(search, tags, category, since, sort, page, limit)
+
+        async def compute() -> PapersListResponse:
+            if not self.query_cache.enabled:
+                return self._query_papers(store, today, *query)
+            # Off the event loop, so other requests are served while a slow query runs
+            return await asyncio.to_thread(self._query_papers, store, today, *query)
+
+        # Returned scores are today's, so the day is part of the key
+        return await self.query_cache.get_or_compute(store.version, (today,) + query, compute, _response_size)
+
+    def _query_papers(
+        self,
+        store: PaperStore,
+        today: int,
+        search: Optional[str],
+        tags: Optional[Tuple[str, ...]],
+        category: Optional[str],
+        since: Optional[str],
+        sort: str,
+        page: int,
+        limit: int,
+    ) -> PapersListResponse:
+        """Filter, sort and paginate normalized query parameters"""
+        mask = np.ones(len(store), dtype=bool)
         
         # Apply filters
         if search:
-            search_lower = search.lower()
-            filtered_papers = [
-                p for p in filtered_papers
-                if search_lower in p.title.lower() or search_lower in p.abstract.lower()
-            ]
+            mask &= store.search_mask(search)
         
         if tags:
-            filtered_papers = [
-                p for p in filtered_papers
-                if any(tag in p.tags for tag in tags)
-            ]
+            mask &= store.tags_mask(list(tags))
         
-        if category and category != "All Categories":
-            filtered_papers = [p for p in filtered_papers if p.category == category]
+        if category:
+            mask &= store.category_mask(category)
         
-        # Sort
-        if sort == "recent":
-            filtered_papers.sort(key=lambda p: p.published_at, reverse=True)
-        elif sort == "score":
-            filtered_papers.sort(key=lambda p: p.score, reverse=True)
+        if since:
+            mask &= store.since_mask(since)
         
-        # Paginate
-        total = len(filtered_papers)
+        # Sort - relevance is scored now, only for the candidate rows
+        rows = np.flatnonzero(mask)
+        scores = store.ranking_scores(self.ranking_weights, today, rows) if sort == "score" else None
+        rows = store.order_by(rows, sort, scores)
+        
+        # Paginate - only the returned rows are materialized as Paper models
+        total = len(rows)
         pages = math.ceil(total / limit)
         start = (page - 1) * limit
         end = start + limit
+        page_rows = rows[start:end]
         
         return PapersListResponse(
-            papers=filtered_papers[start:end],
+            papers=store.papers(page_rows, store.ranking_scores(self.ranking_weights, today, page_rows)),
             total=total,
             page=page,
             limit=limit,
@@ -141,19 +271,72 @@ class PaperService:
     
     async def get_paper(self, paper_id: str) -> Paper:
         """Get a single paper by ID"""
-        for paper in self.papers:
-            if paper.id == paper_id or paper.arxiv_id == paper_id:
-                return paper
+        store = self.store
+        row = store.find(paper_id)
+        if row is not None:
+            # Today's score, as in paper lists
+            return store.paper(row, float(self.ranking_scores(np.array([row]), store)[0]))
         raise ValueError(f"Paper not found: {paper_id}")
     
+    def ranking_scores(self, rows: Optional[np.ndarray] = None, store: Optional[PaperStore] = None) -> np.ndarray:
+        """Today's relevance scores of `rows` (default: every row)"""
+        store = store if store is not None else self.store
+        return store.ranking_scores(self.ranking_weights, today_ordinal(), rows)
+    
+    def top_papers(self, n: int, store: Optional[PaperStore] = None) -> List[Paper]:
+        """The n most relevant papers as of today"""
+        store = store if store is not None else self.store
+        scores = self.ranking_scores(store=store)
+        rows = top_n(scores, n)
+        return store.papers(rows, scores[rows])
+    
     async def get_daily_top(self, n: int = 3) -> List[Paper]:
         """Get top N papers for the day"""
-        sorted_papers = sorted(self.papers, key=lambda p: p.score, reverse=True)
-        return sorted_papers[:n]
+        return self.top_papers(n)
+    
+    async def get_author_papers(self, key: str, page: int = 1, limit: int = 10) -> Optional[PapersListResponse]:
+        """An author's papers, newest first, from the author's posting list; None if the key is unknown"""
+        store = self.store
+        author = store.find_author(key)
+        if author is None:
+            return None
+        rows = store.author_rows(author)
+        page_rows = rows[(page - 1) * limit:page * limit]
+        return PapersListResponse(
+            papers=store.papers(page_rows, store.ranking_scores(self.ranking_weights, today_ordinal(), page_rows)),
+            total=len(rows),
+            page=page,
+            limit=limit,
+            pages=math.ceil(len(rows) / limit),
+        )
+    
+    async def complete_authors(self, query: str, limit: int = 10) -> List[Author]:
+        """Authors whose key starts with what `query` stands for, most prolific first"""
+        store = self.store
+        prefix = key_prefix(query)
+        if not prefix:
+            return []
+        start, end = store.author_range(prefix)
+        counts = store.author_paper_counts[start:end]
+        return [
+            Author(
+                key=store.author_keys[start + i].decode("ascii"),
+                name=store.author_name(start + i),
+                papers=int(counts[i]),
+            )
+            for i in top_n(counts, limit).tolist()
+        ]
     
     async def get_all_tags(self) -> List[str]:
         """Get all unique tags"""
-        tags = set()
-        for paper in self.papers:
-            tags.update(paper.tags)
-        return sorted(list(tags))
+        return sorted(self.store.tag_vocab)
+
+
+_paper_service: Optional[PaperService] = None
+
+def get_paper_service() -> PaperService:
+    """Return the process-wide PaperService, loading papers on first call"""
+    global _paper_service
+    if _paper_service is None:
+        _paper_service = PaperService()
+    return _paper_service
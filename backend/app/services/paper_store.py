@@ -0,0 +1,509 @@
+"""
+Columnar in-memory paper store
+
+Papers are kept as NumPy arrays instead of a list of Pydantic models:
+scores, publication dates and ranking features are numeric columns,
+categories and tags are interned to integer ids, and text fields live in
+packed UTF-8 buffers indexed by offsets. `Paper` objects are only built
+for the rows a query actually returns.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date
+import threading
+import numpy as np
+from app.models.paper import Paper
+from app.services.authors import author_key
+from app.services.ranking import RankingWeights, score_features
+
+# Where a paper's summary came from, stored as an index into this tuple:
+# an instant extractive one, upgraded in the background to an abstractive one
+SUMMARY_TIERS = ("extractive", "abstractive")
+EXTRACTIVE, ABSTRACTIVE = range(len(SUMMARY_TIERS))
+
+
+class SearchText:
+    """
+    Lowercased copy of the searchable fields of every row
+
+    Fields are joined by a unit separator and each row ends with a NUL
+    byte. Neither can occur in a query, so a match never spans two fields
+    or rows, and after a hit the scan resumes at the next row: a matching
+    row costs a single bytes.find hit.
+    """
+
+    def __init__(self, rows: Iterable[Iterable[str]]):
+        parts = [
+            "\x1f".join(field.replace("\0", " ").replace("\x1f", " ") for field in fields).lower().encode("utf-8")
+            + b"\0"
+            for fields in rows
+        ]
+        # Offset of each row in text
+        self.starts = np.zeros(len(parts) + 1, dtype=np.int64)
+        np.cumsum([len(part) for part in parts], out=self.starts[1:])
+        self.text = b"".join(parts)
+
+    def find_rows(self, query: str) -> np.ndarray:
+        """Rows containing `query`, ignoring case"""
+        needle = query.lower().encode("utf-8")
+        if not needle:
+            return np.arange(len(self.starts) - 1, dtype=np.int64)
+        if b"\0" in needle or b"\x1f" in needle:
+            return np.empty(0, dtype=np.int64)
+        find, size = self.text.find, len(needle)
+        hits = []
+        append = hits.append
+        pos = find(needle)
+        while pos != -1:
+            append(pos)
+            pos = find(needle, find(b"\0", pos + size) + 1)
+        return np.searchsorted(self.starts, np.asarray(hits, dtype=np.int64), side="right") - 1
+
+
+class StringColumn:
+    """Variable-length strings packed into one UTF-8 buffer plus an offsets array"""
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, values: Iterable[str]) -> "StringColumn":
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(buffer, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.buffer[start:end].tobytes().decode("utf-8")
+
+    def slice(self, start: int, end: int) -> List[str]:
+        return [self[i] for i in range(start, end)]
+
+    @property
+    def nbytes(self) -> int:
+        return self.buffer.nbytes + self.offsets.nbytes
+
+class StringListColumn:
+    """A list of strings per row, stored as a flat StringColumn plus row offsets"""
+
+    def __init__(self, values: StringColumn, row_offsets: np.ndarray):
+        self.values = values
+        self.row_offsets = row_offsets
+
+    @classmethod
+    def from_lists(cls, rows: Iterable[List[str]]) -> "StringListColumn":
+        flat: List[str] = []
+        counts: List[int] = []
+        for row in rows:
+            flat.extend(row)
+            counts.append(len(row))
+        row_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=row_offsets[1:])
+        return cls(StringColumn.from_strings(flat), row_offsets)
+
+    def __len__(self) -> int:
+        return len(self.row_offsets) - 1
+
+    def __getitem__(self, index: int) -> List[str]:
+        return self.values.slice(self.row_offsets[index], self.row_offsets[index + 1])
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.row_offsets.nbytes
+
+
+def _intern(values: Iterable[str], vocab: Dict[str, int]) -> List[int]:
+    ids = []
+    for value in values:
+        if value not in vocab:
+            vocab[value] = len(vocab)
+        ids.append(vocab[value])
+    return ids
+
+
+def _display_rank(name: str) -> Tuple[bool, int]:
+    return "," not in name, len(name)
+
+
+def date_to_ordinal(value: str) -> int:
+    """Convert a YYYY-MM-DD date (or ISO timestamp) into a proleptic ordinal"""
+    return date.fromisoformat(value[:10]).toordinal()
+
+
+class PaperStore:
+    """Immutable columnar snapshot of the paper corpus"""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        arxiv_ids: np.ndarray,
+        titles: StringColumn,
+        abstracts: StringColumn,
+        summaries: StringColumn,
+        pdf_urls: StringColumn,
+        authors: StringListColumn,
+        impact_suggestions: StringListColumn,
+        scores: np.ndarray,
+        date_ordinals: np.ndarray,
+        author_counts: np.ndarray,
+        abstract_lengths: np.ndarray,
+        summary_tiers: np.ndarray,
+        author_key_ids: np.ndarray,
+        author_keys: np.ndarray,
+        author_name_index: np.ndarray,
+        category_ids: np.ndarray,
+        category_vocab: List[str],
+        tag_ids: np.ndarray,
+        tag_offsets: np.ndarray,
+        tag_vocab: List[str],
+        version: str = "",
+        tag_rows: Optional[np.ndarray] = None,
+        id_order: Optional[np.ndarray] = None,
+        arxiv_id_order: Optional[np.ndarray] = None,
+        author_postings: Optional[np.ndarray] = None,
+        author_offsets: Optional[np.ndarray] = None,
+    ):
+        # Identifies the dataset snapshot; changes whenever new data is published
+        self.version = version
+        self.ids = ids
+        self.arxiv_ids = arxiv_ids
+        self.titles = titles
+        self.abstracts = abstracts
+        self.summaries = summaries
+        self.pdf_urls = pdf_urls
+        self.authors = authors
+        self.impact_suggestions = impact_suggestions
+        # Score on the day of publication; rankings use ranking_scores()
+        self.scores = scores
+        self.date_ordinals = date_ordinals
+        # Static ranking features
+        self.author_counts = author_counts
+        self.abstract_lengths = abstract_lengths
+        # Index into SUMMARY_TIERS per row
+        self.summary_tiers = summary_tiers
+        # Canonical key of each entry of authors, as an index into the sorted author_keys,
+        # and the entry of authors showing each key's name
+        self.author_key_ids = author_key_ids
+        self.author_keys = author_keys
+        self.author_name_index = author_name_index
+        self.category_ids = category_ids
+        self.category_vocab = category_vocab
+        self.tag_ids = tag_ids
+        self.tag_offsets = tag_offsets
+        self.tag_vocab = tag_vocab
+
+        self._category_lookup = {name: i for i, name in enumerate(category_vocab)}
+        self._tag_lookup = {name: i for i, name in enumerate(tag_vocab)}
+        # Indexes may come precomputed from a snapshot file so they are shared too
+        # Row owning each entry of the flat tag array, for vectorized tag filters
+        self._tag_rows = tag_rows if tag_rows is not None else np.repeat(
+            np.arange(len(self), dtype=np.int32), np.diff(tag_offsets)
+        )
+        # Sorted id indexes for O(log n) lookups without a per-paper dict
+        self._id_order = id_order if id_order is not None else np.argsort(ids, kind="stable")
+        self._arxiv_id_order = (
+            arxiv_id_order if arxiv_id_order is not None else np.argsort(arxiv_ids, kind="stable")
+        )
+        # Posting list per author key: the rows of its papers, newest first, are
+        # author_postings[author_offsets[k]:author_offsets[k + 1]]
+        if author_postings is None or author_offsets is None:
+            author_postings, author_offsets = self._author_postings()
+        self._author_postings_rows = author_postings
+        self._author_offsets = author_offsets
+        # Titles and abstracts for search_mask, built by the first search
+        self._search_text: Optional[SearchText] = None
+        self._search_lock = threading.Lock()
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], version: str = "") -> "PaperStore":
+        """Build a store from paper dictionaries (e.g. the contents of papers.json)"""
+        records = list(records)
+        category_vocab: Dict[str, int] = {}
+        tag_vocab: Dict[str, int] = {}
+
+        category_ids = _intern((r["category"] for r in records), category_vocab)
+        tag_ids: List[int] = []
+        tag_counts: List[int] = []
+        for r in records:
+            tag_ids.extend(_intern(r["tags"], tag_vocab))
+            tag_counts.append(len(r["tags"]))
+        tag_offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum(tag_counts, out=tag_offsets[1:])
+
+        # Keys come normalized from ingestion; older records get them here
+        names: List[str] = []
+        keys: List[str] = []
+        for r in records:
+            record_keys = r.get("author_keys") or []
+            # Empty keys were written for names without ASCII letters before they got hashed keys
+            if len(record_keys) != len(r["authors"]) or "" in record_keys:
+                record_keys = [author_key(name) for name in r["authors"]]
+            names.extend(r["authors"])
+            keys.extend(record_keys)
+        author_vocab, author_name_index, author_key_ids, key_counts = np.unique(
+            np.array(keys, dtype=str), return_index=True, return_inverse=True, return_counts=True
+        )
+        # Keys spelled more than one way show the most complete spelling ("Ashish Vaswani"
+        # over "A. Vaswani"), forename first ("Kaiser, Lukasz" as a last resort)
+        for i in np.flatnonzero(key_counts[author_key_ids] > 1).tolist():
+            key = author_key_ids[i]
+            if _display_rank(names[i]) > _display_rank(names[author_name_index[key]]):
+                author_name_index[key] = i
+
+        return cls(
+            ids=np.array([r["id"].encode("utf-8") for r in records], dtype=np.bytes_),
+            arxiv_ids=np.array([r["arxiv_id"].encode("utf-8") for r in records], dtype=np.bytes_),
+            titles=StringColumn.from_strings(r["title"] for r in records),
+            abstracts=StringColumn.from_strings(r["abstract"] for r in records),
+            summaries=StringColumn.from_strings(r["summary_short"] for r in records),
+            pdf_urls=StringColumn.from_strings(r["pdf_url"] for r in records),
+            authors=StringListColumn.from_lists(r["authors"] for r in records),
+            impact_suggestions=StringListColumn.from_lists(r["impact_suggestions"] for r in records),
+            scores=np.array([r["score"] for r in records], dtype=np.float64),
+            date_ordinals=np.array([date_to_ordinal(r["published_at"]) for r in records], dtype=np.int32),
+            author_counts=np.array([len(r["authors"]) for r in records], dtype=np.int32),
+            abstract_lengths=np.array([len(r["abstract"]) for r in records], dtype=np.int32),
+            summary_tiers=np.array(
+                [SUMMARY_TIERS.index(r.get("summary_tier", "abstractive")) for r in records], dtype=np.uint8
+            ),
+            author_key_ids=author_key_ids.astype(np.int32),
+            author_keys=author_vocab.astype(np.bytes_),
+            author_name_index=author_name_index.astype(np.int64),
+            category_ids=np.array(category_ids, dtype=np.int32),
+            category_vocab=list(category_vocab),
+            tag_ids=np.array(tag_ids, dtype=np.int32),
+            tag_offsets=tag_offsets,
+            tag_vocab=list(tag_vocab),
+            version=version,
+        )
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    # Serialization - flat name -> array mapping used by snapshot files
+
+    STRING_COLUMNS = ("titles", "abstracts", "summaries", "pdf_urls")
+    LIST_COLUMNS = ("authors", "impact_suggestions")
+    ARRAY_COLUMNS = (
+        "ids", "arxiv_ids", "scores", "date_ordinals", "author_counts", "abstract_lengths",
+        "summary_tiers", "author_key_ids", "author_keys", "author_name_index", "category_ids", "tag_ids", "tag_offsets",
+    )
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Every array backing the store, keyed by a stable name"""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_COLUMNS}
+        for name in self.STRING_COLUMNS:
+            column = getattr(self, name)
+            arrays[f"{name}.buffer"] = column.buffer
+            arrays[f"{name}.offsets"] = column.offsets
+        for name in self.LIST_COLUMNS:
+            column = getattr(self, name)
+            arrays[f"{name}.buffer"] = column.values.buffer
+            arrays[f"{name}.offsets"] = column.values.offsets
+            arrays[f"{name}.row_offsets"] = column.row_offsets
+        arrays["index.tag_rows"] = self._tag_rows
+        arrays["index.id_order"] = self._id_order
+        arrays["index.arxiv_id_order"] = self._arxiv_id_order
+        arrays["index.author_postings"] = self._author_postings_rows
+        arrays["index.author_offsets"] = self._author_offsets
+        return arrays
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        category_vocab: List[str],
+        tag_vocab: List[str],
+        version: str = "",
+    ) -> "PaperStore":
+        """Rebuild a store around existing arrays (e.g. views into a memory map)"""
+        columns = {name: arrays[name] for name in cls.ARRAY_COLUMNS}
+        for name in cls.STRING_COLUMNS:
+            columns[name] = StringColumn(arrays[f"{name}.buffer"], arrays[f"{name}.offsets"])
+        for name in cls.LIST_COLUMNS:
+            columns[name] = StringListColumn(
+                StringColumn(arrays[f"{name}.buffer"], arrays[f"{name}.offsets"]),
+                arrays[f"{name}.row_offsets"],
+            )
+        return cls(
+            **columns,
+            category_vocab=category_vocab,
+            tag_vocab=tag_vocab,
+            version=version,
+            tag_rows=arrays.get("index.tag_rows"),
+            id_order=arrays.get("index.id_order"),
+            arxiv_id_order=arrays.get("index.arxiv_id_order"),
+            author_postings=arrays.get("index.author_postings"),
+            author_offsets=arrays.get("index.author_offsets"),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the columns in bytes"""
+        return sum(array.nbytes for array in self.arrays().values())
+
+    # Row materialization
+
+    def tags(self, row: int) -> List[str]:
+        start, end = self.tag_offsets[row], self.tag_offsets[row + 1]
+        return [self.tag_vocab[t] for t in self.tag_ids[start:end]]
+
+    def author_keys_of(self, row: int) -> List[str]:
+        start, end = self.authors.row_offsets[row], self.authors.row_offsets[row + 1]
+        return [self.author_keys[k].decode("ascii") for k in self.author_key_ids[start:end]]
+
+    def paper(self, row: int, score: Optional[float] = None) -> Paper:
+        """Build the Pydantic model for a single row, with its ranking score if given"""
+        return Paper(
+            id=self.ids[row].decode("utf-8"),
+            arxiv_id=self.arxiv_ids[row].decode("utf-8"),
+            title=self.titles[row],
+            authors=self.authors[row],
+            author_keys=self.author_keys_of(row),
+            abstract=self.abstracts[row],
+            category=self.category_vocab[self.category_ids[row]],
+            published_at=date.fromordinal(int(self.date_ordinals[row])).isoformat(),
+            pdf_url=self.pdf_urls[row],
+            summary_short=self.summaries[row],
+            summary_tier=SUMMARY_TIERS[self.summary_tiers[row]],
+            impact_suggestions=self.impact_suggestions[row],
+            tags=self.tags(row),
+            score=float(self.scores[row] if score is None else score),
+        )
+
+    def papers(self, rows: Iterable[int], scores: Optional[np.ndarray] = None) -> List[Paper]:
+        if scores is None:
+            return [self.paper(int(row)) for row in rows]
+        return [self.paper(int(row), float(score)) for row, score in zip(rows, scores)]
+
+    def records(self) -> List[dict]:
+        """Materialize every row as a plain dictionary"""
+        return [self.paper(row).model_dump() for row in range(len(self))]
+
+    # Lookups
+
+    def _lookup(self, column: np.ndarray, order: np.ndarray, key: bytes) -> Optional[int]:
+        pos = np.searchsorted(column, key, sorter=order)
+        if pos < len(order) and column[order[pos]] == key:
+            return int(order[pos])
+        return None
+
+    def find(self, paper_id: str) -> Optional[int]:
+        """Return the row for an id or arXiv id, or None"""
+        key = paper_id.encode("utf-8")
+        row = self._lookup(self.ids, self._id_order, key)
+        if row is None:
+            row = self._lookup(self.arxiv_ids, self._arxiv_id_order, key)
+        return row
+
+    def _author_postings(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Build the per-author posting lists: rows grouped by key, newest first, without repeats"""
+        rows = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.authors.row_offsets))
+        keys = self.author_key_ids
+        order = np.lexsort((rows, -self.date_ordinals[rows], keys))
+        keys, rows = keys[order], rows[order]
+        # Two co-authors with the same key list the paper once
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1])
+        keys, rows = keys[first], rows[first]
+        offsets = np.searchsorted(keys, np.arange(len(self.author_keys) + 1)).astype(np.int64)
+        return rows, offsets
+
+    def find_author(self, key: str) -> Optional[int]:
+        """Index of an author key, or None"""
+        if not key or not key.isascii():
+            return None
+        key = key.encode("ascii")
+        i = int(np.searchsorted(self.author_keys, key))
+        return i if i < len(self.author_keys) and self.author_keys[i] == key else None
+
+    def author_range(self, prefix: str) -> Tuple[int, int]:
+        """Indexes [start, end) of the author keys starting with `prefix`"""
+        prefix = prefix.encode("ascii", "ignore")
+        # Keys are ASCII, so nothing in them sorts after 0xff
+        start, end = np.searchsorted(self.author_keys, [prefix, prefix + b"\xff"])
+        return int(start), int(end)
+
+    def author_name(self, author: int) -> str:
+        """Display name of an author key"""
+        return self.authors.values[self.author_name_index[author]]
+
+    def author_rows(self, author: int) -> np.ndarray:
+        """Rows of an author's papers, newest first"""
+        return self._author_postings_rows[self._author_offsets[author]:self._author_offsets[author + 1]]
+
+    @property
+    def author_paper_counts(self) -> np.ndarray:
+        """Papers per author key"""
+        return np.diff(self._author_offsets)
+
+    def rows_of(self, ids: np.ndarray) -> np.ndarray:
+        """Row of each paper id in `ids` (an array like `self.ids`), -1 where absent"""
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        if len(self) == 0 or len(ids) == 0:
+            return rows
+        pos = np.searchsorted(self.ids, ids, sorter=self._id_order)
+        pos[pos == len(self)] = 0
+        found = self.ids[self._id_order[pos]] == ids
+        rows[found] = self._id_order[pos[found]]
+        return rows
+
+    # Vectorized filters - each returns a boolean mask over all rows
+
+    def search_mask(self, query: str) -> np.ndarray:
+        with self._search_lock:
+            if self._search_text is None:
+                self._search_text = SearchText(
+                    (self.titles[i], self.abstracts[i]) for i in range(len(self))
+                )
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self._search_text.find_rows(query)] = True
+        return mask
+
+    def tags_mask(self, tags: List[str]) -> np.ndarray:
+        wanted = [self._tag_lookup[t] for t in tags if t in self._tag_lookup]
+        mask = np.zeros(len(self), dtype=bool)
+        if wanted:
+            mask[self._tag_rows[np.isin(self.tag_ids, wanted)]] = True
+        return mask
+
+    def category_mask(self, category: str) -> np.ndarray:
+        category_id = self._category_lookup.get(category)
+        if category_id is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.category_ids == category_id
+
+    def since_mask(self, since: str) -> np.ndarray:
+        return self.date_ordinals >= date_to_ordinal(since)
+
+    def tier_mask(self, tier: int) -> np.ndarray:
+        return self.summary_tiers == tier
+
+    # Ranking and ordering
+
+    def ranking_scores(self, weights: RankingWeights, today: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Relevance of `rows` (default: every row) as of the day `today`"""
+        if rows is None:
+            return score_features(self.date_ordinals, self.author_counts, self.abstract_lengths, today, weights)
+        return score_features(
+            self.date_ordinals[rows], self.author_counts[rows], self.abstract_lengths[rows], today, weights
+        )
+
+    def order_by(self, rows: np.ndarray, sort: str, scores: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Order candidate rows; the sort is stable so ties keep corpus order
+
+        `scores` are the ranking scores of `rows`, required for sort="score".
+        """
+        if sort == "recent":
+            keys = self.date_ordinals[rows]
+        elif sort == "score":
+            keys = scores
+        else:
+            return rows
+        return rows[np.argsort(-keys, kind="stable")]
@@ -0,0 +1,246 @@
+"""
+On-demand profiles of single requests and ingestion runs
+
+Set PROFILE_TOKEN to enable profiling. A request is then profiled when it
+sends the token in an `X-Profile-Token` header (or a `profile_token`
+query parameter), and an ingestion run when triggered with
+`profile=true`. Without PROFILE_TOKEN the middleware is not installed, so
+ordinary requests pay nothing.
+
+Profiles are sampled: a background thread records the Python stack of
+every busy thread each PROFILE_INTERVAL seconds, which costs a little
+while profiling and never changes what is measured. Threads waiting for
+work are skipped. For a request, event-loop samples are kept only while
+the request's own task is running, so concurrent requests on the same
+worker do not show up there; work it hands to threads is sampled with
+whatever else those threads run. Profiles are written to
+`data/profiles/` in the collapsed-stack format read by speedscope and
+flamegraph.pl, with a JSON file of metadata next to each one.
+"""
+from collections import Counter
+from typing import Dict, List, Optional
+import asyncio
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import parse_qsl
+from app.services.metrics import PROFILES
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data"))
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILING_ENABLED = bool(PROFILE_TOKEN)
+# Seconds between samples
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+# Profiles kept on disk; older ones are deleted
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+
+PROFILE_NAME = re.compile(r"[0-9]{8}T[0-9]{9}Z-[a-z]+-[0-9a-f]{8}")
+# Innermost frames of threads waiting for work: the event loop polling, executor and anyio workers idling
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+}
+
+
+def token_matches(token: Optional[str]) -> bool:
+    """Whether `token` is the configured PROFILE_TOKEN"""
+    # Compared as bytes: compare_digest rejects non-ASCII str
+    return PROFILING_ENABLED and token is not None and hmac.compare_digest(
+        token.encode("utf-8", "surrogateescape"), PROFILE_TOKEN.encode("utf-8", "surrogateescape")
+    )
+
+
+def _label(code) -> str:
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """
+    Samples the stacks of every thread in the process until stopped
+
+    Args:
+        task: Task whose event-loop samples are kept (default: every
+            event-loop sample)
+        interval: Seconds between samples
+    """
+
+    def __init__(self, task: Optional[asyncio.Task] = None, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = time.time()
+        self.duration = 0.0
+        # Frame of the task's outermost coroutine, on the stack whenever the task runs
+        self._root = task.get_coro().cr_frame if task is not None else None
+        self._loop_thread = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> "Sampler":
+        self._stopped.set()
+        self._thread.join()
+        self.duration = time.time() - self.started
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stack = self._stack(names.get(ident, str(ident)), ident, frame)
+                    if stack:
+                        self.stacks[stack] += 1
+            self.samples += 1
+
+    def _stack(self, thread: str, ident: int, frame) -> Optional[str]:
+        """Collapsed stack of a sampled frame, or None if the sample is not kept"""
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+            return None
+        labels = []
+        in_task = False
+        while frame is not None:
+            labels.append(_label(frame.f_code))
+            in_task = in_task or frame is self._root
+            frame = frame.f_back
+        if self._root is not None and ident == self._loop_thread and not in_task:
+            return None
+        labels.append(thread)
+        return ";".join(reversed(labels))
+
+    def collapsed(self) -> str:
+        """The samples as "frame;frame;... count" lines"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def save_profile(sampler: Sampler, kind: str, target: str, name: Optional[str] = None) -> str:
+    """
+    Write a stopped sampler's profile to PROFILE_DIR
+
+    Args:
+        sampler: Stopped sampler
+        kind: "request" or "ingestion"
+        target: What was profiled, e.g. "GET /papers"
+        name: Name reserved with new_profile_name (default: a new one)
+
+    Returns:
+        Name of the profile
+    """
+    name = name or new_profile_name(kind)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{name}.collapsed"), "w", encoding="utf-8") as f:
+        f.write(sampler.collapsed())
+    meta = {
+        "name": name,
+        "kind": kind,
+        "target": target,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(sampler.started)),
+        "duration_seconds": round(sampler.duration, 3),
+        "samples": sampler.samples,
+        "interval_seconds": sampler.interval,
+        "pid": os.getpid(),
+    }
+    # The metadata is written last: listed profiles are complete
+    with open(os.path.join(PROFILE_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    PROFILES.labels(kind).inc()
+    _prune()
+    print(f"🔬 Saved {kind} profile {name} ({target}, {sampler.duration:.2f}s)")
+    return name
+
+
+def new_profile_name(kind: str) -> str:
+    """Unique profile name, ordered by time to the millisecond"""
+    now = time.time()
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}{int(now * 1000) % 1000:03d}Z-{kind}-{uuid.uuid4().hex[:8]}"
+
+
+def _prune():
+    names = sorted(name[:-len(".json")] for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in names[:max(len(names) - PROFILE_KEEP, 0)]:
+        for suffix in (".json", ".collapsed"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[Dict]:
+    """Metadata of the saved profiles of every worker, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for file_name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, file_name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            # Pruned or being written by another worker
+            continue
+    return profiles
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Path of a saved profile's collapsed stacks, or None"""
+    if not PROFILE_NAME.fullmatch(name):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{name}.collapsed")
+    return path if os.path.exists(os.path.join(PROFILE_DIR, f"{name}.json")) else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that carry the profile token
+
+    The profile's name is returned in an `X-Profile` response header; the
+    profile is written once the response has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile-token":
+                # Header values are bytes; decoded as UTF-8 like the configured token
+                return token_matches(value.decode("utf-8", "surrogateescape"))
+        query = scope.get("query_string", b"")
+        if b"profile_token=" not in query:
+            return False
+        for key, value in parse_qsl(query.decode("latin-1")):
+            if key == "profile_token":
+                return token_matches(value)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        # Fetching profiles sends the token too; those requests are not worth profiling
+        if scope["type"] != "http" or scope["path"].startswith("/profiles") or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        name = new_profile_name("request")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"x-profile", name.encode())])
+            await send(message)
+
+        sampler = Sampler(asyncio.current_task())
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            target = f"{scope['method']} {scope['path']}"
+            await asyncio.to_thread(save_profile, sampler, "request", target, name)
@@ -0,0 +1,143 @@
+"""
+In-process LRU cache of query results
+
+The same few paper queries (the homepage default, each category tab,
+popular tags) make up most traffic. Results are cached per worker, keyed
+by the dataset version and a normalized form of the query, so publishing
+a new snapshot drops every entry at once. Memory is bounded by the
+approximate size of the cached results, evicting the least recently used.
+
+Identical queries that miss while one computation is running wait for it
+instead of computing the same result again (single-flight).
+"""
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+import asyncio
+import os
+from app.services.metrics import CACHE_REQUESTS, cache_lookup
+
+# Approximate bytes of results kept per worker (0 disables the cache)
+QUERY_CACHE_BYTES = int(os.getenv("QUERY_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+T = TypeVar("T")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    # Misses that waited for an identical computation in flight
+    coalesced: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
+
+
+class QueryCache:
+    """
+    Version-scoped LRU cache with single-flight computation
+
+    Args:
+        name: Cache name in the metrics
+        max_bytes: Bound on the summed sizes of the cached values
+    """
+
+    def __init__(self, name: str, max_bytes: int = QUERY_CACHE_BYTES):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._version: Optional[str] = None
+        self._entries: "OrderedDict[Hashable, Tuple[object, int]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._stats = CacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def stats(self) -> CacheStats:
+        return CacheStats(**dict(asdict(self._stats), entries=len(self._entries)))
+
+    def contains(self, version: str, key: Hashable) -> bool:
+        """Whether `key` is cached for dataset `version`, without counting a lookup"""
+        return version == self._version and key in self._entries
+
+    def clear(self):
+        self._entries.clear()
+        self._stats.bytes = 0
+
+    def _switch_version(self, version: str):
+        """Drop every entry computed from an older dataset"""
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+    def _store(self, key: Hashable, value: object, size: int):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._stats.bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._stats.bytes += size
+        while self._stats.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._stats.bytes -= evicted
+            self._stats.evictions += 1
+
+    async def get_or_compute(
+        self,
+        version: str,
+        key: Hashable,
+        compute: Callable[[], Awaitable[T]],
+        size: Callable[[T], int],
+    ) -> T:
+        """
+        Cached value of `key` for dataset `version`, computing it on a miss
+
+        Args:
+            version: Version of the dataset the value is computed from
+            key: Normalized query
+            compute: Produces the value; awaited once per concurrent miss
+            size: Approximate size of a value in bytes
+
+        Returns:
+            The cached or newly computed value (shared, do not mutate)
+        """
+        if not self.enabled:
+            return await compute()
+        self._switch_version(version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            cache_lookup(self.name, True)
+            return entry[0]
+
+        flight_key = (version, key)
+        pending = self._in_flight.get(flight_key)
+        if pending is not None:
+            self._stats.coalesced += 1
+            CACHE_REQUESTS.labels(self.name, "coalesced").inc()
+            # Shielded so one waiter going away does not cancel the others
+            return await asyncio.shield(pending)
+
+        self._stats.misses += 1
+        cache_lookup(self.name, False)
+        # The computation is its own task, so the caller that started it going away
+        # does not cancel it for the others
+        task = asyncio.ensure_future(compute())
+        self._in_flight[flight_key] = task
+        task.add_done_callback(lambda done: self._finish(flight_key, done, size))
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key: Tuple[str, Hashable], task: asyncio.Future, size: Callable[[object], int]):
+        del self._in_flight[flight_key]
+        # Errors are not cached; a snapshot published meanwhile means the value is already stale
+        if task.cancelled() or task.exception() is not None or flight_key[0] != self._version:
+            return
+        self._store(flight_key[1], task.result(), size(task.result()))
@@ -0,0 +1,116 @@
+"""
+Query-time paper ranking
+
+Relevance combines static features stored with each paper (publication
+date, author count, abstract length) with the current date, so it cannot
+be computed once at ingestion: a recency bonus frozen on day one would
+still rank a month-old paper as brand new. Scores are instead evaluated
+when a query asks for them, vectorized over the store's feature columns
+(about a millisecond for 100k papers), with weights from configuration:
+
+    RANKING_WEIGHTS='{"recency": 50, "recency_days": 14}'
+
+Changing the weights takes effect on restart, without re-ingesting.
+"""
+from dataclasses import dataclass, fields, replace
+from datetime import date
+from typing import Optional
+import json
+import os
+import numpy as np
+
+
+@dataclass(frozen=True)
+class RankingWeights:
+    base: float = 50.0
+    # Bonus on the day of publication, decaying linearly to 0 over recency_days
+    recency: float = 30.0
+    recency_days: float = 30.0
+    # Bonus per author, capped
+    per_author: float = 2.0
+    max_author_bonus: float = 10.0
+    # Bonus for an abstract of reasonable length (in characters), or a short one
+    abstract_in_range: float = 10.0
+    abstract_short: float = 5.0
+    abstract_min: int = 500
+    abstract_max: int = 2000
+    max_score: float = 100.0
+
+    @classmethod
+    def from_json(cls, text: str) -> "RankingWeights":
+        """Defaults overridden by a JSON object of weights"""
+        overrides = json.loads(text)
+        known = {f.name for f in fields(cls)}
+        unknown = set(overrides) - known
+        if unknown:
+            raise ValueError(f"Unknown ranking weights: {', '.join(sorted(unknown))}")
+        return replace(cls(), **{name: float(value) for name, value in overrides.items()})
+
+
+def load_weights() -> RankingWeights:
+    """Weights from the RANKING_WEIGHTS environment variable, else the defaults"""
+    text = os.getenv("RANKING_WEIGHTS")
+    return RankingWeights.from_json(text) if text else RankingWeights()
+
+
+def today_ordinal() -> int:
+    return date.today().toordinal()
+
+
+def score_features(
+    date_ordinals: np.ndarray,
+    author_counts: np.ndarray,
+    abstract_lengths: np.ndarray,
+    today: int,
+    weights: RankingWeights,
+) -> np.ndarray:
+    """
+    Relevance scores for aligned feature arrays
+
+    Args:
+        date_ordinals: Publication dates as proleptic ordinals
+        author_counts: Number of authors
+        abstract_lengths: Abstract lengths in characters
+        today: Ordinal of the day to rank for
+        weights: Ranking weights
+
+    Returns:
+        float64 scores between 0 and `weights.max_score`
+    """
+    age = today - date_ordinals.astype(np.float64)
+    scores = np.full(len(date_ordinals), weights.base)
+    if weights.recency_days > 0:
+        scores += weights.recency * np.clip(1 - age / weights.recency_days, 0, 1)
+    scores += np.minimum(weights.max_author_bonus, weights.per_author * author_counts)
+    scores += np.where(
+        abstract_lengths < weights.abstract_min,
+        weights.abstract_short,
+        np.where(abstract_lengths <= weights.abstract_max, weights.abstract_in_range, 0.0),
+    )
+    return np.clip(scores, 0, weights.max_score)
+
+
+def publication_score(author_count: int, abstract_length: int, weights: Optional[RankingWeights] = None) -> float:
+    """Score of a paper on its day of publication, stored with the record for reference"""
+    return float(score_features(
+        np.zeros(1, dtype=np.int32), np.array([author_count]), np.array([abstract_length]),
+        today=0, weights=weights or RankingWeights(),
+    )[0])
+
+
+def top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """
+    Indexes of the n highest scores, highest first, ties in index order
+
+    Selects with a partition instead of sorting every score, so picking a
+    handful out of 100k is O(n).
+    """
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    if n >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    threshold = np.partition(scores, len(scores) - n)[len(scores) - n]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:n - len(above)]
+    candidates = np.sort(np.concatenate([above, ties]))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
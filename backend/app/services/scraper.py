@@ -3,11 +3,17 @@ arXiv paper scraper service
 """
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+import os
 import arxiv
+from app.services.ranking import publication_score
 
 class ArxivScraper:
     def __init__(self):
         self.client = arxiv.Client()
+        # Point the client at another arXiv API server (e.g. the fake one in fakes/)
+        api_url = os.getenv("ARXIV_API_URL")
+        if api_url:
+            self.client.query_url_format = f"{api_url.rstrip('/')}/api/query?{{}}"
     
     def fetch_recent_papers(
         self,
@@ -63,12 +69,10 @@ class ArxivScraper:
     
     def _calculate_score(self, paper: arxiv.Result) -> float:
         """
-        Calculate relevance score for a paper
+        Relevance score of a paper on its day of publication
         
-        Simple heuristic based on:
-        - Recency (newer = higher score)
-        - Number of authors (more = slightly higher)
-        - Abstract length (reasonable length = higher)
+        Rankings are computed at query time from the stored features (see
+        app.services.ranking); this value is only kept with the record.
         
         Args:
             paper: arXiv paper result
@@ -76,25 +80,7 @@ class ArxivScraper:
         Returns:
             Score between 0-100
         """
-        score = 50.0  # Base score
-        
-        # Recency bonus (up to +30)
-        days_old = (datetime.now() - paper.published.replace(tzinfo=None)).days
-        recency_bonus = max(0, 30 - days_old)
-        score += recency_bonus
-        
-        # Author count bonus (up to +10)
-        author_bonus = min(10, len(paper.authors) * 2)
-        score += author_bonus
-        
-        # Abstract length bonus (up to +10)
-        abstract_len = len(paper.summary)
-        if 500 <= abstract_len <= 2000:
-            score += 10
-        elif abstract_len < 500:
-            score += 5
-        
-        return min(100, score)
+        return publication_score(len(paper.authors), len(paper.summary))
     
     def get_daily_top(self, n: int = 3) -> List[Dict]:
         """
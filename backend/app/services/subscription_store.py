@@ -0,0 +1,235 @@
+"""
+Subscription store
+
+Subscriptions are served from an in-memory map, so lookups never touch
+disk. Changes are applied to the map immediately and persisted to SQLite
+by a background writer that commits everything queued in the last few
+milliseconds in a single transaction (group commit). When another process
+commits to the same database the map is reloaded, so several workers
+converge on the same subscribers.
+"""
+from typing import Dict, List, Optional
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data"))
+SUBSCRIPTIONS_DB = os.path.join(DATA_DIR, "subscriptions.db")
+# Previous storage format, imported on first start
+LEGACY_SUBSCRIPTIONS_FILE = os.path.join(DATA_DIR, "subscriptions.json")
+
+# Seconds the writer waits to batch further changes into one commit
+COMMIT_DELAY = 0.05
+# Seconds between checks for commits made by other processes
+SYNC_INTERVAL = 1.0
+# Seconds before retrying a failed commit, doubling up to the maximum
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+
+
+class SubscriptionStore:
+    """In-memory subscriptions with batched SQLite persistence"""
+
+    def __init__(self, path: str = SUBSCRIPTIONS_DB, legacy_file: Optional[str] = LEGACY_SUBSCRIPTIONS_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions (user_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+        self._lock = threading.Lock()
+        # Serializes use of the SQLite connection; always taken before _lock
+        self._db_lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        # user_id -> record, or None for a pending delete
+        self._pending: Dict[str, Optional[dict]] = {}
+        self._closed = False
+
+        self._subscriptions = self._read_all()
+        if not self._subscriptions and legacy_file and os.path.exists(legacy_file):
+            self._import_legacy(legacy_file)
+        self._data_version = self._current_data_version()
+
+        self._writer = threading.Thread(target=self._run_writer, name="subscription-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # Reads - served from memory
+
+    def get(self, user_id: str) -> Optional[dict]:
+        return self._subscriptions.get(str(user_id))
+
+    def __contains__(self, user_id) -> bool:
+        return str(user_id) in self._subscriptions
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def all(self) -> Dict[str, dict]:
+        """Snapshot of all subscriptions keyed by user id"""
+        return dict(self._subscriptions)
+
+    def chat_ids(self) -> List[int]:
+        return [int(user_id) for user_id in list(self._subscriptions)]
+
+    # Writes - applied in memory, persisted by the writer thread
+
+    def add(self, user_id: str, record: dict) -> bool:
+        """Subscribe a user; returns False if they were already subscribed"""
+        user_id = str(user_id)
+        with self._lock:
+            if user_id in self._subscriptions:
+                return False
+            self._set(user_id, record)
+            return True
+
+    def update(self, user_id: str, **fields) -> Optional[dict]:
+        """Merge fields into an existing subscription"""
+        user_id = str(user_id)
+        with self._lock:
+            record = self._subscriptions.get(user_id)
+            if record is None:
+                return None
+            record = dict(record, **fields)
+            self._set(user_id, record)
+            return record
+
+    def remove(self, user_id: str) -> bool:
+        """Unsubscribe a user; returns False if they were not subscribed"""
+        user_id = str(user_id)
+        with self._lock:
+            if user_id not in self._subscriptions:
+                return False
+            del self._subscriptions[user_id]
+            self._pending[user_id] = None
+            self._wake.notify()
+            return True
+
+    def _set(self, user_id: str, record: dict):
+        self._subscriptions[user_id] = record
+        self._pending[user_id] = record
+        self._wake.notify()
+
+    # Persistence
+
+    def _read_all(self) -> Dict[str, dict]:
+        rows = self._conn.execute("SELECT user_id, data FROM subscriptions")
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    def _import_legacy(self, legacy_file: str):
+        with open(legacy_file, 'r') as f:
+            legacy = json.load(f)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO subscriptions (user_id, data) VALUES (?, ?)",
+                [(str(user_id), json.dumps(record)) for user_id, record in legacy.items()],
+            )
+        self._subscriptions = self._read_all()
+        print(f"✅ Imported {len(self._subscriptions)} subscriptions from {legacy_file}")
+
+    def _current_data_version(self) -> int:
+        # Changes whenever another connection commits to the database
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _write(self, pending: Dict[str, Optional[dict]]):
+        upserts = [(user_id, json.dumps(record)) for user_id, record in pending.items() if record is not None]
+        deletes = [(user_id,) for user_id, record in pending.items() if record is None]
+        with self._conn:
+            if upserts:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO subscriptions (user_id, data) VALUES (?, ?)", upserts
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM subscriptions WHERE user_id = ?", deletes)
+
+    def _sync_from_disk(self):
+        """Reload the map if another process committed changes"""
+        with self._db_lock:
+            version = self._current_data_version()
+            if version == self._data_version:
+                return
+            self._data_version = version
+            subscriptions = self._read_all()
+            with self._lock:
+                # Local changes not yet written still win
+                for user_id, record in self._pending.items():
+                    if record is None:
+                        subscriptions.pop(user_id, None)
+                    else:
+                        subscriptions[user_id] = record
+                self._subscriptions = subscriptions
+
+    def _run_writer(self):
+        retry_delay = RETRY_DELAY
+        while True:
+            with self._lock:
+                if not self._pending and not self._closed:
+                    self._wake.wait(timeout=SYNC_INTERVAL)
+                closed = self._closed
+            if closed:
+                # close() makes the final flush
+                return
+            if self._pending:
+                # Let concurrent changes pile up so they share one commit
+                time.sleep(COMMIT_DELAY)
+            try:
+                self.flush()
+                self._sync_from_disk()
+            except sqlite3.Error as e:
+                # The changes are pending again; keep them and retry later
+                print(f"⚠️  Could not save subscriptions, retrying in {retry_delay:.1f}s: {e}")
+                deadline = time.monotonic() + retry_delay
+                with self._lock:
+                    # New changes notify too; only close() cuts the delay short
+                    while not self._closed and time.monotonic() < deadline:
+                        self._wake.wait(timeout=deadline - time.monotonic())
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                continue
+            retry_delay = RETRY_DELAY
+
+    def flush(self):
+        """Write all pending changes in one transaction; on failure they stay pending"""
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            try:
+                self._write(pending)
+            except sqlite3.Error:
+                with self._lock:
+                    # Changes made since the swap are newer and win
+                    pending.update(self._pending)
+                    self._pending = pending
+                raise
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake.notify()
+        self._writer.join(timeout=5)
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print(f"❌ Could not save {len(self._pending)} subscription changes on close: {e}")
+        with self._db_lock:
+            self._conn.close()
+
+
+_store: Optional[SubscriptionStore] = None
+
+def get_subscription_store() -> SubscriptionStore:
+    """Return the process-wide SubscriptionStore"""
+    global _store
+    if _store is None:
+        _store = SubscriptionStore()
+    return _store
@@ -1,60 +1,143 @@
 """
 Summarization service using HuggingFace transformers
+
+The abstractive summary's length budget follows the input: abstracts are
+truncated to the model's input limit in tokens, and the summary may use
+between SUMMARY_MIN_RATIO and SUMMARY_MAX_RATIO of the input's tokens
+(within MIN_SUMMARY_TOKENS..MAX_SUMMARY_TOKENS), so an 80-word abstract is
+no longer given a 220-token budget. Beam search is set by a decoding
+preset (SUMMARY_DECODING); `python -m benchmarks.decoding` compares their
+latency and ROUGE.
+
+The model itself is held by the process-wide ModelManager, which unloads
+it when idle; Summarizer objects are cheap and share it.
 """
-from typing import List, Dict
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Optional, Tuple
+import math
 import os
+from app.services.extractive import extractive_summary
+from app.services.model_manager import get_model_manager
+
+# Default summarization model, overridable as documented in the README
+MODEL_NAME = os.getenv("MODEL_NAME", "facebook/bart-large-cnn")
+
+# Generation settings by preset name; "full-beam" matches bart-large-cnn's own configuration
+DECODING_PRESETS = {
+    "greedy": {"num_beams": 1, "no_repeat_ngram_size": 3},
+    "small-beam": {"num_beams": 2, "length_penalty": 1.0, "no_repeat_ngram_size": 3, "early_stopping": True},
+    "full-beam": {"num_beams": 4, "length_penalty": 2.0, "no_repeat_ngram_size": 3, "early_stopping": True},
+}
+SUMMARY_DECODING = os.getenv("SUMMARY_DECODING", "full-beam")
+# Summary length bounds, as a fraction of the input's tokens and in absolute tokens
+SUMMARY_MAX_RATIO = float(os.getenv("SUMMARY_MAX_RATIO", "0.6"))
+SUMMARY_MIN_RATIO = float(os.getenv("SUMMARY_MIN_RATIO", "0.2"))
+MAX_SUMMARY_TOKENS = 220
+MIN_SUMMARY_TOKENS = 50
+# Smallest budget worth generating, however short the input
+SUMMARY_TOKENS_FLOOR = 24
+# Input limit when the tokenizer does not state one
+MAX_INPUT_TOKENS = 1024
+
+
+def generation_lengths(input_tokens: int) -> Tuple[int, int]:
+    """
+    Summary length bounds for an input of `input_tokens` tokens
+
+    Returns:
+        (min_length, max_length) in tokens
+    """
+    max_length = min(MAX_SUMMARY_TOKENS, max(SUMMARY_TOKENS_FLOOR, math.ceil(input_tokens * SUMMARY_MAX_RATIO)))
+    min_length = min(MIN_SUMMARY_TOKENS, math.ceil(input_tokens * SUMMARY_MIN_RATIO), max_length // 2)
+    return min_length, max_length
+
 
 class Summarizer:
-    def __init__(self, model_name: str = "facebook/bart-large-cnn"):
+    def __init__(self, model_name: str = MODEL_NAME, decoding: str = SUMMARY_DECODING):
         """
         Initialize the summarizer with a HuggingFace model
         
         Args:
             model_name: HuggingFace model identifier
+            decoding: Name of a DECODING_PRESETS entry
         """
+        if decoding not in DECODING_PRESETS:
+            raise ValueError(f"Unknown decoding preset {decoding!r}; use one of {', '.join(DECODING_PRESETS)}")
         self.model_name = model_name
-        # Lazy loading - only load model when needed
+        self.decoding = decoding
+        # A pipeline pinned to this summarizer (e.g. a fake); None uses the shared, managed model
         self._model = None
-        self._tokenizer = None
     
-    def _load_model(self):
-        """Lazy load the model and tokenizer"""
-        if self._model is None:
-            from transformers import pipeline
-            self._model = pipeline("summarization", model=self.model_name)
+    @contextmanager
+    def model(self) -> Iterator[object]:
+        """The summarization pipeline, held loaded while the block runs"""
+        if self._model is not None:
+            yield self._model
+            return
+        with get_model_manager().use(self.model_name) as model:
+            yield model
     
     async def summarize(
         self,
         text: str,
-        max_length: int = 220,
-        min_length: int = 50
+        max_length: Optional[int] = None,
+        min_length: Optional[int] = None
     ) -> str:
         """
         Generate a short summary of the input text
         
         Args:
             text: Input text to summarize
-            max_length: Maximum length of summary
-            min_length: Minimum length of summary
+            max_length: Maximum length of summary in tokens (default: from the input's length)
+            min_length: Minimum length of summary in tokens (default: from the input's length)
             
         Returns:
             Summary string
         """
-        self._load_model()
-        
-        # Truncate input if too long
-        max_input_length = 1024
-        if len(text) > max_input_length:
-            text = text[:max_input_length]
-        
-        result = self._model(
-            text,
+        return self.summarize_blocking(text, max_length, min_length)
+
+    def summarize_blocking(self, text: str, max_length: Optional[int] = None, min_length: Optional[int] = None) -> str:
+        """Abstractive summary, computed on the calling thread (e.g. a background worker)"""
+        with self.model() as model:
+            result = model(text, **self.generation_kwargs(text, max_length, min_length))
+        return result[0]['summary_text']
+
+    def input_tokens(self, text: str) -> int:
+        """Number of tokens of `text` the model reads, after truncation to its input limit"""
+        with self.model() as model:
+            tokenizer = model.tokenizer
+            # Tokenizers without a limit report a huge sentinel value
+            limit = min(tokenizer.model_max_length, MAX_INPUT_TOKENS)
+            return len(tokenizer(text, truncation=True, max_length=limit)["input_ids"])
+
+    def generation_kwargs(
+        self, text: str, max_length: Optional[int] = None, min_length: Optional[int] = None
+    ) -> dict:
+        """Pipeline arguments for summarizing `text`: truncation, length budget and decoding preset"""
+        default_min, default_max = generation_lengths(self.input_tokens(text))
+        max_length = max_length or default_max
+        min_length = min(min_length or default_min, max_length)
+        return dict(
+            DECODING_PRESETS[self.decoding],
             max_length=max_length,
             min_length=min_length,
-            do_sample=False
+            do_sample=False,
+            # Truncate in tokens rather than characters, at the model's input limit
+            truncation=True,
         )
-        
-        return result[0]['summary_text']
+
+    def summarize_extractive(self, text: str, max_words: int = 80) -> str:
+        """
+        Instant extractive summary (TextRank over the sentences), no model needed
+
+        Args:
+            text: Input text to summarize
+            max_words: Word budget of the summary
+
+        Returns:
+            Summary string made of sentences of the input
+        """
+        return extractive_summary(text, max_words)
     
     def generate_impact_suggestions(
         self,
@@ -177,3 +260,13 @@ class Summarizer:
         
         # Limit to 5 most relevant tags
         return tags[:5] if tags else ["Machine Learning"]
+
+
+_summarizer: Optional[Summarizer] = None
+
+def get_summarizer() -> Summarizer:
+    """Return the process-wide Summarizer for MODEL_NAME and SUMMARY_DECODING"""
+    global _summarizer
+    if _summarizer is None:
+        _summarizer = Summarizer()
+    return _summarizer
@@ -0,0 +1,191 @@
+"""
+Background upgrade of extractive summaries to abstractive ones
+
+In tiered mode ingestion publishes each paper straight away with an
+extractive summary (see extractive.py) and leaves the model for later.
+The SummaryUpgrader runs in every API worker but only one process at a
+time does any work: the one holding `data/summary_upgrade.lock`. It looks
+for rows still on the extractive tier, newest papers first, runs the
+abstractive model on a dedicated low-priority thread, and publishes each
+batch of results by rewriting papers.json under the ingestion lock, so it
+never races an ingestion run. Papers that were replaced or already
+upgraded in the meantime are left alone.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+import asyncio
+import fcntl
+import os
+import threading
+import time
+import numpy as np
+from app.services.fulltext import FULLTEXT_ENABLED, get_fulltext_stage, summarize_fulltext
+from app.services.ingestion import DATA_DIR, hold_ingest_lock, load_papers, save_papers
+from app.services.metrics import INGEST_STAGE_SECONDS, SUMMARY_UPGRADES
+from app.services.paper_store import EXTRACTIVE
+
+UPGRADE_LOCK_FILE = os.path.join(DATA_DIR, "summary_upgrade.lock")
+# Papers summarized before their upgrades are published together
+UPGRADE_BATCH = int(os.getenv("SUMMARY_UPGRADE_BATCH", "8"))
+# Seconds between checks for extractive summaries when there were none
+UPGRADE_INTERVAL = float(os.getenv("SUMMARY_UPGRADE_INTERVAL", "5"))
+# Niceness of the model thread, so serving requests keeps priority over upgrades
+UPGRADE_NICENESS = int(os.getenv("SUMMARY_UPGRADE_NICENESS", "10"))
+# Seconds before a paper the model failed on is retried, doubling per failure up to the maximum
+UPGRADE_RETRY = float(os.getenv("SUMMARY_UPGRADE_RETRY", "60"))
+MAX_UPGRADE_RETRY = 3600.0
+
+
+def _lower_thread_priority():
+    """Renice the calling thread; threads the model starts from it inherit the niceness"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), UPGRADE_NICENESS)
+    except (AttributeError, OSError) as e:
+        print(f"⚠️  Summary upgrades run at normal priority: {e}")
+
+
+class SummaryUpgrader:
+    """
+    Replace extractive summaries with abstractive ones in the background
+
+    Args:
+        paper_service: Service whose store and summarizer to use
+        lock_file: Lock electing the one process that upgrades
+        batch_size: Papers summarized per publish
+        interval: Seconds to wait when there is nothing to upgrade
+    """
+
+    def __init__(self, paper_service, lock_file: str = UPGRADE_LOCK_FILE,
+                 batch_size: int = UPGRADE_BATCH, interval: float = UPGRADE_INTERVAL):
+        self.paper_service = paper_service
+        self.lock_file = lock_file
+        self.batch_size = batch_size
+        self.interval = interval
+        self._lock_fd: Optional[int] = None
+        # Papers the model failed on -> (failures, monotonic time of the next attempt)
+        self._failed: Dict[str, Tuple[int, float]] = {}
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _is_owner(self) -> bool:
+        """Take the upgrade lock if no other process holds it; kept until exit"""
+        if self._lock_fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def pending(self) -> np.ndarray:
+        """Rows still on the extractive tier, newest first"""
+        store = self.paper_service.store
+        rows = np.flatnonzero(store.tier_mask(EXTRACTIVE))
+        rows = rows[np.argsort(-store.date_ordinals[rows], kind="stable")]
+        if self._failed:
+            ids = [store.ids[row].decode("utf-8") for row in rows]
+            # Papers upgraded elsewhere or gone from the dataset are forgotten, so this stays bounded
+            self._failed = {i: self._failed[i] for i in ids if i in self._failed}
+            now = time.monotonic()
+            rows = rows[[i not in self._failed or self._failed[i][1] <= now for i in ids]]
+        return rows
+
+    def _record_failure(self, paper_id: str):
+        """Back off from a paper the model failed on, rather than retrying it in a loop"""
+        failures = self._failed.get(paper_id, (0, 0.0))[0] + 1
+        delay = min(UPGRADE_RETRY * 2 ** (failures - 1), MAX_UPGRADE_RETRY)
+        self._failed[paper_id] = (failures, time.monotonic() + delay)
+        print(f"   Retrying {paper_id} in {delay:.0f}s (failure {failures})")
+
+    def run_once(self) -> int:
+        """
+        Upgrade one batch; blocking, so it runs on the upgrade thread
+
+        Returns:
+            Number of papers upgraded (0 when idle or not the owning process)
+        """
+        if not self._is_owner():
+            return 0
+        store = self.paper_service.store
+        rows = self.pending()[:self.batch_size]
+        if not len(rows):
+            return 0
+
+        summarizer = self.paper_service.summarizer
+        summaries: Dict[str, str] = {}
+        for row in rows:
+            if self._stopping:
+                break
+            paper_id = store.ids[row].decode("utf-8")
+            started = time.perf_counter()
+            try:
+                # The full text, when the full-text stage extracted it, else the abstract
+                document = get_fulltext_stage().lookup(store.pdf_urls[row]) if FULLTEXT_ENABLED else None
+                if document is not None:
+                    summaries[paper_id] = summarize_fulltext(summarizer, document)
+                else:
+                    summaries[paper_id] = summarizer.summarize_blocking(store.abstracts[row])
+            except Exception as e:
+                print(f"⚠️  Could not upgrade the summary of {paper_id}: {e}")
+                self._record_failure(paper_id)
+                SUMMARY_UPGRADES.labels("failed").inc()
+                continue
+            self._failed.pop(paper_id, None)
+            INGEST_STAGE_SECONDS.labels("upgrade", "paper").observe(time.perf_counter() - started)
+        return self._publish(summaries) if summaries else 0
+
+    def _publish(self, summaries: Dict[str, str]) -> int:
+        """Write the new summaries into papers.json and publish a snapshot"""
+        with hold_ingest_lock():
+            papers = load_papers()
+            upgraded = 0
+            for paper in papers:
+                summary = summaries.get(paper["id"])
+                if summary is not None and paper.get("summary_tier") == "extractive":
+                    paper["summary_short"] = summary
+                    paper["summary_tier"] = "abstractive"
+                    upgraded += 1
+            if upgraded:
+                save_papers(papers)
+                self.paper_service.reload_papers()
+        SUMMARY_UPGRADES.labels("upgraded").inc(upgraded)
+        print(f"✨ Upgraded {upgraded} summaries to abstractive")
+        return upgraded
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            try:
+                upgraded = await loop.run_in_executor(self._executor, self.run_once)
+            except Exception as e:
+                print(f"⚠️  Summary upgrade failed: {e}")
+                upgraded = 0
+            if not upgraded:
+                await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="summary-upgrade", initializer=_lower_thread_priority
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop after the paper being summarized, which still publishes the batch so far"""
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._executor:
+            self._executor.shutdown(wait=False)
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
@@ -1,16 +1,31 @@
+import asyncio
 import os
 import logging
-from typing import Optional
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from telegram import (
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     ContextTypes,
+    InlineQueryHandler,
 )
-import json
-from pathlib import Path
-from app.services.paper_service import PaperService
+from app.services.paper_service import get_paper_service
+from app.services.subscription_store import get_subscription_store
+from app.services.digest_delivery import DeliveryEngine, DeliveryQueue, DeliveryReport
+from app.services.digest_scheduler import DIGEST_TIME
+from app.services.digest_personalization import match_preferences
+from app.services.inline_search import InlineSearch
+from app.services.metrics import INLINE_QUERIES, cache_lookup
+from app.services.query_cache import QueryCache
+from app.services.ranking import today_ordinal
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -18,21 +33,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Store subscriptions in a JSON file
-SUBSCRIPTIONS_FILE = Path("data/subscriptions.json")
-SUBSCRIPTIONS_FILE.parent.mkdir(exist_ok=True)
+# Read once at import; used by every keyboard and help message
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
-def load_subscriptions():
-    """Load user subscriptions from file"""
-    if SUBSCRIPTIONS_FILE.exists():
-        with open(SUBSCRIPTIONS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
 
-def save_subscriptions(subscriptions):
-    """Save user subscriptions to file"""
-    with open(SUBSCRIPTIONS_FILE, 'w') as f:
-        json.dump(subscriptions, f, indent=2)
+def delivery_time(send_time: str = DIGEST_TIME) -> str:
+    """The digest's send time as users read it, e.g. "09:00" -> "9:00 AM UTC" """
+    hour, minute = (int(part) for part in send_time.split(":"))
+    return f"{(hour - 1) % 12 + 1}:{minute:02d} {'AM' if hour < 12 else 'PM'} UTC"
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
@@ -40,7 +48,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     keyboard = [
         [InlineKeyboardButton("📬 Subscribe to Daily Digests", callback_data="subscribe")],
-        [InlineKeyboardButton("🌐 Visit TechAware", url=os.getenv("FRONTEND_URL", "http://localhost:3000"))],
+        [InlineKeyboardButton("🌐 Visit TechAware", url=FRONTEND_URL)],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
@@ -69,26 +77,23 @@ async def subscribe_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
     
     user_id = str(query.from_user.id)
-    subscriptions = load_subscriptions()
+    subscribed = get_subscription_store().add(user_id, {
+        "user_id": user_id,
+        "username": query.from_user.username,
+        "first_name": query.from_user.first_name,
+        "subscribed_at": str(update.effective_message.date)
+    })
     
-    if user_id in subscriptions:
+    if not subscribed:
         await query.edit_message_text(
             "✅ You're already subscribed to daily digests!\n\n"
-            "You'll receive curated research papers every day at 9:00 AM UTC.\n\n"
+            f"You'll receive curated research papers every day at {delivery_time()}.\n\n"
             "Use /unsubscribe to stop receiving digests."
         )
     else:
-        subscriptions[user_id] = {
-            "user_id": user_id,
-            "username": query.from_user.username,
-            "first_name": query.from_user.first_name,
-            "subscribed_at": str(update.effective_message.date)
-        }
-        save_subscriptions(subscriptions)
-        
         await query.edit_message_text(
             "🎉 Successfully subscribed!\n\n"
-            "You'll now receive daily digests of breakthrough research papers at 9:00 AM UTC.\n\n"
+            f"You'll now receive daily digests of breakthrough research papers at {delivery_time()}.\n\n"
             "Each digest includes:\n"
             "• AI-generated summaries\n"
             "• Key findings and impact\n"
@@ -99,11 +104,8 @@ async def subscribe_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /unsubscribe command"""
     user_id = str(update.effective_user.id)
-    subscriptions = load_subscriptions()
     
-    if user_id in subscriptions:
-        del subscriptions[user_id]
-        save_subscriptions(subscriptions)
+    if get_subscription_store().remove(user_id):
         await update.message.reply_text(
             "😢 You've been unsubscribed from daily digests.\n\n"
             "We're sorry to see you go! You can resubscribe anytime with /start."
@@ -121,6 +123,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 /start - Subscribe to daily research digests
 /papers [n] - Show top relevant papers (default: 3, max: 5)
+/tags [tag, ...] - Choose the tags your digest favours
+/categories [category, ...] - Choose the categories your digest favours
 /unsubscribe - Stop receiving daily digests
 /help - Show this help message
 /status - Check your subscription status
@@ -129,25 +133,28 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 TechAware helps you stay aware of emerging advances in AI, software engineering, and data science. Get AI-powered summaries of the latest research papers delivered daily.
 
 💡 Try `/papers` to see today's most relevant research papers with summaries and probable applications!
+🔎 Type @{username} followed by a few words in any chat to search papers by title, tag or author.
 
 Visit our website: {website}
-""".format(website=os.getenv("FRONTEND_URL", "http://localhost:3000"))
+""".format(website=FRONTEND_URL, username=context.bot.username)
     
     await update.message.reply_text(help_text)
 
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /status command"""
     user_id = str(update.effective_user.id)
-    subscriptions = load_subscriptions()
+    sub_info = get_subscription_store().get(user_id)
     
-    if user_id in subscriptions:
-        sub_info = subscriptions[user_id]
+    if sub_info:
         await update.message.reply_text(
             f"✅ Subscription Status: Active\n\n"
             f"Subscribed since: {sub_info['subscribed_at']}\n"
             f"Daily digests: Enabled\n"
-            f"Delivery time: 9:00 AM UTC\n\n"
-            f"Use /unsubscribe to stop receiving digests."
+            f"Delivery time: {delivery_time()}\n"
+            f"Tags: {', '.join(sub_info.get('tags') or []) or 'any'}\n"
+            f"Categories: {', '.join(sub_info.get('categories') or []) or 'any'}\n\n"
+            f"Use /tags and /categories to personalize your digest, "
+            f"or /unsubscribe to stop receiving digests."
         )
     else:
         await update.message.reply_text(
@@ -155,6 +162,85 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Use /start to subscribe to daily research digests!"
         )
 
+async def _set_preferences(update: Update, context: ContextTypes.DEFAULT_TYPE, field: str, vocabulary: List[str]):
+    """
+    Show or replace one of the subscriber's digest preferences
+    
+    `/<field>` shows the current choice and what is available,
+    `/<field> a, b` replaces it and `/<field> clear` removes it.
+    """
+    user_id = str(update.effective_user.id)
+    store = get_subscription_store()
+    if user_id not in store:
+        await update.message.reply_text("Use /start to subscribe first, then personalize your digest.")
+        return
+    
+    text = " ".join(context.args or [])
+    if not text:
+        current = store.get(user_id).get(field) or []
+        await update.message.reply_text(
+            f"Your digest {field}: {', '.join(current) or 'any'}\n\n"
+            f"Available: {', '.join(sorted(vocabulary))}\n\n"
+            f"Set them with /{field} name, other name or clear them with /{field} clear"
+        )
+        return
+    
+    if text.strip().lower() == "clear":
+        chosen, unknown = [], []
+    else:
+        requested = [value.strip() for value in text.split(",") if value.strip()]
+        chosen = match_preferences(requested, vocabulary)
+        matched = {name.lower() for name in chosen}
+        unknown = [value for value in requested if value.lower() not in matched]
+    store.update(user_id, **{field: chosen})
+    
+    reply = f"✅ Digest {field}: {', '.join(chosen) or 'any'}"
+    if unknown:
+        reply += f"\n\n⚠️ Not found: {', '.join(unknown)}. Send /{field} to see what is available."
+    await update.message.reply_text(reply)
+
+async def tags_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /tags command - choose the tags the daily digest favours"""
+    await _set_preferences(update, context, "tags", get_paper_service().store.tag_vocab)
+
+async def categories_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /categories command - choose the categories the daily digest favours"""
+    await _set_preferences(update, context, "categories", get_paper_service().store.category_vocab)
+
+# Largest n accepted by /papers
+MAX_PAPERS_COMMAND = 5
+
+# Rendered /papers payloads for the dataset version and day they were ranked for
+_rendered_papers_key: Optional[Tuple[str, int]] = None
+_rendered_papers: List[Tuple[str, InlineKeyboardMarkup]] = []
+
+def get_rendered_papers(n: int) -> Tuple[str, List[Tuple[str, InlineKeyboardMarkup]]]:
+    """
+    Return the intro and (message, keyboard) pairs for the top n papers
+    
+    The top MAX_PAPERS_COMMAND papers are rendered once per dataset version
+    and day (relevance decays with age); every /papers [n] call reuses a
+    prefix of that list. Publishing a new snapshot changes the version and
+    the cache is rebuilt on next use.
+    """
+    global _rendered_papers_key, _rendered_papers
+    paper_service = get_paper_service()
+    store = paper_service.store
+    key = (store.version, today_ordinal())
+    cache_lookup("telegram_papers", key == _rendered_papers_key)
+    if key != _rendered_papers_key:
+        papers = paper_service.top_papers(MAX_PAPERS_COMMAND, store)
+        _rendered_papers = [
+            (format_paper_message(paper, i), build_paper_keyboard(paper))
+            for i, paper in enumerate(papers, 1)
+        ]
+        _rendered_papers_key = key
+    
+    paper_messages = _rendered_papers[:n]
+    intro_message = f"🔬 <b>Top {len(paper_messages)} Research Papers Today</b>\n\n"
+    intro_message += "Here are the most relevant papers with AI-generated summaries and potential applications:\n\n"
+    return intro_message, paper_messages
+
 async def papers_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /papers command - show top relevant papers"""
     try:
@@ -162,41 +248,22 @@ async def papers_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         num_papers = 3
         if context.args:
             try:
-                num_papers = min(int(context.args[0]), 5)
+                num_papers = min(int(context.args[0]), MAX_PAPERS_COMMAND)
             except (ValueError, IndexError):
                 num_papers = 3
         
-        # Get papers from service
-        paper_service = PaperService()
-        papers = await paper_service.get_daily_top(num_papers)
+        intro_message, paper_messages = get_rendered_papers(num_papers)
         
-        if not papers:
+        if not paper_messages:
             await update.message.reply_text(
                 "🤖 No papers available at the moment. Please try again later!"
             )
             return
         
         # Send papers one by one for better readability
-        intro_message = f"🔬 <b>Top {len(papers)} Research Papers Today</b>\n\n"
-        intro_message += "Here are the most relevant papers with AI-generated summaries and potential applications:\n\n"
-        
         await update.message.reply_text(intro_message, parse_mode="HTML")
         
-        for i, paper in enumerate(papers, 1):
-            paper_message = format_paper_message(paper, i)
-            
-            # Create inline keyboard for each paper
-            keyboard = [
-                [InlineKeyboardButton("📖 Read Full Paper", url=paper.pdf_url)]
-            ]
-            
-            # Only add frontend button if URL is valid (not localhost)
-            frontend_url = os.getenv("FRONTEND_URL", "")
-            if frontend_url and not frontend_url.startswith("http://localhost"):
-                keyboard.append([InlineKeyboardButton("🌐 Explore More Papers", url=frontend_url)])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
+        for paper_message, reply_markup in paper_messages:
             await update.message.reply_text(
                 paper_message,
                 reply_markup=reply_markup,
@@ -212,6 +279,87 @@ async def papers_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"❌ Sorry, I encountered an error while fetching papers. Error: {str(e)[:100]}"
         )
 
+# Inline results per query (Telegram accepts up to 50)
+INLINE_RESULTS = 20
+# Longest inline query searched; Telegram allows 256 characters
+MAX_INLINE_QUERY = 64
+# Seconds to wait for the user to stop typing before searching on a cache miss
+INLINE_DEBOUNCE = float(os.getenv("INLINE_DEBOUNCE", "0.3"))
+# Seconds Telegram may serve the same results again without asking the bot
+INLINE_CACHE_TIME = 300
+# Approximate bytes of rendered inline results kept
+INLINE_CACHE_BYTES = int(os.getenv("INLINE_CACHE_BYTES", str(8 * 1024 * 1024)))
+
+_inline_search: Optional[InlineSearch] = None
+_inline_results = QueryCache("inline_query", INLINE_CACHE_BYTES)
+# Latest inline query id per user, so superseded keystrokes go unanswered
+_latest_inline_query: dict = {}
+
+def get_inline_search() -> InlineSearch:
+    """Return the process-wide InlineSearch"""
+    global _inline_search
+    if _inline_search is None:
+        _inline_search = InlineSearch(get_paper_service())
+    return _inline_search
+
+def build_inline_results(store, rows, scores) -> List[InlineQueryResultArticle]:
+    """Render matching papers as inline results that post the usual paper message with their ranking scores"""
+    results = []
+    for row, score in zip(rows, scores):
+        paper = store.paper(int(row), float(score))
+        authors = ", ".join(paper.authors[:2]) + (" et al." if len(paper.authors) > 2 else "")
+        results.append(InlineQueryResultArticle(
+            id=paper.id[:64],
+            title=paper.title,
+            description=f"{authors} · {paper.category} · {paper.published_at}",
+            input_message_content=InputTextMessageContent(
+                format_paper_message(paper),
+                parse_mode="HTML",
+                disable_web_page_preview=True,
+            ),
+            reply_markup=build_paper_keyboard(paper),
+        ))
+    return results
+
+def _inline_results_size(results: List[InlineQueryResultArticle]) -> int:
+    return sum(1024 + len(r.input_message_content.message_text) for r in results)
+
+async def inline_query_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handle inline queries (`@bot diffusion`) - search titles, tags and authors
+    
+    Telegram sends a query per keystroke. Results are cached per dataset
+    version and day, as their ranking changes daily; on a miss the handler first waits INLINE_DEBOUNCE seconds and
+    drops the query if the same user has typed more meanwhile.
+    """
+    inline_query = update.inline_query
+    query = " ".join(inline_query.query.split()).casefold()[:MAX_INLINE_QUERY]
+    user_id = inline_query.from_user.id
+    _latest_inline_query[user_id] = inline_query.id
+    try:
+        inline_search = get_inline_search()
+        index = await inline_search.index()
+        # Results are ranked by today's scores, so the day is part of the key
+        key = (today_ordinal(), query)
+        if INLINE_DEBOUNCE and not _inline_results.contains(index.version, key):
+            await asyncio.sleep(INLINE_DEBOUNCE)
+            if _latest_inline_query.get(user_id) != inline_query.id:
+                INLINE_QUERIES.labels("debounced").inc()
+                return
+
+        async def compute() -> List[InlineQueryResultArticle]:
+            store, rows, scores = await inline_search.search(query, INLINE_RESULTS)
+            return build_inline_results(store, rows, scores)
+
+        results = await _inline_results.get_or_compute(index.version, key, compute, _inline_results_size)
+        await inline_query.answer(results, cache_time=INLINE_CACHE_TIME, is_personal=False)
+        INLINE_QUERIES.labels("answered").inc()
+    except Exception as e:
+        logger.error(f"Error in inline_query_command: {e}")
+    finally:
+        if _latest_inline_query.get(user_id) == inline_query.id:
+            del _latest_inline_query[user_id]
+
 def escape_markdown(text: str) -> str:
     """Escape special characters for Telegram Markdown"""
     special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
@@ -219,10 +367,23 @@ def escape_markdown(text: str) -> str:
         text = text.replace(char, f'\\{char}')
     return text
 
-def format_paper_message(paper, index: int) -> str:
-    """Format a paper into a readable Telegram message"""
+def build_paper_keyboard(paper) -> InlineKeyboardMarkup:
+    """Build the inline keyboard shown under a paper message"""
+    keyboard = [
+        [InlineKeyboardButton("📖 Read Full Paper", url=paper.pdf_url)]
+    ]
+    
+    # Only add frontend button if URL is valid (not localhost)
+    if FRONTEND_URL and not FRONTEND_URL.startswith("http://localhost"):
+        keyboard.append([InlineKeyboardButton("🌐 Explore More Papers", url=FRONTEND_URL)])
+    
+    return InlineKeyboardMarkup(keyboard)
+
+def format_paper_message(paper, index: Optional[int] = None) -> str:
+    """Format a paper into a readable Telegram message, numbered if `index` is given"""
     # Use HTML formatting instead of Markdown for better compatibility
-    message = f"<b>{index}. {paper.title}</b>\n\n"
+    number = f"{index}. " if index is not None else ""
+    message = f"<b>{number}{paper.title}</b>\n\n"
     
     # Authors
     authors_str = ", ".join(paper.authors[:3])  # Show first 3 authors
@@ -254,9 +415,23 @@ def format_paper_message(paper, index: int) -> str:
     
     return message
 
-def create_bot_application(token: str) -> Application:
-    """Create and configure the bot application"""
-    application = Application.builder().token(token).build()
+def create_bot_application(token: str, webhook: bool = False) -> Application:
+    """
+    Create and configure the bot application
+    
+    Args:
+        token: Bot token from @BotFather
+        webhook: Build without an Updater; updates are pushed to
+            /telegram/webhook and put on the application's update queue
+    """
+    builder = Application.builder().token(token)
+    # Point the bot at another Bot API server (e.g. the fake one in fakes/)
+    api_base_url = os.getenv("TELEGRAM_API_BASE_URL")
+    if api_base_url:
+        builder = builder.base_url(f"{api_base_url.rstrip('/')}/bot")
+    if webhook:
+        builder = builder.updater(None)
+    application = builder.build()
     
     # Add command handlers
     application.add_handler(CommandHandler("start", start_command))
@@ -264,61 +439,66 @@ def create_bot_application(token: str) -> Application:
     application.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
     application.add_handler(CommandHandler("status", status_command))
     application.add_handler(CommandHandler("papers", papers_command))
+    application.add_handler(CommandHandler("tags", tags_command))
+    application.add_handler(CommandHandler("categories", categories_command))
     
     # Add callback query handler for buttons
     application.add_handler(CallbackQueryHandler(subscribe_callback, pattern="^subscribe$"))
+    # Inline queries wait out the debounce, so they must not hold up other updates
+    application.add_handler(InlineQueryHandler(inline_query_command, block=False))
     
     return application
 
-async def send_daily_digest(application: Application, papers: list):
-    """Send daily digest to all subscribed users"""
-    subscriptions = load_subscriptions()
+def render_digest_messages(papers: list) -> List[dict]:
+    """
+    Render the digest into send_message payloads
     
-    if not papers:
-        logger.info("No papers to send in daily digest")
-        return
-    
-    # Format the digest message
+    Returns:
+        JSON-serializable kwargs for each message: the intro followed by one
+        message per paper
+    """
     digest_message = "🔬 <b>TechAware Daily Digest</b>\n\n"
     digest_message += f"Here are today's top {len(papers)} research papers with summaries and applications:\n\n"
     
-    # Send to all subscribers
-    success_count = 0
-    for user_id in subscriptions.keys():
-        try:
-            # Send intro message
-            await application.bot.send_message(
-                chat_id=int(user_id),
-                text=digest_message,
-                parse_mode="HTML"
-            )
-            
-            # Send each paper as a separate message for better readability
-            for i, paper in enumerate(papers[:3], 1):  # Send top 3 papers in digest
-                paper_message = format_paper_message(paper, i)
-                
-                # Create inline keyboard for each paper
-                keyboard = [
-                    [InlineKeyboardButton("📖 Read Full Paper", url=paper.pdf_url)]
-                ]
-                
-                # Only add frontend button if URL is valid (not localhost)
-                frontend_url = os.getenv("FRONTEND_URL", "")
-                if frontend_url and not frontend_url.startswith("http://localhost"):
-                    keyboard.append([InlineKeyboardButton("🌐 Explore More Papers", url=frontend_url)])
-                
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await application.bot.send_message(
-                    chat_id=int(user_id),
-                    text=paper_message,
-                    reply_markup=reply_markup,
-                    parse_mode="HTML",
-                    disable_web_page_preview=True
-                )
-            
-            success_count += 1
-        except Exception as e:
-            logger.error(f"Failed to send digest to user {user_id}: {e}")
+    messages = [{"text": digest_message, "parse_mode": "HTML"}]
+    for i, paper in enumerate(papers, 1):
+        messages.append({
+            "text": format_paper_message(paper, i),
+            "reply_markup": build_paper_keyboard(paper).to_dict(),
+            "parse_mode": "HTML",
+            "disable_web_page_preview": True,
+        })
+    return messages
+
+async def send_daily_digest(
+    application: Application,
+    papers: list,
+    batch_id: Optional[str] = None,
+    queue: Optional[DeliveryQueue] = None
+) -> Optional[DeliveryReport]:
+    """
+    Send daily digest to all subscribed users
+    
+    The digest is queued in the persistent delivery queue and sent
+    concurrently within Telegram's rate limits. Passing the same
+    `batch_id` again resumes an interrupted run without re-sending to chats
+    that already received it.
+    """
+    if not papers:
+        logger.info("No papers to send in daily digest")
+        return None
     
-    logger.info(f"Daily digest sent to {success_count}/{len(subscriptions)} subscribers")
+    # Send top 3 papers in digest
+    messages = render_digest_messages(papers[:3])
+    batch_id = batch_id or f"digest-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}"
+    # A queue opened here is closed here; a caller's queue stays open
+    own_queue = queue is None
+    queue = queue or DeliveryQueue()
+    try:
+        queue.enqueue(batch_id, messages, get_subscription_store().chat_ids())
+        report = await DeliveryEngine(application.bot, queue).run(batch_id)
+    finally:
+        if own_queue:
+            queue.close()
+    logger.info(f"Daily digest {batch_id}: {report.summary()}")
+    return report
@@ -0,0 +1,39 @@
+"""
+Startup profiling helpers
+
+Set STARTUP_PROFILE=1 to print how long each startup step takes. Steps are
+recorded with the `timed` context manager; the report is printed once the
+lifespan hook has finished initializing the app.
+"""
+from contextlib import contextmanager
+from typing import Dict
+import os
+import time
+
+# Wall-clock seconds per startup step, in the order they were recorded
+STARTUP_TIMINGS: Dict[str, float] = {}
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("STARTUP_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def timed(step: str):
+    """Record the duration of a startup step"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[step] = time.perf_counter() - start
+
+
+def report():
+    """Print recorded startup timings when profiling is enabled"""
+    if not profiling_enabled():
+        return
+    total = sum(STARTUP_TIMINGS.values())
+    print("⏱️  Startup profile:")
+    for step, seconds in STARTUP_TIMINGS.items():
+        print(f"   {step:<32} {seconds * 1000:8.1f} ms")
+    print(f"   {'total':<32} {total * 1000:8.1f} ms")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Backfill historical papers into the paper store
+
+Harvests a date range over OAI-PMH, summarizes it on every core and merges
+the result into papers.json, publishing a new snapshot for the running
+API. Progress is checkpointed per shard; re-run the same command to resume
+after an interruption:
+
+    python backfill.py --from 2024-01-01 --until 2024-03-31 --categories cs.AI,cs.LG
+
+For a local run against the fakes:
+
+    python -m fakes.oai_pmh &
+    python backfill.py --from 2024-01-01 --until 2024-02-01 \\
+        --url http://127.0.0.1:8083/oai --fake-model
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from app.services.backfill import SHARD_SIZE, Backfill, BackfillParams
+from app.services.ingestion import DEFAULT_CATEGORIES
+from app.services.oai_harvester import ARXIV_OAI_URL, OAIError
+from app.services.summarizer import DECODING_PRESETS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backfill historical arXiv papers")
+    parser.add_argument("--from", dest="from_date", required=True, help="First date, YYYY-MM-DD")
+    parser.add_argument("--until", dest="until_date", required=True, help="Last date, YYYY-MM-DD")
+    parser.add_argument("--categories", default=",".join(DEFAULT_CATEGORIES), help="Comma-separated arXiv categories")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Summarization processes (default: all cores)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="Math library threads per process")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Papers per shard / checkpoint")
+    parser.add_argument("--model", help="Summarization model (default: MODEL_NAME)")
+    parser.add_argument("--fake-model", action="store_true", help="Use the fake summarization model")
+    parser.add_argument("--decoding", choices=list(DECODING_PRESETS),
+                        help="Decoding preset (default: SUMMARY_DECODING); greedy is the fastest")
+    parser.add_argument("--url", default=ARXIV_OAI_URL, help="OAI-PMH endpoint")
+    parser.add_argument("--restart", action="store_true", help="Discard the shard checkpoints and start over")
+    args = parser.parse_args()
+
+    categories = tuple(sorted({c.strip() for c in args.categories.split(",") if c.strip()}))
+    params = BackfillParams(args.from_date, args.until_date, categories, args.shard_size)
+    backfill = Backfill(params, base_url=args.url)
+    if args.restart:
+        # The harvest is kept: it is only re-fetched if its own checkpoint is removed
+        shutil.rmtree(backfill.job_dir, ignore_errors=True)
+
+    started = time.perf_counter()
+    try:
+        added, total = backfill.run(
+            args.workers, args.model, args.fake_model, args.threads_per_worker, args.decoding
+        )
+    except (OAIError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted; re-run the same command to resume from the completed shards")
+        return 130
+
+    print(f"✅ Backfill complete in {time.perf_counter() - started:.0f}s: {added} new papers, {total} in total")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+Offline micro-benchmarks for the backend hot paths
+
+Runs against synthetic corpora and a fake summarization model, so no
+network access or model download is needed:
+
+    python -m benchmarks                      # run and append to history.jsonl
+    python -m benchmarks --compare            # also compare with the previous run
+    python -m benchmarks --only papers --sizes 1000,1000000
+    python -m benchmarks.decoding --model facebook/bart-large-cnn   # decoding presets: latency vs ROUGE
+"""
@@ -0,0 +1,83 @@
+"""
+Run the benchmark suite; see benchmarks/__init__.py for usage
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cases import GROUPS, all_cases
+from benchmarks.harness import HISTORY_FILE, compare, find_baseline, load_history, measure, print_result, save_run
+
+
+def _sizes(value: str):
+    return [int(size) for size in value.split(",") if size]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline backend micro-benchmarks")
+    parser.add_argument("--only", default=",".join(GROUPS),
+                        help=f"Comma-separated groups to run ({', '.join(GROUPS)})")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--sizes", type=_sizes, default=[1000, 10000, 100000],
+                        help="Corpus sizes for get_papers (up to 1000000)")
+    parser.add_argument("--dataset-sizes", type=_sizes, default=[1000, 10000],
+                        help="Corpus sizes for dataset load/save")
+    parser.add_argument("--subscriber-sizes", type=_sizes, default=[1000, 100000],
+                        help="Subscriber counts for personalized digests")
+    parser.add_argument("--model", default=None,
+                        help="HuggingFace model for summarize (default: fake pipeline, no download)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Target seconds per repeat")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON Lines file runs are appended to")
+    parser.add_argument("--label", default=None, help="Name for this run, usable as --baseline")
+    parser.add_argument("--no-save", action="store_true", help="Don't append this run to the history")
+    parser.add_argument("--compare", action="store_true", help="Compare with a baseline run")
+    parser.add_argument("--baseline", default=None, help="Run id, label or git revision to compare with "
+                                                         "(default: the previous run)")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Slowdown that counts as a regression (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    groups = {group.strip() for group in args.only.split(",")}
+    unknown = groups - set(GROUPS)
+    if unknown:
+        parser.error(f"Unknown groups: {', '.join(sorted(unknown))}")
+
+    print("=" * 60)
+    print("TECHAWARE BENCHMARKS")
+    print("=" * 60)
+    results = []
+    for name, fn, items in all_cases(groups, args.sizes, args.dataset_sizes, args.model, args.subscriber_sizes):
+        if args.filter not in name:
+            continue
+        result = measure(name, fn, items, min_time=args.min_time, repeats=args.repeats)
+        print_result(result)
+        results.append(result)
+
+    history = load_history(args.history)
+    if args.no_save:
+        current = {"run_id": "current", "timestamp": "now", "results": {r.name: vars(r) for r in results}}
+    else:
+        current = save_run(results, args.history, args.label)
+        print(f"\n📝 Saved run {current['run_id']} to {args.history}")
+
+    if args.compare:
+        base = find_baseline(history, current, args.baseline)
+        if base is None and args.baseline:
+            print(f"\n❌ Baseline run {args.baseline} not found in {args.history}")
+            return 2
+        if base is None:
+            print("\nℹ️  No baseline run to compare with")
+            return 0
+        regressions = compare(base, current, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
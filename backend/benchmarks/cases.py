@@ -0,0 +1,176 @@
+"""
+Benchmark cases for the backend hot paths
+
+Each case is (name, callable, items per call). Cases are grouped by the
+prefix of their name; a group's fixtures are only built when it runs.
+"""
+from typing import Callable, Iterator, List, Optional, Tuple
+import asyncio
+import os
+import random
+import tempfile
+from app.models.paper import Paper
+from app.services.digest_personalization import plan_digests
+from app.services.inline_search import InlineSearch, PrefixIndex
+from app.services.ingestion import load_papers, save_papers
+from app.services.paper_service import PaperService
+from app.services.paper_store import PaperStore
+from app.services.snapshot import read_snapshot, write_snapshot
+from app.services.summarizer import Summarizer
+from benchmarks.corpus import generate_papers
+from benchmarks.harness import run_sync
+
+Case = Tuple[str, Callable[[], object], int]
+
+# get_papers query shapes, named after what they exercise
+QUERY_SHAPES = {
+    "recent": {},
+    "score": {"sort": "score"},
+    "search": {"search": "quantization"},
+    "search-letter": {"search": "a"},
+    "tags": {"tags": ["Privacy", "Robotics"]},
+    "category+since": {"category": "Robotics", "since": "2024-06-01"},
+    "search+tags+page5": {"search": "robust", "tags": ["LLM"], "page": 5},
+}
+# Telegram inline queries: one letter, a word prefix, two words
+INLINE_QUERIES = {"letter": "n", "prefix": "neu", "words": "neural net"}
+# Papers processed per call by the per-paper benchmarks
+BATCH = 200
+# Corpus the personalized digests are picked from
+DIGEST_CORPUS = 10_000
+
+
+def get_papers_cases(sizes: List[int]) -> Iterator[Case]:
+    for size in sizes:
+        store = PaperStore.from_records(generate_papers(size), version="bench")
+        # Uncached, so every call measures the query itself
+        service = PaperService(store=store, query_cache_bytes=0)
+        for shape, query in QUERY_SHAPES.items():
+            yield (
+                f"papers.get_papers[{size},{shape}]",
+                lambda query=query: run_sync(service.get_papers(**query)),
+                1,
+            )
+        # A repeated query answered by the query cache; misses run on a thread, so warm it first
+        cached = PaperService(store=store)
+        asyncio.run(cached.get_papers())
+        yield f"papers.get_papers[{size},cached]", lambda: run_sync(cached.get_papers()), 1
+        # Re-ranking the whole corpus with today's scores, and selecting the top few
+        yield f"papers.ranking_scores[{size}]", service.ranking_scores, 1
+        yield f"papers.get_daily_top[{size}]", lambda: run_sync(service.get_daily_top(3)), 1
+        # Inline search answers a keystroke; the index follows a snapshot adding 1% new papers
+        inline = InlineSearch(service)
+        asyncio.run(inline.search("", 1))
+        for shape, text in INLINE_QUERIES.items():
+            yield f"papers.inline_search[{size},{shape}]", lambda text=text: run_sync(inline.search(text, 20)), 1
+        # An author's papers come from a posting list; autocomplete ranks a key range
+        key = store.author_keys[int(store.author_paper_counts.argmax())].decode("ascii")
+        yield f"papers.author_papers[{size}]", lambda: run_sync(service.get_author_papers(key)), 1
+        yield f"papers.complete_authors[{size}]", lambda: run_sync(service.complete_authors("author1")), 1
+        newer = PaperStore.from_records(generate_papers(size + size // 100), version="bench-newer")
+        index = PrefixIndex.build(store)
+        yield f"papers.inline_index_update[{size}]", lambda: index.updated(newer), size // 100
+        del store, service, cached, inline, newer, index
+
+
+def summarizer_cases(model_name: Optional[str]) -> Iterator[Case]:
+    papers = list(generate_papers(BATCH, seed=1))
+    summarizer = Summarizer(model_name) if model_name else Summarizer()
+    if not model_name:
+        from fakes.summarization import FakeSummarizationPipeline
+        summarizer._model = FakeSummarizationPipeline()
+
+    def extract_tags():
+        for p in papers:
+            run_sync(summarizer.extract_tags(p["title"], p["abstract"]))
+
+    def suggest_impact():
+        for p in papers:
+            run_sync(summarizer.suggest_impact(p["title"], p["abstract"]))
+
+    def summarize_extractive():
+        for p in papers:
+            summarizer.summarize_extractive(p["abstract"])
+
+    yield "summarizer.extract_tags", extract_tags, len(papers)
+    yield "summarizer.suggest_impact", suggest_impact, len(papers)
+    yield "summarizer.summarize_extractive", summarize_extractive, len(papers)
+
+    # A real model is far slower per call; time a handful of abstracts
+    sample = papers if not model_name else papers[:4]
+
+    def summarize():
+        for p in sample:
+            run_sync(summarizer.summarize(p["abstract"]))
+
+    label = model_name or "fake"
+    yield f"summarizer.summarize[{label}]", summarize, len(sample)
+
+
+def telegram_cases() -> Iterator[Case]:
+    from app.services.telegram_bot import build_paper_keyboard, format_paper_message
+    papers = [Paper(**p) for p in generate_papers(BATCH, seed=2)]
+
+    def render():
+        for i, paper in enumerate(papers, 1):
+            format_paper_message(paper, i)
+            build_paper_keyboard(paper)
+
+    yield "telegram.format_paper_message", render, len(papers)
+
+
+def dataset_cases(sizes: List[int]) -> Iterator[Case]:
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            records = list(generate_papers(size))
+            json_path = os.path.join(tmp, f"papers-{size}.json")
+            snapshot_path = os.path.join(tmp, f"papers-{size}.snap")
+            save_papers(records, json_path)
+
+            def build_store():
+                # What publishing from papers.json does: validate, then build columns
+                return PaperStore.from_records(Paper(**p).model_dump() for p in records)
+
+            store = build_store()
+            write_snapshot(store, snapshot_path)
+
+            yield f"dataset.json_save[{size}]", lambda: save_papers(records, json_path), size
+            yield f"dataset.json_load[{size}]", lambda: load_papers(json_path), size
+            yield f"dataset.build_store[{size}]", build_store, size
+            yield f"dataset.snapshot_write[{size}]", lambda: write_snapshot(store, snapshot_path), size
+            yield f"dataset.snapshot_read[{size}]", lambda: read_snapshot(snapshot_path), size
+            del records, store
+
+
+def digest_cases(sizes: List[int]) -> Iterator[Case]:
+    store = PaperStore.from_records(generate_papers(DIGEST_CORPUS), version="bench")
+    relevance = PaperService(store=store).ranking_scores()
+    rng = random.Random(3)
+    for size in sizes:
+        # A third without preferences, the rest with one to three tags and maybe a category
+        subscriptions = {}
+        for chat_id in range(size):
+            record = {}
+            if chat_id % 3:
+                record["tags"] = rng.sample(store.tag_vocab, rng.randint(1, min(3, len(store.tag_vocab))))
+                if rng.random() < 0.5:
+                    record["categories"] = [rng.choice(store.category_vocab)]
+            subscriptions[str(chat_id)] = record
+        yield f"digest.plan_digests[{size} subscribers]", lambda s=subscriptions: plan_digests(store, relevance, s, 3), 1
+
+
+GROUPS = ("papers", "summarizer", "telegram", "dataset", "digest")
+
+
+def all_cases(groups, sizes: List[int], dataset_sizes: List[int], model_name: Optional[str] = None,
+              subscriber_sizes: List[int] = (1_000, 100_000)) -> Iterator[Case]:
+    if "papers" in groups:
+        yield from get_papers_cases(sizes)
+    if "summarizer" in groups:
+        yield from summarizer_cases(model_name)
+    if "telegram" in groups:
+        yield from telegram_cases()
+    if "dataset" in groups:
+        yield from dataset_cases(dataset_sizes)
+    if "digest" in groups:
+        yield from digest_cases(subscriber_sizes)
@@ -0,0 +1,57 @@
+"""
+Synthetic paper corpora
+
+Generates deterministic paper records with the same shape as papers.json:
+realistic field lengths, a skewed tag and category distribution and
+dates spread over two years, so filters and sorts do representative work.
+"""
+from datetime import date, timedelta
+from typing import Iterator
+import random
+
+WORDS = (
+    "attention transformer language model vision image detection segmentation "
+    "federated privacy differential security adversarial robust efficient "
+    "optimization latency edge mobile real-time generative diffusion medical "
+    "clinical robot navigation reinforcement policy graph neural network deep "
+    "learning benchmark dataset training inference quantization sparse mixture "
+    "experts retrieval multimodal alignment reasoning theorem proof scaling"
+).split()
+CATEGORIES = [
+    "Machine Learning", "Computer Vision", "Natural Language Processing",
+    "Artificial Intelligence", "Privacy & Security", "Robotics",
+]
+TAGS = [
+    "LLM", "Computer Vision", "NLP", "Deep Learning", "Reinforcement Learning",
+    "Federated Learning", "Privacy", "Security", "Attention", "Transformer",
+    "Efficiency", "Edge Computing", "Real-Time", "Generative AI", "Robotics",
+    "Healthcare", "Multimodal",
+]
+START_DATE = date(2023, 1, 1)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def generate_papers(n: int, seed: int = 0) -> Iterator[dict]:
+    """Yield `n` synthetic paper records"""
+    rng = random.Random(seed)
+    for i in range(n):
+        arxiv_id = f"{2300 + i // 100000}.{i % 100000:05d}"
+        # Zipf-like skew: a few tags and categories dominate, like real data
+        tags = sorted({TAGS[min(int(rng.paretovariate(1.2)) - 1, len(TAGS) - 1)] for _ in range(rng.randint(1, 5))})
+        yield {
+            "id": arxiv_id,
+            "arxiv_id": arxiv_id,
+            "title": _sentence(rng, rng.randint(6, 14))[:-1],
+            "authors": [f"Author{rng.randint(0, 50000)}, {chr(65 + rng.randint(0, 25))}." for _ in range(rng.randint(1, 6))],
+            "abstract": " ".join(_sentence(rng, rng.randint(12, 25)) for _ in range(rng.randint(5, 9))),
+            "category": CATEGORIES[min(int(rng.paretovariate(1.0)) - 1, len(CATEGORIES) - 1)],
+            "published_at": (START_DATE + timedelta(days=rng.randint(0, 730))).isoformat(),
+            "pdf_url": f"https://arxiv.org/pdf/{arxiv_id}",
+            "summary_short": _sentence(rng, rng.randint(15, 30)),
+            "impact_suggestions": [_sentence(rng, 8), _sentence(rng, 8)],
+            "tags": tags,
+            "score": round(rng.uniform(0, 100), 2),
+        }
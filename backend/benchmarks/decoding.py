@@ -0,0 +1,132 @@
+"""
+Latency against summary drift for the decoding presets
+
+Summarizes a sample of abstracts with the settings used before
+input-adaptive lengths (1024-character truncation, max_length=220,
+min_length=50, the model's default beam search), then with every preset
+in DECODING_PRESETS. For each it reports the latency per summary and the
+ROUGE-1/2/L F1 of its summaries against the baseline's, so a faster preset
+can be chosen knowing how far its output moves:
+
+    python -m benchmarks.decoding --model facebook/bart-large-cnn --sample 50
+
+Abstracts come from data/papers.json when it exists, else from the
+synthetic corpus. Without --model the fake pipeline is used, which only
+exercises the code path. ROUGE here measures drift from the current
+output, not quality against a human reference.
+"""
+from collections import Counter
+from typing import Callable, List, Optional
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ingestion import PAPERS_FILE, load_papers
+from app.services.model_manager import load_summarization_pipeline
+from app.services.summarizer import DECODING_PRESETS, Summarizer
+from benchmarks.corpus import generate_papers
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _f1(overlap: int, candidate: int, reference: int) -> float:
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / candidate, overlap / reference
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(candidate: str, reference: str, n: int) -> float:
+    """ROUGE-N F1 between two texts"""
+    def grams(tokens):
+        return Counter(zip(*(tokens[i:] for i in range(n))))
+    c, r = grams(_tokens(candidate)), grams(_tokens(reference))
+    return _f1(sum((c & r).values()), sum(c.values()), sum(r.values()))
+
+
+def rouge_l(candidate: str, reference: str) -> float:
+    """ROUGE-L F1 (longest common subsequence) between two texts"""
+    c, r = _tokens(candidate), _tokens(reference)
+    previous = [0] * (len(r) + 1)
+    for token in c:
+        current = [0]
+        for j, other in enumerate(r):
+            current.append(previous[j] + 1 if token == other else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(c), len(r))
+
+
+def _sample_abstracts(path: Optional[str], sample: int) -> List[str]:
+    papers = load_papers(path) if path and os.path.exists(path) else []
+    source = path if papers else "synthetic corpus"
+    if not papers:
+        papers = list(generate_papers(sample, seed=3))
+    print(f"Summarizing {min(sample, len(papers))} abstracts from {source}")
+    return [p["abstract"] for p in papers[:sample]]
+
+
+def _run(summarize: Callable[[str], str], abstracts: List[str]):
+    """(seconds per summary, summaries), after one warm-up call"""
+    summarize(abstracts[0])
+    seconds, summaries = [], []
+    for text in abstracts:
+        started = time.perf_counter()
+        summaries.append(summarize(text))
+        seconds.append(time.perf_counter() - started)
+    return seconds, summaries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Latency and ROUGE drift of the decoding presets")
+    parser.add_argument("--model", default=None, help="HuggingFace model (default: fake pipeline, no download)")
+    parser.add_argument("--sample", type=int, default=20, help="Abstracts to summarize per preset")
+    parser.add_argument("--papers", default=PAPERS_FILE, help="papers.json to take abstracts from")
+    args = parser.parse_args()
+
+    abstracts = _sample_abstracts(args.papers, args.sample)
+    baseline = Summarizer(args.model) if args.model else Summarizer()
+    if args.model:
+        # Pinned for the whole comparison rather than held by the model manager
+        baseline._model = load_summarization_pipeline(args.model)
+    else:
+        from fakes.summarization import FakeSummarizationPipeline
+        baseline._model = FakeSummarizationPipeline()
+
+    def legacy(text: str) -> str:
+        return baseline._model(text[:1024], max_length=220, min_length=50, do_sample=False)[0]["summary_text"]
+
+    base_seconds, references = _run(legacy, abstracts)
+    rows = [("baseline", base_seconds, references)]
+    for preset in DECODING_PRESETS:
+        summarizer = Summarizer(baseline.model_name, preset)
+        # Share the loaded pipeline; presets only change the generation arguments
+        summarizer._model = baseline._model
+        rows.append((preset, *_run(summarizer.summarize_blocking, abstracts)))
+
+    base_mean = statistics.mean(base_seconds)
+    print(f"\n{'settings':<12} {'mean ms':>9} {'p50 ms':>9} {'speedup':>8} {'words':>6} "
+          f"{'ROUGE-1':>8} {'ROUGE-2':>8} {'ROUGE-L':>8}")
+    for name, seconds, summaries in rows:
+        pairs = list(zip(summaries, references))
+        print(
+            f"{name:<12} {statistics.mean(seconds) * 1000:>9.1f} {statistics.median(seconds) * 1000:>9.1f} "
+            f"{base_mean / statistics.mean(seconds):>7.2f}x "
+            f"{statistics.mean(len(s.split()) for s in summaries):>6.1f} "
+            f"{statistics.mean(rouge_n(s, r, 1) for s, r in pairs):>8.3f} "
+            f"{statistics.mean(rouge_n(s, r, 2) for s, r in pairs):>8.3f} "
+            f"{statistics.mean(rouge_l(s, r) for s, r in pairs):>8.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
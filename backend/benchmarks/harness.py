@@ -0,0 +1,143 @@
+"""
+Timing, history and comparison for the benchmark suite
+"""
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import uuid
+
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), "history.jsonl")
+
+
+@dataclass
+class Result:
+    name: str
+    # Seconds per item (paper, message, query...), median and best of the repeats
+    median: float
+    best: float
+    items: int
+    iterations: int
+    repeats: int
+
+    @property
+    def throughput(self) -> float:
+        return 1 / self.median if self.median else float("inf")
+
+
+def run_sync(coro):
+    """Run a coroutine that never suspends, without event loop overhead"""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    coro.close()
+    raise RuntimeError("Benchmarked coroutine awaited real I/O")
+
+
+def measure(name: str, fn: Callable[[], object], items: int = 1, min_time: float = 0.2, repeats: int = 5) -> Result:
+    """
+    Time `fn`, which processes `items` items per call
+
+    The number of calls per repeat is calibrated so each repeat takes about
+    `min_time` seconds; the median over repeats is reported.
+    """
+    started = time.perf_counter()
+    fn()  # Warm-up, also used for calibration
+    single = time.perf_counter() - started
+    iterations = max(1, min(1_000_000, int(min_time / max(single, 1e-9))))
+
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - started) / iterations / items)
+    return Result(name, statistics.median(samples), min(samples), items, iterations, repeats)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(__file__), timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_run(results: List[Result], path: str = HISTORY_FILE, label: Optional[str] = None) -> dict:
+    """Append a run to the JSON Lines history file"""
+    run = {
+        "run_id": uuid.uuid4().hex[:8],
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "label": label,
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()}-{platform.machine()}-{os.cpu_count()}cpu",
+        "results": {r.name: asdict(r) for r in results},
+    }
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    return run
+
+
+def load_history(path: str = HISTORY_FILE) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_baseline(history: List[dict], current: dict, baseline: Optional[str] = None) -> Optional[dict]:
+    """The run to compare against: `baseline` by run id or label, else the previous run"""
+    previous = [run for run in history if run["run_id"] != current["run_id"]]
+    if baseline:
+        matches = [run for run in previous if baseline in (run["run_id"], run.get("label"), run.get("git"))]
+        return matches[-1] if matches else None
+    return previous[-1] if previous else None
+
+
+def compare(base: dict, current: dict, threshold: float) -> List[str]:
+    """
+    Print a comparison table and return the benchmarks that regressed
+
+    A benchmark regresses when its best time per item grew by more than
+    `threshold` (0.1 = 10%) relative to the baseline. The best of the
+    repeats is the least sensitive to scheduler and cache noise.
+    """
+    regressions = []
+    print(f"\nComparing against run {base['run_id']} ({base['timestamp']}, git {base.get('git') or '?'})")
+    print(f"{'benchmark':<52} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, result in current["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            print(f"{name:<52} {'-':>12} {_format_time(result['best']):>12} {'new':>9}")
+            continue
+        change = result["best"] / before["best"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  ❌ regression"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  ✅ faster"
+        print(f"{name:<52} {_format_time(before['best']):>12} {_format_time(result['best']):>12} "
+              f"{change:>+8.1%}{flag}")
+    return regressions
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def print_result(result: Result):
+    print(f"{result.name:<52} {_format_time(result.median):>12}/item  "
+          f"{result.throughput:>12,.0f} items/s  (best {_format_time(result.best)})")
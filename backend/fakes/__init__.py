@@ -0,0 +1,8 @@
+"""
+Local stand-ins for the external services the backend talks to
+
+These are small FastAPI apps that mimic just enough of each upstream API to
+exercise the backend offline. Run one in the background with
+`BackgroundServer(app)` and point the client at its `url`.
+"""
+from fakes.server import BackgroundServer
@@ -0,0 +1,124 @@
+"""
+Fake arXiv API
+
+Serves the Atom feed of `export.arxiv.org/api/query` for a synthetic set
+of recent papers, supporting the parameters the arxiv client sends
+(`search_query` with `cat:` terms, `start`, `max_results`, `sortBy`,
+`sortOrder`). Paging and category filtering behave like the real API, so
+the scraper and ingestion can run offline.
+
+Point the scraper at it with:
+    ARXIV_API_URL=http://127.0.0.1:8082
+
+Run standalone:
+    python -m fakes.arxiv_api --port 8082
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List
+from xml.sax.saxutils import escape, quoteattr
+import argparse
+import asyncio
+import random
+import re
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+CATEGORIES = ["cs.AI", "cs.LG", "cs.CV", "cs.CL", "cs.RO", "cs.CR"]
+WORDS = (
+    "efficient attention transformer language model vision detection federated "
+    "privacy robust adversarial diffusion generative edge latency reinforcement "
+    "policy graph neural sparse quantization retrieval multimodal reasoning"
+).split()
+
+
+class FakeArxivAPI:
+    """
+    In-process fake of the arXiv query API
+
+    Args:
+        papers: Number of papers available, newest first
+        latency: Seconds to wait before answering each request
+        seed: Seed for the generated titles and abstracts
+    """
+
+    def __init__(self, papers: int = 500, latency: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._now = datetime.now(timezone.utc)
+        self.entries: List[dict] = []
+        self.publish(papers)
+
+        self.app = FastAPI(title="Fake arXiv API")
+        self.app.add_api_route("/api/query", self.query, methods=["GET"])
+
+    def publish(self, n: int):
+        """Add `n` papers newer than every existing one"""
+        start = len(self.entries)
+        for i in range(start, start + n):
+            sentence = lambda words: " ".join(self._rng.choice(WORDS) for _ in range(words)).capitalize()
+            self.entries.insert(0, {
+                "id": f"2410.{i:05d}",
+                "title": sentence(self._rng.randint(6, 12)),
+                "summary": ". ".join(sentence(self._rng.randint(12, 22)) for _ in range(6)) + ".",
+                "authors": [f"Author {self._rng.randint(1, 5000)}" for _ in range(self._rng.randint(1, 5))],
+                "category": self._rng.choice(CATEGORIES),
+                # Newest first, one paper every 10 minutes going back in time
+                "published": self._now - timedelta(minutes=10 * (n - (i - start))),
+            })
+
+    async def query(self, request: Request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        params = request.query_params
+        categories = set(re.findall(r"cat:([\w.\-]+)", params.get("search_query", "")))
+        matching = [e for e in self.entries if not categories or e["category"] in categories]
+        if params.get("sortOrder") == "ascending":
+            matching = matching[::-1]
+        start = int(params.get("start", 0))
+        max_results = int(params.get("max_results", 10))
+        page = matching[start:start + max_results]
+        return Response(self._feed(page, len(matching), start), media_type="application/atom+xml")
+
+    def _feed(self, entries: List[dict], total: int, start: int) -> str:
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<feed xmlns="http://www.w3.org/2005/Atom" '
+            'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+            'xmlns:arxiv="http://arxiv.org/schemas/atom">',
+            '<title>Fake arXiv Query</title>',
+            f'<updated>{self._now.isoformat()}</updated>',
+            f'<opensearch:totalResults>{total}</opensearch:totalResults>',
+            f'<opensearch:startIndex>{start}</opensearch:startIndex>',
+            f'<opensearch:itemsPerPage>{len(entries)}</opensearch:itemsPerPage>',
+        ]
+        for e in entries:
+            published = e["published"].strftime("%Y-%m-%dT%H:%M:%SZ")
+            parts += [
+                '<entry>',
+                f'<id>http://arxiv.org/abs/{e["id"]}v1</id>',
+                f'<updated>{published}</updated>',
+                f'<published>{published}</published>',
+                f'<title>{escape(e["title"])}</title>',
+                f'<summary>{escape(e["summary"])}</summary>',
+                *(f'<author><name>{escape(name)}</name></author>' for name in e["authors"]),
+                f'<link href="http://arxiv.org/abs/{e["id"]}v1" rel="alternate" type="text/html"/>',
+                f'<link title="pdf" href="http://arxiv.org/pdf/{e["id"]}v1" rel="related" type="application/pdf"/>',
+                f'<arxiv:primary_category term={quoteattr(e["category"])} scheme="http://arxiv.org/schemas/atom"/>',
+                f'<category term={quoteattr(e["category"])} scheme="http://arxiv.org/schemas/atom"/>',
+                '</entry>',
+            ]
+        parts.append('</feed>')
+        return "\n".join(parts)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake arXiv API")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--papers", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    uvicorn.run(FakeArxivAPI(papers=args.papers, latency=args.latency).app, host="127.0.0.1", port=args.port)
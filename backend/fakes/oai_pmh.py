@@ -0,0 +1,164 @@
+"""
+Fake arXiv OAI-PMH endpoint
+
+Serves `ListRecords` in the arXiv metadata format for a synthetic archive,
+with the behaviour a bulk harvester has to cope with: fixed-size pages
+chained by resumption tokens, `from`/`until` datestamp filtering, deleted
+records, `noRecordsMatch` and `badResumptionToken` errors, and optional
+503 flow control with Retry-After.
+
+Point the harvester at it with:
+    ARXIV_OAI_URL=http://127.0.0.1:8083/oai
+
+Run standalone:
+    python -m fakes.oai_pmh --port 8083
+"""
+from datetime import date, timedelta
+from typing import List, Optional
+from xml.sax.saxutils import escape
+import argparse
+import random
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from fakes.arxiv_api import CATEGORIES, WORDS
+
+NAMESPACES = (
+    'xmlns="http://www.openarchives.org/OAI/2.0/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+)
+
+
+class FakeOAIPMH:
+    """
+    In-process fake of arXiv's OAI-PMH interface
+
+    Args:
+        records: Number of records in the archive, one set ("cs")
+        page_size: Records per ListRecords page
+        start: Datestamp of the oldest records
+        per_day: Records sharing each datestamp, one day apart
+        deleted_every: Every n-th record is a deletion (0 for none)
+        busy_every: Every n-th request is answered 503 with Retry-After (0 for never)
+        seed: Seed for the generated metadata
+    """
+
+    def __init__(self, records: int = 1000, page_size: int = 100, start: date = date(2024, 1, 1),
+                 per_day: int = 20, deleted_every: int = 50, busy_every: int = 0, seed: int = 0):
+        self.page_size = page_size
+        self.busy_every = busy_every
+        self.requests = 0
+        rng = random.Random(seed)
+        sentence = lambda words: " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+        self.records: List[dict] = []
+        for i in range(records):
+            stamp = start + timedelta(days=i // per_day)
+            categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+            self.records.append({
+                "id": f"{stamp:%y%m}.{i:05d}",
+                "datestamp": stamp.isoformat(),
+                "deleted": bool(deleted_every) and i % deleted_every == deleted_every - 1,
+                "title": sentence(rng.randint(6, 12)),
+                "abstract": ". ".join(sentence(rng.randint(12, 22)) for _ in range(6)) + ".",
+                "authors": [(f"Keyname{rng.randint(1, 5000)}", f"Forename {rng.choice('ABCDEFG')}.")
+                            for _ in range(rng.randint(1, 5))],
+                "categories": categories,
+            })
+
+        self.app = FastAPI(title="Fake arXiv OAI-PMH")
+        self.app.add_api_route("/oai", self.oai, methods=["GET"])
+
+    @property
+    def live_records(self) -> int:
+        return sum(1 for r in self.records if not r["deleted"])
+
+    def _select(self, set_spec: Optional[str], from_date: Optional[str], until_date: Optional[str]) -> List[dict]:
+        if set_spec not in (None, "cs"):
+            return []
+        return [
+            r for r in self.records
+            if (not from_date or r["datestamp"] >= from_date) and (not until_date or r["datestamp"] <= until_date)
+        ]
+
+    async def oai(self, request: Request):
+        self.requests += 1
+        if self.busy_every and self.requests % self.busy_every == 0:
+            return Response("Retry later", status_code=503, headers={"Retry-After": "0"})
+        params = request.query_params
+        if params.get("verb") != "ListRecords":
+            return self._error("badVerb", "Only ListRecords is supported")
+
+        token = params.get("resumptionToken")
+        if token:
+            # Tokens are "<cursor>|<set>|<from>|<until>"; exclusive with every other argument
+            try:
+                cursor, set_spec, from_date, until_date = token.split("|")
+                cursor = int(cursor)
+            except ValueError:
+                return self._error("badResumptionToken", f"Unknown token {token}")
+        else:
+            if params.get("metadataPrefix") != "arXiv":
+                return self._error("cannotDisseminateFormat", "Only the arXiv format is supported")
+            cursor, set_spec = 0, params.get("set")
+            from_date, until_date = params.get("from", ""), params.get("until", "")
+
+        matching = self._select(set_spec, from_date, until_date)
+        if not matching:
+            return self._error("noRecordsMatch", "No records match the request")
+        page = matching[cursor:cursor + self.page_size]
+        next_cursor = cursor + len(page)
+        parts = [self._record(r) for r in page]
+        if token or next_cursor < len(matching):
+            # The last page carries an empty token, as the protocol requires
+            next_token = f"{next_cursor}|{set_spec or ''}|{from_date}|{until_date}" if next_cursor < len(matching) else ""
+            parts.append(f'<resumptionToken cursor="{cursor}" completeListSize="{len(matching)}">'
+                         f'{escape(next_token)}</resumptionToken>')
+        return self._response(f"<ListRecords>{''.join(parts)}</ListRecords>")
+
+    def _record(self, r: dict) -> str:
+        status = ' status="deleted"' if r["deleted"] else ""
+        header = (f"<header{status}>"
+                  f'<identifier>oai:arXiv.org:{r["id"]}</identifier>'
+                  f'<datestamp>{r["datestamp"]}</datestamp><setSpec>cs</setSpec></header>')
+        if r["deleted"]:
+            return f"<record>{header}</record>"
+        authors = "".join(
+            f"<author><keyname>{escape(k)}</keyname><forenames>{escape(f)}</forenames></author>"
+            for k, f in r["authors"]
+        )
+        return (
+            f"<record>{header}<metadata>"
+            '<arXiv xmlns="http://arxiv.org/OAI/arXiv/" '
+            'xsi:schemaLocation="http://arxiv.org/OAI/arXiv/ http://arxiv.org/OAI/arXiv.xsd">'
+            f'<id>{r["id"]}</id><created>{r["datestamp"]}</created>'
+            f"<authors>{authors}</authors>"
+            f'<title>{escape(r["title"])}</title>'
+            f'<categories>{" ".join(r["categories"])}</categories>'
+            f'<license>http://arxiv.org/licenses/nonexclusive-distrib/1.0/</license>'
+            f'<abstract>  {escape(r["abstract"])}\n</abstract>'
+            "</arXiv></metadata></record>"
+        )
+
+    def _error(self, code: str, message: str) -> Response:
+        return self._response(f'<error code="{code}">{escape(message)}</error>')
+
+    def _response(self, body: str) -> Response:
+        xml = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f"<OAI-PMH {NAMESPACES}>"
+            "<responseDate>2024-01-01T00:00:00Z</responseDate>"
+            '<request verb="ListRecords">http://export.arxiv.org/oai2</request>'
+            f"{body}</OAI-PMH>"
+        )
+        return Response(xml, media_type="text/xml")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake arXiv OAI-PMH endpoint")
+    parser.add_argument("--port", type=int, default=8083)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+    app = FakeOAIPMH(records=args.records, page_size=args.page_size).app
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
@@ -0,0 +1,20 @@
+"""
+The API app with the summarization model replaced by a fake
+
+For load tests and local runs without downloading BART. Combined with
+ARXIV_API_URL and TELEGRAM_API_BASE_URL pointing at the other fakes, the
+whole backend runs offline:
+
+    uvicorn fakes.offline_app:app --workers 2
+
+Set MODEL_NAME to a real model and FAKE_SUMMARIZER=0 to keep the real one.
+"""
+import os
+from app.services.model_manager import get_model_manager
+from fakes.summarization import FakeSummarizationPipeline
+
+if os.getenv("FAKE_SUMMARIZER", "1") == "1":
+    # Loaded, shared and unloaded like the real model
+    get_model_manager().loader = lambda name: FakeSummarizationPipeline()
+
+from app.main import app  # noqa: E402
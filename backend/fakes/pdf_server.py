@@ -0,0 +1,132 @@
+"""
+Fake arXiv PDF file server
+
+Serves `GET /pdf/{arxiv_id}` with a small but valid PDF of generated text
+for any id, streamed in chunks like a real file download. The text is
+derived from the id, so the same id always returns the same bytes (and
+content hash). Page count, latency and missing files are configurable, so
+full-text ingestion can be exercised offline, including with large PDFs.
+
+Point the full-text stage at it with:
+    ARXIV_PDF_URL=http://127.0.0.1:8084/pdf
+
+Run standalone:
+    python -m fakes.pdf_server --port 8084 --pages 12
+"""
+from typing import Dict, Iterator, List, Optional, Set
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fakes.arxiv_api import WORDS
+
+CHUNK_SIZE = 64 * 1024
+LINES_PER_PAGE = 50
+WORDS_PER_LINE = 12
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """A minimal PDF with one Helvetica text line per entry of each page"""
+    # 1: catalog, 2: page tree, 3: font, then a page and its content stream per page
+    objects: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for i, lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * i, 5 + 2 * i
+        kids.append(f"{page_id} 0 R")
+        body = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for number in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[number]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+class FakePDFServer:
+    """
+    In-process fake of the arXiv PDF downloads
+
+    Args:
+        pages: Pages per document
+        latency: Seconds to wait before answering each request
+        missing: arXiv ids answered with 404
+        large: Page counts overriding `pages` for some ids
+        scanned: arXiv ids served as PDFs without a text layer, like scanned papers
+    """
+
+    def __init__(self, pages: int = 8, latency: float = 0.0, missing: Set[str] = frozenset(),
+                 large: Optional[Dict[str, int]] = None, scanned: Set[str] = frozenset()):
+        self.pages = pages
+        self.large = dict(large or {})
+        self.scanned = set(scanned)
+        self.latency = latency
+        self.missing = set(missing)
+        self.requests = 0
+        self.bytes_sent = 0
+        self.app = FastAPI(title="Fake arXiv PDFs")
+        self.app.add_api_route("/pdf/{arxiv_id}", self.pdf, methods=["GET"])
+
+    def document(self, arxiv_id: str) -> bytes:
+        """The PDF served for an id"""
+        if arxiv_id in self.scanned:
+            return build_pdf([[] for _ in range(self.large.get(arxiv_id, self.pages))])
+        rng = random.Random(hashlib.sha256(arxiv_id.encode()).digest())
+        pages = [
+            [" ".join(rng.choice(WORDS) for _ in range(WORDS_PER_LINE)) for _ in range(LINES_PER_PAGE)]
+            for _ in range(self.large.get(arxiv_id, self.pages))
+        ]
+        pages[0][0] = f"arXiv:{arxiv_id}"
+        return build_pdf(pages)
+
+    async def pdf(self, arxiv_id: str):
+        self.requests += 1
+        # /pdf/2410.00001v2 serves the same document as /pdf/2410.00001
+        arxiv_id = re.sub(r"v\d+$", "", arxiv_id)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if arxiv_id in self.missing:
+            return Response(status_code=404)
+        content = self.document(arxiv_id)
+
+        def chunks() -> Iterator[bytes]:
+            for start in range(0, len(content), CHUNK_SIZE):
+                self.bytes_sent += len(content[start:start + CHUNK_SIZE])
+                yield content[start:start + CHUNK_SIZE]
+
+        return StreamingResponse(
+            chunks(), media_type="application/pdf", headers={"Content-Length": str(len(content))}
+        )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake arXiv PDF server")
+    parser.add_argument("--port", type=int, default=8084)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+    uvicorn.run(FakePDFServer(pages=args.pages, latency=args.latency).app, host="127.0.0.1", port=args.port)
@@ -0,0 +1,48 @@
+"""
+Run an ASGI app with uvicorn on a background thread
+"""
+import threading
+import time
+import uvicorn
+
+
+class BackgroundServer:
+    """
+    Serve an ASGI app on 127.0.0.1 from a daemon thread
+
+    Usage:
+        with BackgroundServer(app) as server:
+            httpx.get(f"{server.url}/health")
+    """
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        config = uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.host = host
+        self.port = port
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "BackgroundServer":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("Background server failed to start")
+            time.sleep(0.01)
+        # Resolve the ephemeral port picked by the OS
+        self.port = self.server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+    def __enter__(self) -> "BackgroundServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
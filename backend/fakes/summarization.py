@@ -0,0 +1,48 @@
+"""
+Fake summarization pipeline
+
+Stands in for the HuggingFace `pipeline("summarization")` object the
+Summarizer loads, so the summarization path can run without downloading
+BART. It returns the leading sentences of the input that fit in
+`max_length` words, which is the same shape of output as the real model.
+Its tokenizer counts words as tokens.
+
+    summarizer = Summarizer()
+    summarizer._model = FakeSummarizationPipeline()
+"""
+from typing import List, Optional, Union
+import re
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class FakeTokenizer:
+    model_max_length = 1024
+
+    def __call__(self, text: str, truncation: bool = False, max_length: Optional[int] = None, **kwargs):
+        ids = list(range(len(text.split())))
+        if truncation:
+            ids = ids[:max_length or self.model_max_length]
+        return {"input_ids": ids}
+
+
+class FakeSummarizationPipeline:
+    def __init__(self):
+        self.calls = 0
+        self.tokenizer = FakeTokenizer()
+
+    def __call__(self, text: Union[str, List[str]], max_length: int = 142, min_length: int = 56, **kwargs):
+        self.calls += 1
+        texts = [text] if isinstance(text, str) else text
+        return [{"summary_text": self._summarize(t, max_length)} for t in texts]
+
+    def _summarize(self, text: str, max_length: int) -> str:
+        words = 0
+        sentences = []
+        for sentence in _SENTENCE_END.split(text.strip()):
+            count = len(sentence.split())
+            if sentences and words + count > max_length:
+                break
+            sentences.append(sentence)
+            words += count
+        return " ".join(sentences)
@@ -0,0 +1,179 @@
+"""
+Fake Telegram Bot API
+
+Implements the handful of Bot API methods the backend uses and records
+every message sent. It enforces Telegram's flood limits the same way the
+real API does, answering 429 with `retry_after`, so rate limiting and
+backoff can be exercised offline.
+
+Point python-telegram-bot at it with:
+    Bot(token, base_url=f"{server.url}/bot")
+
+Run standalone:
+    python -m fakes.telegram_api --port 8081
+"""
+from collections import defaultdict, deque
+from typing import Callable, Dict, Iterable, List, Optional
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import parse_qsl
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+BOT_USER = {
+    "id": 100000001,
+    "is_bot": True,
+    "first_name": "TechAware",
+    "username": "techaware_bot",
+}
+
+
+class FakeTelegramAPI:
+    """
+    In-process fake of the Bot API
+
+    Args:
+        latency: Seconds to wait before answering each request
+        global_limit: Messages per second accepted across all chats
+        chat_limit: Messages per second accepted per chat
+        blocked_chats: Chat ids answered with 403 (user blocked the bot)
+        flaky_chats: Chat ids whose first send attempt fails with a 502
+        on_message: Called with each message recorded (from the server's thread)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        global_limit: int = 30,
+        chat_limit: int = 1,
+        blocked_chats: Iterable[int] = (),
+        flaky_chats: Iterable[int] = (),
+        on_message: Optional[Callable[[dict], None]] = None,
+    ):
+        self.latency = latency
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.blocked_chats = set(blocked_chats)
+        self.flaky_chats = set(flaky_chats)
+        self.on_message = on_message
+
+        self.messages: List[dict] = []
+        self.inline_answers: List[dict] = []
+        self.rate_limited = 0
+        self.requests: Dict[str, int] = defaultdict(int)
+        self._sent_times: deque = deque()
+        self._chat_times: Dict[int, deque] = defaultdict(deque)
+        self._failed_once: set = set()
+        self._next_message_id = 1
+        self._next_update_id = 1
+        self._pending_updates: List[dict] = []
+
+        self.app = FastAPI(title="Fake Telegram Bot API")
+        self.app.add_api_route("/bot{token}/{method}", self.handle, methods=["GET", "POST"])
+
+    # Helpers for tests
+
+    def messages_for(self, chat_id: int) -> List[dict]:
+        return [m for m in self.messages if m["chat_id"] == chat_id]
+
+    def push_update(self, update: dict):
+        """Queue an update to be returned by the next getUpdates call"""
+        update = dict(update, update_id=self._next_update_id)
+        self._next_update_id += 1
+        self._pending_updates.append(update)
+
+    # Request handling
+
+    async def _params(self, request: Request) -> dict:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            return await request.json()
+        # Parsed by hand so the fake does not need python-multipart
+        form = parse_qsl((await request.body()).decode("utf-8"))
+        params = {}
+        for key, value in form:
+            # python-telegram-bot JSON-encodes nested values inside form fields
+            try:
+                params[key] = json.loads(value)
+            except (TypeError, ValueError):
+                params[key] = value
+        return params
+
+    def _error(self, code: int, description: str, retry_after: Optional[int] = None):
+        body = {"ok": False, "error_code": code, "description": description}
+        if retry_after is not None:
+            body["parameters"] = {"retry_after": retry_after}
+        return JSONResponse(body, status_code=code)
+
+    def _over_limit(self, times: deque, limit: int, now: float) -> bool:
+        while times and now - times[0] >= 1.0:
+            times.popleft()
+        return len(times) >= limit
+
+    async def handle(self, token: str, method: str, request: Request):
+        params = await self._params(request)
+        self.requests[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            return {"ok": True, "result": BOT_USER}
+        if method == "sendMessage":
+            return self._send_message(params)
+        if method == "getUpdates":
+            updates, self._pending_updates = self._pending_updates, []
+            if not updates:
+                await asyncio.sleep(min(float(params.get("timeout", 0) or 0), 0.2))
+            return {"ok": True, "result": updates}
+        if method == "answerInlineQuery":
+            self.inline_answers.append(params)
+            return {"ok": True, "result": True}
+        # setWebhook, deleteWebhook, answerCallbackQuery, ...
+        return {"ok": True, "result": True}
+
+    def _send_message(self, params: dict):
+        chat_id = int(params["chat_id"])
+        now = time.monotonic()
+
+        if chat_id in self.blocked_chats:
+            return self._error(403, "Forbidden: bot was blocked by the user")
+        if chat_id in self.flaky_chats and chat_id not in self._failed_once:
+            self._failed_once.add(chat_id)
+            return self._error(502, "Bad Gateway")
+        if self._over_limit(self._sent_times, self.global_limit, now) or \
+                self._over_limit(self._chat_times[chat_id], self.chat_limit, now):
+            self.rate_limited += 1
+            return self._error(429, "Too Many Requests: retry after 1", retry_after=1)
+
+        self._sent_times.append(now)
+        self._chat_times[chat_id].append(now)
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        message = {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "text": params.get("text"),
+            "reply_markup": params.get("reply_markup"),
+            "sent_at": now,
+        }
+        self.messages.append(message)
+        if self.on_message:
+            self.on_message(message)
+        return {"ok": True, "result": {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text"),
+        }}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake Telegram Bot API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    uvicorn.run(FakeTelegramAPI(latency=args.latency).app, host="127.0.0.1", port=args.port)
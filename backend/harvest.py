@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Bulk-harvest arXiv metadata over OAI-PMH
+
+Writes raw records to `data/harvest/<name>.jsonl` with a checkpoint next
+to it. Re-running the same command after an interruption resumes from the
+last completed page:
+
+    python harvest.py --from 2024-01-01 --until 2024-03-31 --categories cs.AI,cs.LG
+
+Use `--url` (or ARXIV_OAI_URL) to harvest from a local stand-in such as
+`python -m fakes.oai_pmh`.
+"""
+import argparse
+import os
+import sys
+from app.services.oai_harvester import ARXIV_OAI_URL, OAIError, OAIHarvester, harvest_paths
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Harvest arXiv metadata over OAI-PMH")
+    parser.add_argument("--set", dest="set_spec", default="cs", help="OAI set (default: cs)")
+    parser.add_argument("--from", dest="from_date", help="First datestamp, YYYY-MM-DD")
+    parser.add_argument("--until", dest="until_date", help="Last datestamp, YYYY-MM-DD")
+    parser.add_argument("--categories", default="", help="Comma-separated arXiv categories to keep (default: all)")
+    parser.add_argument("--name", help="Harvest name (default: derived from set and dates)")
+    parser.add_argument("--url", default=ARXIV_OAI_URL, help="OAI-PMH endpoint")
+    parser.add_argument("--max-pages", type=int, help="Stop after this many pages; re-run to continue")
+    parser.add_argument("--restart", action="store_true", help="Discard the checkpoint and start over")
+    args = parser.parse_args()
+
+    categories = [c.strip() for c in args.categories.split(",") if c.strip()]
+    name = args.name or "-".join(filter(None, (args.set_spec, args.from_date, args.until_date)))
+    records_path, checkpoint_path = harvest_paths(name)
+    if args.restart:
+        for path in (records_path, checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print(f"🌾 Harvesting set '{args.set_spec}' from {args.url} into {records_path}")
+    harvester = OAIHarvester(records_path, checkpoint_path, base_url=args.url)
+    try:
+        checkpoint = harvester.harvest(args.set_spec, args.from_date, args.until_date, categories, args.max_pages)
+    except (OAIError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted; re-run the same command to resume from the last checkpoint")
+        return 130
+    if not checkpoint.completed:
+        print(f"⏸️  Stopped after {checkpoint.pages} pages; re-run to continue")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
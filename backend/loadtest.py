@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Load test the API end to end against local arXiv and Telegram fakes
+
+Starts the FastAPI app under uvicorn in a subprocess. It gets a temporary
+data directory seeded with a synthetic corpus, the fake summarization
+model, the fake arXiv API and the fake Telegram Bot API (webhook mode).
+Virtual users then drive a weighted mix of /papers queries, /tags and bot
+commands for a fixed duration, optionally while an ingestion runs. Bot
+command latency is measured until the last reply reaches the fake
+Telegram API.
+
+    python loadtest.py --concurrency 32 --duration 20
+    python loadtest.py --mix papers_search=1,bot_papers=1 --ingest --workers 2
+
+Reports throughput and p50/p95/p99 latency per operation; with --ingest
+the numbers are split by whether an ingestion was running.
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import numpy as np
+from benchmarks.corpus import CATEGORIES, TAGS, WORDS, generate_papers
+from fakes import BackgroundServer
+from fakes.arxiv_api import FakeArxivAPI
+from fakes.telegram_api import FakeTelegramAPI
+
+BOT_TOKEN = "123456:LOADTEST"
+WEBHOOK_SECRET = "loadtest-secret"
+DEFAULT_MIX = "papers=4,papers_search=2,papers_tags=2,papers_category=2,papers_page=2,tags=1,bot_papers=1,bot_status=1"
+# Seconds to wait for all replies to a bot command
+REPLY_TIMEOUT = 30
+
+
+class BotReplies:
+    """Resolves a future once a chat has received the expected number of messages"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.waiters: Dict[int, list] = {}
+        self._update_id = 0
+
+    def on_message(self, message: dict):
+        # Called on the fake Telegram server's thread
+        self.loop.call_soon_threadsafe(self._received, message["chat_id"])
+
+    def _received(self, chat_id: int):
+        waiter = self.waiters.get(chat_id)
+        if waiter:
+            waiter[0] -= 1
+            if waiter[0] <= 0 and not waiter[1].done():
+                waiter[1].set_result(None)
+
+    async def command(self, client: httpx.AsyncClient, chat_id: int, text: str, replies: int):
+        """Post a command to the webhook and wait for its replies"""
+        future = self.loop.create_future()
+        self.waiters[chat_id] = [replies, future]
+        self._update_id += 1
+        command = text.split()[0]
+        update = {
+            "update_id": self._update_id,
+            "message": {
+                "message_id": self._update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"},
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+            },
+        }
+        response = await client.post(
+            "/telegram/webhook", json=update,
+            headers={"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET},
+        )
+        response.raise_for_status()
+        try:
+            await asyncio.wait_for(future, REPLY_TIMEOUT)
+        finally:
+            self.waiters.pop(chat_id, None)
+
+
+def _word(rng: random.Random) -> str:
+    return rng.choice(WORDS)
+
+
+# Operations: name -> coroutine(client, rng, chat_id, bot)
+
+async def _get(client: httpx.AsyncClient, path: str, **params):
+    response = await client.get(path, params=params)
+    response.raise_for_status()
+
+
+OPERATIONS = {
+    "papers": lambda c, rng, chat, bot: _get(c, "/papers"),
+    "papers_search": lambda c, rng, chat, bot: _get(c, "/papers", search=_word(rng)),
+    "papers_tags": lambda c, rng, chat, bot: _get(c, "/papers", tags=",".join(rng.sample(TAGS, 2))),
+    "papers_category": lambda c, rng, chat, bot: _get(c, "/papers", category=rng.choice(CATEGORIES), sort="score"),
+    "papers_page": lambda c, rng, chat, bot: _get(c, "/papers", page=rng.randint(2, 20), limit=20),
+    "tags": lambda c, rng, chat, bot: _get(c, "/tags"),
+    # /papers 3 answers with an intro plus one message per paper
+    "bot_papers": lambda c, rng, chat, bot: bot.command(c, chat, "/papers 3", 4),
+    "bot_status": lambda c, rng, chat, bot: bot.command(c, chat, "/status", 1),
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def drive(base_url: str, mix: Dict[str, float], concurrency: int, duration: float, warmup: float,
+                bot: BotReplies, ingest: Optional[dict]) -> dict:
+    """Run the virtual users; returns samples and the ingestion window"""
+    names, weights = list(mix), list(mix.values())
+    samples: List[tuple] = []
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+    ingesting = False
+    ingestion: dict = {}
+
+    async def user(index: int, client: httpx.AsyncClient):
+        rng = random.Random(index)
+        chat_id = 10_000 + index
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            during = ingesting
+            t0 = time.perf_counter()
+            ok = True
+            try:
+                await OPERATIONS[name](client, rng, chat_id, bot)
+            except Exception:
+                ok = False
+            if time.monotonic() >= measure_from:
+                samples.append((name, time.perf_counter() - t0, ok, during))
+
+    async def run_ingestion(client: httpx.AsyncClient):
+        nonlocal ingesting
+        await asyncio.sleep(warmup + duration * 0.2)
+        ingesting = True
+        t0 = time.perf_counter()
+        try:
+            response = await client.post("/ingest/run", params=ingest, timeout=None)
+            ingestion["status"] = response.status_code
+            ingestion["result"] = {k: v for k, v in response.json().items() if k != "papers"}
+        except Exception as e:
+            ingestion["error"] = str(e)
+        finally:
+            ingesting = False
+            ingestion["seconds"] = time.perf_counter() - t0
+
+    limits = httpx.Limits(max_connections=concurrency + 2, max_keepalive_connections=concurrency + 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        tasks = [asyncio.create_task(user(i, client)) for i in range(concurrency)]
+        if ingest is not None:
+            tasks.append(asyncio.create_task(run_ingestion(client)))
+        await asyncio.gather(*tasks)
+    return {"samples": samples, "ingestion": ingestion}
+
+
+def summarize(samples: List[tuple], duration: float) -> Dict[str, dict]:
+    by_name: Dict[str, list] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for name, latency, ok, _ in samples:
+        for key in (name, "total"):
+            if ok:
+                by_name[key].append(latency)
+            else:
+                errors[key] += 1
+    report = {}
+    for name in sorted(set(by_name) | set(errors), key=lambda n: (n == "total", n)):
+        latencies = np.array(by_name.get(name, []))
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0, 0, 0)
+        report[name] = {
+            "requests": len(latencies),
+            "errors": errors.get(name, 0),
+            "rps": len(latencies) / duration if duration else 0,
+            "p50_ms": p50 * 1000,
+            "p95_ms": p95 * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": latencies.max() * 1000 if len(latencies) else 0,
+        }
+    return report
+
+
+def print_report(title: str, report: Dict[str, dict]):
+    print(f"\n{title}")
+    print(f"{'operation':<18} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, r in report.items():
+        print(f"{name:<18} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f}")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def corpus_size(base_url: str) -> int:
+    """Papers the API is serving"""
+    return httpx.get(f"{base_url}/papers", params={"limit": 1}, timeout=30).json()["total"]
+
+
+def start_api(data_dir: str, telegram_url: str, arxiv_url: str, workers: int, model: Optional[str], log) -> tuple:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        DATA_DIR=data_dir,
+        TELEGRAM_BOT_TOKEN=BOT_TOKEN,
+        TELEGRAM_API_BASE_URL=telegram_url,
+        TELEGRAM_WEBHOOK_URL=base_url,
+        TELEGRAM_WEBHOOK_SECRET=WEBHOOK_SECRET,
+        ARXIV_API_URL=arxiv_url,
+        # Keep the daily digest out of the measurements
+        DIGEST_CATCHUP_HOURS="0",
+        # Ingestion keeps the seeded corpus instead of trimming it to the newest 100 papers
+        MAX_PAPERS="0",
+        FAKE_SUMMARIZER="0" if model else "1",
+    )
+    if model:
+        env["MODEL_NAME"] = model
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fakes.offline_app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            # uvicorn only accepts requests once the lifespan startup finished
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API did not become ready")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="End-to-end load test against local fakes")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Weighted operations (default: {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=15, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds before")
+    parser.add_argument("--papers", type=int, default=5000, help="Papers in the seeded corpus")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--ingest", action="store_true", help="Run an ingestion during the test")
+    parser.add_argument("--ingest-papers", type=int, default=50, help="max_results for the ingestion")
+    parser.add_argument("--arxiv-latency", type=float, default=0.2, help="Fake arXiv response delay")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="Fake Telegram response delay")
+    parser.add_argument("--model", default=None, help="Real summarization model (default: fake)")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the report to this file")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("TECHAWARE LOAD TEST")
+    print("=" * 60)
+
+    loop = asyncio.new_event_loop()
+    bot = BotReplies(loop)
+    # Rate limits lifted: the test measures the backend, not Telegram's flood control
+    telegram = FakeTelegramAPI(latency=args.telegram_latency, global_limit=10**9, chat_limit=10**9,
+                               on_message=bot.on_message)
+    arxiv = FakeArxivAPI(papers=max(500, args.ingest_papers * 10), latency=args.arxiv_latency)
+
+    with tempfile.TemporaryDirectory() as data_dir, \
+            BackgroundServer(telegram.app) as telegram_server, BackgroundServer(arxiv.app) as arxiv_server:
+        with open(os.path.join(data_dir, "papers.json"), "w", encoding="utf-8") as f:
+            json.dump(list(generate_papers(args.papers)), f)
+        log_path = os.path.join(data_dir, "api.log")
+        with open(log_path, "w") as log:
+            print(f"\n🚀 Starting API ({args.workers} worker(s), {args.papers} papers)...")
+            try:
+                process, base_url = start_api(data_dir, telegram_server.url, arxiv_server.url,
+                                              args.workers, args.model, log)
+            except RuntimeError as e:
+                print(f"❌ {e}\n" + open(log_path).read())
+                return 1
+            try:
+                papers_before = corpus_size(base_url)
+                print(f"🔥 {args.concurrency} users for {args.duration:.0f}s "
+                      f"(+{args.warmup:.0f}s warm-up){' with ingestion' if args.ingest else ''}...")
+                ingest = {"max_results": args.ingest_papers, "days_back": 7} if args.ingest else None
+                outcome = loop.run_until_complete(
+                    drive(base_url, args.mix, args.concurrency, args.duration, args.warmup, bot, ingest)
+                )
+                papers_after = corpus_size(base_url)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    samples = outcome["samples"]
+    report = {"overall": summarize(samples, args.duration), "corpus": {"before": papers_before, "after": papers_after}}
+    print(f"\n📚 Corpus: {papers_before} papers before, {papers_after} after")
+    print_report("📊 All requests", report["overall"])
+    if args.ingest:
+        ingestion = outcome["ingestion"]
+        seconds = ingestion.get("seconds", 0)
+        report["ingestion"] = ingestion
+        report["during_ingestion"] = summarize([s for s in samples if s[3]], seconds)
+        report["without_ingestion"] = summarize([s for s in samples if not s[3]], max(args.duration - seconds, 1e-9))
+        print(f"\n📡 Ingestion took {seconds:.1f}s: {ingestion.get('result') or ingestion.get('error')}")
+        print_report("📊 During ingestion", report["during_ingestion"])
+        print_report("📊 Without ingestion", report["without_ingestion"])
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(dict(report, config={k: v for k, v in vars(args).items() if k != "json_path"}), f, indent=2)
+        print(f"\n📝 Report written to {args.json_path}")
+    return 0 if report["overall"].get("total", {}).get("errors", 1) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
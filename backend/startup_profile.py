@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Startup profiler for the TechAware backend
+
+Reports per-module import time for `app.main`, the time spent in each
+startup step, and the cold-start-to-first-response time of `GET /papers`.
+Exits with status 1 when the cold start exceeds the budget, so it can be
+run as a regression check in CI:
+
+    python startup_profile.py --budget-ms 2500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "2500"))
+
+# Runs in a fresh interpreter so nothing is already imported or cached
+COLD_START_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    response = client.get("/papers")
+    first_response = time.perf_counter()
+print(json.dumps({
+    "status": response.status_code,
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (first_response - start) * 1000,
+}))
+"""
+
+
+def child_env(profile: bool) -> dict:
+    env = dict(os.environ)
+    # Fast-startup mode: measure the API without the Telegram bot
+    env.pop("TELEGRAM_BOT_TOKEN", None)
+    if profile:
+        env["STARTUP_PROFILE"] = "1"
+    return env
+
+
+def import_times(top: int):
+    """
+    Parse `python -X importtime` for app.main
+
+    Returns the app's own modules as (module, self_us, cumulative_us) rows and
+    the `top` heaviest third-party packages as (package, total_self_us) rows.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=child_env(False), capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.rstrip(), int(self_us), int(cumulative_us)))
+    app_rows = [r for r in rows if r[0].strip().split(".")[0] == "app"]
+    packages = {}
+    for module, self_us, _ in rows:
+        package = module.strip().split(".")[0]
+        if package != "app":
+            packages[package] = packages.get(package, 0) + self_us
+    heavy = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return app_rows, heavy
+
+
+def cold_start() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT],
+        cwd=BACKEND_DIR, env=child_env(True), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        raise SystemExit("❌ Cold start failed")
+    lines = result.stdout.strip().splitlines()
+    # Everything before the JSON line is the app's own startup profile output
+    for line in lines[:-1]:
+        print(line)
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Maximum allowed cold-start-to-first-response time")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Number of heaviest imported packages to list")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("TECHAWARE STARTUP PROFILE")
+    print("=" * 70)
+
+    app_rows, heavy = import_times(args.top)
+    print("\n📦 Application modules (self / cumulative):")
+    for module, self_us, cumulative_us in app_rows:
+        print(f"   {module:<44} {self_us / 1000:8.1f} ms {cumulative_us / 1000:8.1f} ms")
+    print("\n🐘 Heaviest third-party packages:")
+    for package, total_us in heavy:
+        print(f"   {package:<44} {total_us / 1000:8.1f} ms")
+
+    print()
+    timings = cold_start()
+    print(f"\n🚀 Import app.main:        {timings['import_ms']:8.1f} ms")
+    print(f"🚀 First /papers response: {timings['first_response_ms']:8.1f} ms "
+          f"(HTTP {timings['status']})")
+    print(f"🎯 Budget:                 {args.budget_ms:8.1f} ms")
+
+    if timings["status"] != 200 or timings["first_response_ms"] > args.budget_ms:
+        print("\n❌ Startup budget exceeded")
+        sys.exit(1)
+    print("\n✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Exercise the author index and the /authors endpoints
+
+Checks that spellings of one author (case, diacritics, initials,
+"Surname, Forename", particles) share a key, that names without ASCII
+letters get their own non-empty keys, that posting lists survive a
+snapshot round trip newest first, and that the endpoints autocomplete,
+page and reject unknown or empty keys.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.authors import author_key, key_prefix
+from app.services.paper_service import PaperService
+from app.services.paper_store import PaperStore
+from app.services.snapshot import read_snapshot, write_snapshot
+
+# Spellings expected to share one key
+SAME_AUTHOR = {
+    "kaiser-l": ["Łukasz Kaiser", "Lukasz Kaiser", "L. Kaiser", "Kaiser, Lukasz", "LUKASZ KAISER"],
+    "vanderberg-j": ["Jan van der Berg", "J. van der Berg", "van der Berg, Jan"],
+    "garcialopez-a": ["Ana García-López", "A. Garcia-Lopez"],
+    "muller-j": ["Jürgen Müller", "J. Muller Jr."],
+}
+# Names without ASCII letters, with spellings expected to share their key
+NON_LATIN = {
+    "Иван Петров": ["И. Петров", "Петров, Иван"],
+    "王伟": ["王伟"],
+    "李娜": [],
+    "Ἀριστοτέλης": [],
+}
+
+
+def _record(i: int, authors: list) -> dict:
+    return dict(
+        id=f"2401.{i:05d}", arxiv_id=f"2401.{i:05d}", title=f"Paper {i}", authors=authors, abstract="An abstract.",
+        category="Machine Learning", published_at=f"2024-01-{i + 1:02d}", pdf_url=f"https://arxiv.org/pdf/2401.{i:05d}",
+        summary_short="A summary.", impact_suggestions=[], tags=["LLM"], score=1.0,
+    )
+
+
+async def run_authors_check() -> bool:
+    print("=" * 60)
+    print("TECHAWARE AUTHOR INDEX CHECK")
+    print("=" * 60)
+    ok = True
+
+    def check(condition: bool, message: str):
+        nonlocal ok
+        print(f"{'✅' if condition else '❌'} {message}")
+        ok = ok and condition
+
+    print("\n🔑 Keys")
+    for key, spellings in SAME_AUTHOR.items():
+        keys = {author_key(name) for name in spellings}
+        check(keys == {key}, f"{key}: {', '.join(spellings)}" + ("" if keys == {key} else f" -> {sorted(keys)}"))
+    non_latin = {name: author_key(name) for name in NON_LATIN}
+    check(all(non_latin.values()) and all(k.isascii() for k in non_latin.values()),
+          "names without ASCII letters get non-empty ASCII keys")
+    check(len(set(non_latin.values())) == len(non_latin), "different non-Latin names get different keys")
+    for name, spellings in NON_LATIN.items():
+        if spellings:
+            check({author_key(s) for s in spellings} == {non_latin[name]}, f"{name}: {', '.join(spellings)}")
+    check(key_prefix("van der b") == "vanderb" and key_prefix("a vaswani") == "vaswani-a", "autocomplete prefixes")
+
+    print("\n📚 Index")
+    records = [
+        _record(0, ["L. Kaiser", "Иван Петров"]),
+        _record(1, ["Łukasz Kaiser", "王伟"]),
+        # Written before names without ASCII letters had keys
+        dict(_record(2, ["Kaiser, Lukasz", "李娜", "И. Петров"]), author_keys=["kaiser-l", "", ""]),
+        _record(3, ["Jan van der Berg"]),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "papers.snap")
+        write_snapshot(PaperStore.from_records(records, version="check"), path)
+        store = read_snapshot(path)
+        check(b"" not in set(store.author_keys.tolist()), "no empty key in the index")
+        kaiser = store.find_author("kaiser-l")
+        check(kaiser is not None and store.author_name(kaiser) == "Łukasz Kaiser", "fullest spelling displayed")
+        check(kaiser is not None and store.ids[store.author_rows(kaiser)].tolist() == [b"2401.00002", b"2401.00001", b"2401.00000"],
+              "posting list newest first after a snapshot round trip")
+        petrov = store.find_author(non_latin["Иван Петров"])
+        check(petrov is not None and len(store.author_rows(petrov)) == 2, "non-Latin author has its own postings")
+        check(store.find_author("") is None, "empty key not found")
+
+        service = PaperService(store=store)
+        completed = await service.complete_authors("kai")
+        check([(a.key, a.papers) for a in completed] == [("kaiser-l", 3)], "autocomplete by surname prefix")
+        check([a.key for a in await service.complete_authors("Иван Петров")] == [non_latin["Иван Петров"]],
+              "autocomplete by a full non-Latin name")
+        page = await service.get_author_papers("kaiser-l", page=2, limit=2)
+        check(page is not None and page.total == 3 and page.pages == 2 and [p.id for p in page.papers] == ["2401.00000"],
+              "author papers paginated")
+        check(await service.get_author_papers("nobody-x") is None, "unknown key")
+        check(await service.get_author_papers("") is None, "empty key rejected")
+
+    print("\n" + "=" * 60)
+    print("✅ AUTHOR INDEX CHECK PASSED" if ok else "❌ AUTHOR INDEX CHECK FAILED")
+    print("=" * 60)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run_authors_check()) else 1)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Exercise digest delivery against the local fake Telegram Bot API
+
+Sends a rendered digest to many fake chats through DeliveryEngine and
+checks that every reachable chat received every message, in order, while
+the fake API's flood limits were respected.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+from fakes import BackgroundServer
+from fakes.telegram_api import FakeTelegramAPI
+from app.services.paper_service import PaperService
+from app.services.digest_delivery import DeliveryEngine, DeliveryQueue
+from app.services.telegram_bot import render_digest_messages
+
+
+async def run_delivery_check(subscribers: int, latency: float):
+    print("=" * 60)
+    print("TECHAWARE DIGEST DELIVERY CHECK")
+    print("=" * 60)
+
+    chat_ids = list(range(1000, 1000 + subscribers))
+    blocked, flaky = {chat_ids[0]}, {chat_ids[1]}
+    fake = FakeTelegramAPI(latency=latency, blocked_chats=blocked, flaky_chats=flaky)
+
+    papers = await PaperService().get_daily_top(3)
+    messages = render_digest_messages(papers)
+
+    with BackgroundServer(fake.app) as server, tempfile.TemporaryDirectory() as tmp:
+        queue = DeliveryQueue(os.path.join(tmp, "queue.db"))
+        queue.enqueue("check", messages, chat_ids)
+
+        request = HTTPXRequest(connection_pool_size=64)
+        async with Bot("123:TEST", base_url=f"{server.url}/bot", request=request) as bot:
+            print(f"\n📬 Sending {len(messages)} messages to {subscribers} chats "
+                  f"({latency * 1000:.0f} ms API latency)...")
+            report = await DeliveryEngine(bot, queue).run("check")
+
+        print(f"\n📊 {report.summary()}")
+        print(f"   Errors: {report.errors or 'none'}")
+        print(f"   Fake API 429 responses: {fake.rate_limited}")
+
+        ok = True
+        for chat_id in chat_ids:
+            expected = 0 if chat_id in blocked else len(messages)
+            texts = [m["text"] for m in fake.messages_for(chat_id)]
+            if len(texts) != expected or (expected and texts != [m["text"] for m in messages]):
+                print(f"❌ Chat {chat_id} received {len(texts)}/{expected} messages")
+                ok = False
+        if queue.pending("check"):
+            print("❌ Deliveries left pending in the queue")
+            ok = False
+        queue.close()
+
+    print("\n" + "=" * 60)
+    print("✅ DELIVERY CHECK PASSED" if ok else "❌ DELIVERY CHECK FAILED")
+    print("=" * 60)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run_delivery_check(args.subscribers, args.latency)) else 1)
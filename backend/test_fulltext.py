@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Exercise the full-text stage against the local fake PDF server
+
+Downloads and extracts PDFs for a set of papers, then checks that
+missing, oversized and textless (scanned) PDFs are skipped, that a second run is served from
+the cache without downloading, that identical PDF bytes under another
+URL are not extracted again, that long papers are cut at MAX_PAGES, and
+that map-reduce summaries and tags are produced (with the fake model).
+Reports the peak memory of the extraction processes.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import BackgroundServer
+from fakes.pdf_server import FakePDFServer
+from fakes.summarization import FakeSummarizationPipeline
+from app.services import fulltext
+from app.services.fulltext import FullTextStage, fulltext_tags, summarize_fulltext
+from app.services.summarizer import Summarizer
+
+
+def _paper(arxiv_id: str, scheme: str = "https") -> dict:
+    return {"arxiv_id": arxiv_id, "pdf_url": f"{scheme}://arxiv.org/pdf/{arxiv_id}v1"}
+
+
+async def run_fulltext_check(papers: int, pages: int, large_pages: int):
+    print("=" * 60)
+    print("TECHAWARE FULL-TEXT CHECK")
+    print("=" * 60)
+
+    ids = [f"2410.{i:05d}" for i in range(papers)]
+    missing, large, oversized, scanned = ids[0], ids[1], ids[2], ids[4]
+    fake = FakePDFServer(pages=pages, missing={missing}, large={large: large_pages, oversized: large_pages * 4},
+                         scanned={scanned})
+    # Oversized: more bytes than allowed, abandoned mid-download
+    fulltext.PDF_MAX_BYTES = len(fake.document(large)) * 2
+    ok = True
+
+    def check(condition: bool, message: str):
+        nonlocal ok
+        print(f"{'✅' if condition else '❌'} {message}")
+        ok = ok and condition
+
+    with BackgroundServer(fake.app) as server, tempfile.TemporaryDirectory() as tmp:
+        stage = FullTextStage(tmp, pdf_base_url=f"{server.url}/pdf")
+        try:
+            print(f"\n📄 Fetching {papers} PDFs ({pages} pages, one of {large_pages}, one of {large_pages * 4})...")
+            started = time.perf_counter()
+            documents = await stage.fetch([_paper(i) for i in ids])
+            print(f"   {len(documents)} full texts in {time.perf_counter() - started:.2f}s, "
+                  f"{fake.bytes_sent / 1e6:.1f} MB downloaded")
+            check(set(documents) == set(ids) - {missing, oversized, scanned},
+                  "missing, oversized and textless PDFs skipped")
+            check(all(f"arXiv:{i}" in open(d.path, encoding="utf-8").read(200) for i, d in documents.items()),
+                  "every text starts with its paper's first line")
+            check(documents[large].pages == min(large_pages, fulltext.MAX_PAGES),
+                  f"long paper cut at {fulltext.MAX_PAGES} pages")
+            check(not os.listdir(stage.pdf_dir), "downloaded PDFs removed")
+
+            requests = fake.requests
+            again = await stage.fetch([_paper(i) for i in ids if i not in (missing, oversized)])
+            check(fake.requests == requests and again == documents, "second run served from the cache")
+            # The summary upgrader looks texts up: a textless PDF must fall back to the abstract
+            check(stage.lookup(_paper(scanned)["pdf_url"]) is None, "textless PDF not offered for summaries")
+
+            # Same bytes behind another URL: downloaded (to hash it), not extracted again
+            other = await stage.fetch([_paper(ids[3], scheme="http")])
+            check(other[ids[3]].sha256 == documents[ids[3]].sha256, "identical PDF reuses the extracted text")
+
+            summarizer = Summarizer()
+            summarizer._model = FakeSummarizationPipeline()
+            document = documents[large]
+            chunks = document.chunks()
+            summary = summarize_fulltext(summarizer, document)
+            tags = await fulltext_tags(summarizer, "A paper", "We study things.", document)
+            print(f"   {document.words} words -> {len(chunks)} chunks -> {len(summary.split())}-word summary, "
+                  f"tags {tags}")
+            check(0 < len(chunks) <= fulltext.MAX_CHUNKS and summary, "map-reduce summary over bounded chunks")
+        finally:
+            pool = stage._pool
+            await stage.close()
+            if pool:
+                pool.shutdown(wait=True)
+
+    # ru_maxrss of reaped children is in KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"\n📊 Peak extraction process memory: {peak:.0f} MB")
+
+    print("\n" + "=" * 60)
+    print("✅ FULL-TEXT CHECK PASSED" if ok else "❌ FULL-TEXT CHECK FAILED")
+    print("=" * 60)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--papers", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--large-pages", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run_fulltext_check(args.papers, args.pages, args.large_pages)) else 1)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Check /papers search against a plain substring loop
+
+Searches a generated corpus with common, rare, one-letter, absent and
+non-ASCII queries and checks that the store finds exactly the papers whose
+lowercased title or abstract contains the lowercased query, including
+matches right after a row or field boundary.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.paper_store import PaperStore, SearchText
+from benchmarks.corpus import generate_papers
+
+QUERIES = ["quantization", "Robust", "a", "zzzq", "Über", "ß", "neural net", ""]
+
+
+def run_search_check(papers: int) -> bool:
+    print("=" * 60)
+    print("TECHAWARE SEARCH CHECK")
+    print("=" * 60)
+    ok = True
+
+    def check(condition: bool, message: str):
+        nonlocal ok
+        print(f"{'✅' if condition else '❌'} {message}")
+        ok = ok and condition
+
+    print("\n🧱 Boundaries")
+    check(SearchText([["xa"], ["aay"]]).find_rows("aa").tolist() == [1], "match after a row boundary found")
+    check(SearchText([["xa", "ay"]]).find_rows("aa").tolist() == [], "no match across title and abstract")
+    check(SearchText([["a\0a"]]).find_rows("a\0a").tolist() == [], "query with a separator matches nothing")
+
+    print(f"\n🔎 {papers} papers")
+    records = list(generate_papers(papers))
+    records[0]["title"] = "Über Alles: Straße to Scale"
+    store = PaperStore.from_records(records, version="check")
+    # The first search builds the lowercased text; time the searches alone
+    store.search_mask("x")
+    for query in QUERIES:
+        needle = query.lower()
+        expected = [i for i, r in enumerate(records) if needle in r["title"].lower() or needle in r["abstract"].lower()]
+        started = time.perf_counter()
+        found = store.search_mask(query).nonzero()[0].tolist()
+        elapsed = time.perf_counter() - started
+        check(found == expected, f"{query!r}: {len(found)} papers in {elapsed * 1000:.1f} ms")
+
+    print("\n" + "=" * 60)
+    print("✅ SEARCH CHECK PASSED" if ok else "❌ SEARCH CHECK FAILED")
+    print("=" * 60)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--papers", type=int, default=20000)
+    args = parser.parse_args()
+    sys.exit(0 if run_search_check(args.papers) else 1)